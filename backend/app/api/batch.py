@@ -0,0 +1,21 @@
+from typing import List
+
+from app.api.uploads import submit_batch
+from app.db.deps import get_db
+from app.queue.models import JobType
+from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
+from sqlalchemy.orm import Session
+
+router = APIRouter()
+
+
+@router.post("/process/batch", status_code=202)
+async def process_batch(
+    request: Request,
+    job_type: JobType = Query(..., alias="type"),
+    files: List[UploadFile] = File([]),
+    paths: List[str] = Form([]),
+    priority: int = Query(0, ge=-10, le=10),
+    db: Session = Depends(get_db),
+):
+    return await submit_batch(job_type, files, paths, db, request, priority)
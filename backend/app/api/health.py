@@ -1,3 +1,4 @@
+from app.ml.registry import registry
 from fastapi import APIRouter
 
 router = APIRouter()
@@ -5,3 +6,9 @@ router = APIRouter()
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/models")
+def model_status():
+    """Load state, load time and approximate memory per model."""
+    return {"models": registry.stats()}
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException, Request
+import json
+import os
+from typing import List, Optional
+
+from app.queue.models import Job, JobStatus, JobType
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
 router = APIRouter()
 
+# Event streams send a comment after this long without an update, so proxies
+# keep idle connections open
+JOB_EVENTS_KEEPALIVE_S = float(os.getenv("JOB_EVENTS_KEEPALIVE_S", "15"))
+# Most jobs returned by one `GET /jobs`
+JOBS_LIST_MAX = int(os.getenv("JOBS_LIST_MAX", "1000"))
 
-@router.get("/jobs/{job_id}")
-def get_job(job_id: str, request: Request):
-    qm = request.app.state.queue
-    job = qm.jobs.get(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="job not found")
 
+def _job_state(job: Job) -> dict:
     return {
         "job_id": job.id,
         "type": job.type,
@@ -24,16 +31,119 @@ def get_job(job_id: str, request: Request):
     }
 
 
+@router.get("/jobs/stats")
+def get_queue_stats(request: Request):
+    return request.app.state.queue.stats()
+
+
+@router.get("/jobs")
+def list_jobs(
+    request: Request,
+    ids: Optional[List[str]] = Query(None),
+    status: Optional[List[JobStatus]] = Query(None),
+    job_type: Optional[JobType] = Query(None, alias="type"),
+    limit: int = Query(100, ge=1),
+):
+    """
+    Many jobs in one response: those in `ids` (repeated or comma-separated;
+    unknown ids are listed under "missing"), or else the newest jobs matching
+    `status` (repeatable) and `type`.
+    """
+    qm = request.app.state.queue
+    if ids:
+        ids = [i for part in ids for i in part.split(",") if i]
+        if len(ids) > JOBS_LIST_MAX:
+            raise HTTPException(
+                status_code=413, detail=f"more than {JOBS_LIST_MAX} ids"
+            )
+        found = qm.get_jobs(ids)
+        jobs = [
+            job
+            for job in found
+            if (not status or job.status in status)
+            and (job_type is None or job.type == job_type)
+        ]
+        known = {job.id for job in found}
+        return {
+            "jobs": [_job_state(job) for job in jobs],
+            "missing": [i for i in dict.fromkeys(ids) if i not in known],
+        }
+
+    jobs = qm.find_jobs(status, job_type, min(limit, JOBS_LIST_MAX))
+    return {"jobs": [_job_state(job) for job in jobs]}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, request: Request):
+    qm = request.app.state.queue
+    job = qm.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+
+    return _job_state(job)
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events: the job's state (as `GET /jobs/{job_id}`) now and after
+    every change, rate-limited by the queue; the stream ends once it finishes.
+    """
+    qm = request.app.state.queue
+    if not qm.get_job(job_id):
+        raise HTTPException(status_code=404, detail="job not found")
+
+    async def events():
+        async for job in qm.watch(job_id, idle_s=JOB_EVENTS_KEEPALIVE_S):
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = json.dumps(jsonable_encoder(_job_state(job)))
+            yield f"event: job\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Delivered as they happen, not buffered by caches or nginx
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, request: Request):
+    qm = request.app.state.queue
+    job = await qm.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+
+    if job.status in ("succeeded", "failed"):
+        raise HTTPException(status_code=409, detail="job already finished")
+
+    if job.status == "running" and not job.cancel.cancelled:
+        # Leased by a worker in another process
+        raise HTTPException(status_code=409, detail="job is running elsewhere")
+
+    # "cancelled", or "running" until the job reaches its next cancel check
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "message": job.message,
+    }
+
+
 @router.get("/jobs/{job_id}/result")
 def get_job_result(job_id: str, request: Request):
     qm = request.app.state.queue
-    job = qm.jobs.get(job_id)
+    job = qm.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
 
-    if job.status == "queued" or job.status == "running":
+    if job.status in ("queued", "running", "retrying"):
         raise HTTPException(status_code=409, detail="job not completed yet")
 
+    if job.status == "cancelled":
+        raise HTTPException(status_code=410, detail="job was cancelled")
+
     if job.status == "failed":
         raise HTTPException(
             status_code=500,
@@ -1,19 +1,19 @@
 from typing import Literal, Optional
 
-from app.search.unified_search import search_media
+from app.search.unified_search import search_media_async, search_stats
 from fastapi import APIRouter, Query
 
 router = APIRouter()
 
 
 @router.get("/search")
-def search(
+async def search(
     q: Optional[str] = None,
     top_k: int = Query(3, ge=1, le=50),
     ref_type: Optional[Literal["video", "transcription"]] = None,
     ref_id: Optional[int] = None,
 ):
-    results = search_media(
+    results = await search_media_async(
         query=q,
         top_k=top_k,
         ref_type=ref_type,
@@ -21,3 +21,9 @@ def search(
         exclude_self=True,
     )
     return {"results": results}
+
+
+@router.get("/search/stats")
+def get_search_stats():
+    """Cache hit/miss counters, query batching and index size."""
+    return search_stats()
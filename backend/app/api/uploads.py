@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from app.db import repository
+from app.processing.processor import pipeline_config_key, stored_result
+from app.queue.models import Job, JobType
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+log = logging.getLogger("uploads")
+
+UPLOAD_DIR = "uploads"
+# Bytes read from the request and written to disk per step
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Larger uploads are rejected with 413 (0 = no limit)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(2 * 1024**3)))
+
+# Most files + paths accepted by one batch request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+# Larger batch requests (all uploads together) are rejected with 413 (0 = no limit)
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(UPLOAD_MAX_BYTES)))
+# Batches may name files under this directory instead of uploading them (unset =
+# not allowed). They are processed in place and never deleted.
+BATCH_PATH_ROOT = os.getenv("BATCH_PATH_ROOT", "")
+
+# Allowance for multipart boundaries/headers when checking Content-Length
+_MULTIPART_OVERHEAD = 64 * 1024
+
+# Job type -> repository media type of the record it produces
+_MEDIA_TYPES = {"video": "video", "audio": "transcription"}
+
+UploadProgress = Callable[[int], None]  # bytes stored so far
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    sha256: str
+    size: int
+
+
+def _storage_path(filename: Optional[str]) -> str:
+    # Unique per upload, so concurrent same-name uploads never share a file;
+    # basename() also keeps client-supplied names from escaping UPLOAD_DIR
+    name = os.path.basename(filename or "") or "upload"
+    return os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{name}")
+
+
+def _too_large(detail: Optional[str] = None) -> HTTPException:
+    return HTTPException(
+        status_code=413, detail=detail or f"upload exceeds {UPLOAD_MAX_BYTES} bytes"
+    )
+
+
+def _body_limit(path: str) -> Optional[Tuple[int, str]]:
+    """Most request body bytes accepted on `path`, and the 413 detail."""
+    if path in ("/process/video", "/process/audio") and UPLOAD_MAX_BYTES:
+        return (
+            UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD,
+            f"upload exceeds {UPLOAD_MAX_BYTES} bytes",
+        )
+    if path == "/process/batch" and BATCH_MAX_BYTES:
+        return (
+            BATCH_MAX_BYTES + _MULTIPART_OVERHEAD,
+            f"batch exceeds {BATCH_MAX_BYTES} bytes",
+        )
+    return None
+
+
+class UploadLimitMiddleware:
+    """
+    Cap the request body of upload endpoints at UPLOAD_MAX_BYTES, and of batch
+    requests at BATCH_MAX_BYTES (plus multipart overhead), while it is received.
+
+    The multipart body is parsed, and each file spooled to a temporary file,
+    before a handler runs, so a check in the handler comes too late to limit the
+    bytes received or the temporary disk used. Requests are rejected with 413 up
+    front from Content-Length, or as soon as the body crosses the limit.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        bound = _body_limit(scope["path"]) if scope["type"] == "http" else None
+        if bound is None:
+            await self.app(scope, receive, send)
+            return
+        limit, detail = bound
+
+        headers = dict(scope["headers"])
+        try:
+            declared = int(headers.get(b"content-length", b""))
+        except ValueError:
+            declared = None
+        if declared is not None and declared > limit:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Aborts body parsing; FastAPI passes HTTPException through
+                    raise _too_large(detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _write_chunk(f: BinaryIO, digest, chunk: bytes) -> None:
+    # Hashing and the disk write both run off the event loop
+    digest.update(chunk)
+    f.write(chunk)
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(
+    file: UploadFile,
+    progress: Optional[UploadProgress] = None,
+) -> StoredUpload:
+    """
+    Stream an upload to a unique file under UPLOAD_DIR in UPLOAD_CHUNK_SIZE steps,
+    hashing it on the way. All blocking file I/O runs in worker threads.
+
+    By the time a handler runs, the framework has already received the whole
+    multipart body and spooled the file to a temporary file; the size of that is
+    bounded by UploadLimitMiddleware. Here a file over UPLOAD_MAX_BYTES raises
+    413 and the partial copy is removed.
+    """
+    path = _storage_path(file.filename)
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    size = 0
+
+    await asyncio.to_thread(os.makedirs, UPLOAD_DIR, exist_ok=True)
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if UPLOAD_MAX_BYTES and size > UPLOAD_MAX_BYTES:
+                raise _too_large()
+
+            await asyncio.to_thread(_write_chunk, f, digest, chunk)
+            if progress is not None:
+                progress(size)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(_discard, path)
+        raise
+
+    await asyncio.to_thread(f.close)
+    log.info(
+        "upload_stored path=%s bytes=%s elapsed_s=%.3f",
+        path,
+        size,
+        time.perf_counter() - start,
+    )
+    return StoredUpload(path=path, sha256=digest.hexdigest(), size=size)
+
+
+def _find_stored_result(db: Session, job_type: JobType, sha256: str) -> Optional[dict]:
+    # Blocking DB work; callers run it in a worker thread
+    record = repository.find_processed(
+        db, sha256, _MEDIA_TYPES[job_type], pipeline_config_key(job_type)
+    )
+    return stored_result(job_type, record) if record is not None else None
+
+
+def _find_stored_results(
+    db: Session, job_type: JobType, sha256s: List[str]
+) -> Dict[str, dict]:
+    # Blocking DB work; callers run it in a worker thread
+    records = repository.find_processed_many(
+        db, sha256s, _MEDIA_TYPES[job_type], pipeline_config_key(job_type)
+    )
+    return {
+        sha256: stored_result(job_type, record) for sha256, record in records.items()
+    }
+
+
+def _dedup_key(job_type: JobType, sha256: str) -> str:
+    return f"{job_type}:{sha256}:{pipeline_config_key(job_type)}"
+
+
+def _plan_job(
+    job_type: JobType,
+    payload: dict,
+    stored: Optional[dict],
+    qm,
+    priority: int = 0,
+) -> Tuple[Job, str]:
+    """
+    The job for stored content and how it came about: "deduplicated" (a finished
+    job carrying `stored`, the result of an earlier run with the current
+    pipeline settings), "coalesced" (the job already queued or running for the
+    same content), or "created" (a new job, not enqueued yet). Call
+    `qm.refresh_inflight` for its dedup key first.
+    """
+    if stored is not None:
+        job = qm.create_job(
+            Job(
+                type=job_type,
+                payload=payload,
+                status="succeeded",
+                progress=100,
+                message="Completed (already processed)",
+                result=stored,
+            )
+        )
+        return job, "deduplicated"
+
+    new_job = Job(
+        type=job_type,
+        payload=payload,
+        priority=priority,
+        dedup_key=_dedup_key(job_type, payload["sha256"]),
+    )
+    job = qm.create_job(new_job)
+    return job, "created" if job is new_job else "coalesced"
+
+
+def _submission(job: Job, how: str) -> dict:
+    if how == "deduplicated":
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "deduplicated": True,
+            "result": job.result,
+        }
+    if how == "coalesced":
+        return {"job_id": job.id, "status": job.status, "coalesced": True}
+    return {"job_id": job.id, "status": "queued"}
+
+
+async def submit_upload(
+    job_type: JobType,
+    file: UploadFile,
+    db: Session,
+    request: Request,
+    response: Response,
+    priority: int = 0,
+) -> dict:
+    """
+    Store an upload and queue a job for it, unless identical content was already
+    processed with the current pipeline settings (the stored result is returned)
+    or is being processed right now (the running job is returned). Higher
+    `priority` jobs run first among queued jobs of the same type.
+    """
+    upload = await save_upload(file)
+    payload = {
+        "file_path": upload.path,
+        "filename": file.filename,
+        "sha256": upload.sha256,
+    }
+    qm = request.app.state.queue
+
+    stored = await asyncio.to_thread(_find_stored_result, db, job_type, upload.sha256)
+    # Another API process may have finished the job this would coalesce into
+    await qm.refresh_inflight([_dedup_key(job_type, upload.sha256)])
+    job, how = _plan_job(job_type, payload, stored, qm, priority)
+    if how == "created":
+        await qm.enqueue(job.id)
+    else:
+        # The stored result or the running job is all we need; the new copy is
+        # never read
+        await asyncio.to_thread(_discard, upload.path)
+    if how == "deduplicated":
+        response.status_code = 200
+    return _submission(job, how)
+
+
+def _resolve_server_path(path: str) -> str:
+    """
+    `path` as an absolute real path, if it is a regular file under
+    BATCH_PATH_ROOT. Raises ValueError otherwise.
+    """
+    root = os.path.realpath(BATCH_PATH_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    # realpath() resolves symlinks and "..", so nothing can point outside root
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError("outside the allowed directory")
+    if not os.path.isfile(resolved):
+        raise ValueError("not a file")
+    return resolved
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def submit_batch(
+    job_type: JobType,
+    files: List[UploadFile],
+    paths: List[str],
+    db: Session,
+    request: Request,
+    priority: int = 0,
+) -> dict:
+    """
+    Queue one job per uploaded file and per server-side path (relative to, or
+    inside, BATCH_PATH_ROOT). Each item is deduplicated and coalesced like a
+    single upload; all new jobs are enqueued in one transaction.
+
+    Raises 413 for more than BATCH_MAX_ITEMS items and 400 if any path is not
+    allowed, before anything is stored. If any upload fails (e.g. one over
+    UPLOAD_MAX_BYTES), the files already stored are removed and nothing is
+    queued.
+    """
+    if not files and not paths:
+        raise HTTPException(status_code=400, detail="no files or paths given")
+    if len(files) + len(paths) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"batch exceeds {BATCH_MAX_ITEMS} items"
+        )
+    if paths and not BATCH_PATH_ROOT:
+        raise HTTPException(status_code=403, detail="server-side paths are disabled")
+
+    resolved, invalid = [], []
+    for path in paths:
+        try:
+            resolved.append(await asyncio.to_thread(_resolve_server_path, path))
+        except ValueError as e:
+            invalid.append({"path": path, "error": str(e)})
+    if invalid:
+        raise HTTPException(status_code=400, detail={"invalid_paths": invalid})
+
+    # (payload, whether the file is our own copy)
+    items = []
+    try:
+        for file in files:
+            upload = await save_upload(file)
+            items.append(
+                (
+                    {
+                        "file_path": upload.path,
+                        "filename": file.filename,
+                        "sha256": upload.sha256,
+                    },
+                    True,
+                )
+            )
+    except BaseException:
+        # A later file failed (e.g. 413); nothing was queued, so drop the copies
+        # already stored
+        for payload, _ in items:
+            await asyncio.to_thread(_discard, payload["file_path"])
+        raise
+    digests = await asyncio.gather(
+        *(asyncio.to_thread(_hash_file, path) for path in resolved)
+    )
+    for path, sha256 in zip(resolved, digests):
+        payload = {
+            "file_path": path,
+            "filename": os.path.basename(path),
+            "sha256": sha256,
+        }
+        items.append((payload, False))
+
+    qm = request.app.state.queue
+    results, created = [], []
+    hashes = [payload["sha256"] for payload, _ in items]
+    stored = await asyncio.to_thread(_find_stored_results, db, job_type, hashes)
+    await qm.refresh_inflight([_dedup_key(job_type, sha256) for sha256 in hashes])
+    for payload, owned in items:
+        job, how = _plan_job(
+            job_type, payload, stored.get(payload["sha256"]), qm, priority
+        )
+        if how == "created":
+            created.append(job.id)
+        elif owned:
+            await asyncio.to_thread(_discard, payload["file_path"])
+        results.append({"filename": payload["filename"], **_submission(job, how)})
+    if created:
+        await qm.enqueue(*created)
+
+    log.info(
+        "batch_submitted type=%s items=%s queued=%s", job_type, len(items), len(created)
+    )
+    return {"jobs": results, "queued": len(created)}
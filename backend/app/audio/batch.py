@@ -0,0 +1,57 @@
+from typing import List
+
+import numpy as np
+from app.audio.stream import SAMPLE_RATE
+
+# Whisper's fixed input window; clips up to this long fit in one batch row
+BATCH_CLIP_S = 30.0
+
+# Same silence heuristic as whisper.transcribe()
+_NO_SPEECH_PROB = 0.6
+_LOGPROB_THRESHOLD = -1.0
+
+
+def transcribe_batch(model, clips: List[np.ndarray]) -> List[dict]:
+    """
+    Transcribe several clips of at most `BATCH_CLIP_S` seconds with one batched
+    encoder/decoder pass.
+
+    Returns one result per clip in the shape of `model.transcribe()`, with the
+    whole clip as a single segment (batched decoding runs without timestamps).
+    """
+    import torch
+    import whisper
+
+    mels = torch.stack(
+        [
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(clip), model.dims.n_mels)
+            for clip in clips
+        ]
+    ).to(model.device)
+
+    options = whisper.DecodingOptions(
+        without_timestamps=True, fp16=model.device.type == "cuda"
+    )
+    decoded = whisper.decode(model, mels, options)
+
+    results = []
+    for clip, r in zip(clips, decoded):
+        if r.no_speech_prob > _NO_SPEECH_PROB and r.avg_logprob < _LOGPROB_THRESHOLD:
+            results.append({"text": "", "segments": []})
+            continue
+
+        text = r.text.strip()
+        results.append(
+            {
+                "text": text,
+                "segments": [
+                    {
+                        "start": 0.0,
+                        "end": len(clip) / SAMPLE_RATE,
+                        "text": text,
+                        "avg_logprob": r.avg_logprob,
+                    }
+                ],
+            }
+        )
+    return results
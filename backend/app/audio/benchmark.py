@@ -0,0 +1,54 @@
+"""
+Benchmark batched Whisper decoding: clips/second at several batch sizes.
+
+    python -m app.audio.benchmark clip1.wav clip2.mp3 ... [--clips 32]
+
+The given files are decoded once (first 30 s of each) and cycled to build
+`--clips` inputs; every batch size transcribes the same inputs.
+"""
+
+import argparse
+import itertools
+import time
+
+from app.audio.batch import BATCH_CLIP_S, transcribe_batch
+from app.audio.stream import SAMPLE_RATE, open_pcm_stream, read_pcm
+from app.audio.transcribe import peak_normalize
+from app.ml.registry import get_whisper_model
+
+
+def _load_clip(path: str):
+    with open_pcm_stream(path) as stream:
+        samples = read_pcm(stream)[: int(BATCH_CLIP_S * SAMPLE_RATE)]
+    return peak_normalize(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="+", help="audio files to use as clips")
+    parser.add_argument("--clips", type=int, default=32)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16], metavar="N"
+    )
+    args = parser.parse_args()
+
+    sources = [_load_clip(path) for path in args.files]
+    clips = list(itertools.islice(itertools.cycle(sources), args.clips))
+    model = get_whisper_model()
+
+    # The first pass pays for lazy initialisation (kernels, caches)
+    transcribe_batch(model, clips[:1])
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(clips), batch_size):
+            transcribe_batch(model, clips[i : i + batch_size])
+        elapsed = time.perf_counter() - start
+        print(
+            f"batch_size={batch_size:<3} clips={len(clips)} "
+            f"elapsed_s={elapsed:.2f} clips_per_s={len(clips) / elapsed:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
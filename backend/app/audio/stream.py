@@ -0,0 +1,147 @@
+import subprocess
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Whisper's native input format: float32 mono PCM at 16 kHz
+SAMPLE_RATE = 16000
+_SAMPLE_BYTES = np.dtype(np.float32).itemsize
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Container duration in seconds via ffprobe, or None if it cannot be read."""
+    try:
+        out = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "default=noprint_wrappers=1:nokey=1",
+                path,
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        return float(out.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+@contextmanager
+def open_pcm_stream(path: str, sample_rate: int = SAMPLE_RATE) -> Iterator[BinaryIO]:
+    """
+    Decode and resample any ffmpeg-readable file to raw float32 mono PCM, streamed
+    through a pipe so the decoded audio never has to be held in memory at once.
+    """
+    proc = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-v",
+            "error",
+            "-i",
+            path,
+            "-f",
+            "f32le",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        yield proc.stdout
+        proc.stdout.close()
+        # With -v error, stderr only carries a few lines and cannot fill the pipe
+        stderr = proc.stderr.read().decode(errors="replace").strip()
+        if proc.wait() != 0:
+            raise RuntimeError(f"Cannot decode audio: {path}: {stderr}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def _fill(stream: BinaryIO, buf: np.ndarray, start: int) -> int:
+    """Read samples into buf[start:] until full or EOF; returns samples in buf."""
+    view = memoryview(buf).cast("B")
+    pos = start * _SAMPLE_BYTES
+    while pos < len(view):
+        # Pipes return short reads; keep going until EOF
+        n = stream.readinto(view[pos:])
+        if not n:
+            break
+        pos += n
+    # A trailing partial sample can only occur at EOF; drop it
+    return pos // _SAMPLE_BYTES
+
+
+def read_pcm(
+    stream: BinaryIO,
+    expected_s: Optional[float] = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> np.ndarray:
+    """
+    Read a whole PCM stream into one writable float32 array.
+
+    The pipe is read straight into the array, so there is no intermediate bytes
+    copy. With the expected duration (e.g. from `probe_duration`) the array is
+    allocated once; otherwise, or if the estimate was short, it grows geometrically.
+    """
+    capacity = int((expected_s or 30.0) * sample_rate) + sample_rate
+    buf = np.empty(capacity, dtype=np.float32)
+    filled = 0
+
+    while True:
+        filled = _fill(stream, buf, filled)
+        if filled < len(buf):
+            return buf[:filled]
+
+        grown = np.empty(len(buf) * 2, dtype=np.float32)
+        grown[:filled] = buf
+        buf = grown
+
+
+def iter_windows(
+    stream: BinaryIO,
+    window_s: float = 30.0,
+    overlap_s: float = 2.0,
+    sample_rate: int = SAMPLE_RATE,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yield (start_seconds, samples) windows of float32 PCM read from `stream`.
+
+    Consecutive windows share `overlap_s` seconds. A single buffer of one window is
+    reused for the whole stream, so memory does not grow with duration; the yielded
+    array is a view into it and is only valid until the next iteration.
+    """
+    window = int(window_s * sample_rate)
+    overlap = int(overlap_s * sample_rate)
+    if not 0 <= overlap < window:
+        raise ValueError("overlap must be shorter than the window")
+    hop = window - overlap
+
+    buf = np.empty(window, dtype=np.float32)
+    filled = _fill(stream, buf, 0)
+    start = 0
+
+    while filled:
+        yield start / sample_rate, buf[:filled]
+        if filled < window:
+            return
+
+        # Carry the overlap over to the front of the next window
+        buf[:overlap] = buf[hop:]
+        start += hop
+        filled = _fill(stream, buf, overlap)
+        if filled == overlap:
+            # Nothing new after the overlap: the tail was already covered
+            return
@@ -0,0 +1,89 @@
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from app.audio.stream import SAMPLE_RATE
+
+# Audio peaking below this (-50 dBFS) is left as is: boosting a noise floor to
+# full scale makes Whisper hallucinate text
+MIN_NORMALIZE_PEAK = 10 ** (-50 / 20)
+
+
+def to_segments(result: dict, offset_s: float = 0.0) -> List[dict]:
+    """Map Whisper result segments to stored segments, shifted by `offset_s`."""
+    return [
+        {
+            "start": offset_s + seg.get("start", 0.0),
+            "end": offset_s + seg.get("end", 0.0),
+            "text": seg.get("text", ""),
+            # avg_logprob is commonly present; keep it as “confidence-like”
+            "confidence": seg.get("avg_logprob", 1.0),
+        }
+        for seg in result.get("segments", [])
+    ]
+
+
+def peak_normalize(
+    samples: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    peak: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Scale so that `peak` (default: the loudest sample) becomes 1.0 (0 dBFS).
+    Near-silent audio (peak below MIN_NORMALIZE_PEAK) is returned unchanged.
+
+    Pass `out=samples` to normalize in place instead of allocating a new array.
+    """
+    if peak is None:
+        peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak < MIN_NORMALIZE_PEAK:
+        return samples
+    return np.multiply(samples, np.float32(1.0 / peak), out=out)
+
+
+def transcribe_windows(
+    transcribe: Callable[[np.ndarray, float], dict],
+    windows: Iterable[Tuple[float, np.ndarray]],
+    overlap_s: float,
+    on_window: Optional[Callable[[float], None]] = None,
+    sample_rate: int = SAMPLE_RATE,
+    check_cancelled: Optional[Callable[[], None]] = None,
+) -> Tuple[str, List[dict]]:
+    """
+    Transcribe overlapping (start_seconds, samples) windows one at a time and
+    stitch the segments onto the original timeline.
+
+    Inside an overlap both windows see the same audio. Segments are split at the
+    middle of it: everything starting before the midpoint comes from the earlier
+    window, everything after from the later one, so each window keeps half the
+    overlap as context and no segment is reported twice.
+
+    `transcribe(samples, peak)` gets each window as decoded, plus the running
+    peak of the audio so far to normalize it with (see `peak_normalize`). One
+    gain for all windows keeps a quiet or silent window from being boosted to
+    full scale, and voice activity detection can run on the unscaled samples.
+    `on_window` is called with the end time of every transcribed window;
+    `check_cancelled` before each window is transcribed, raising to abort.
+    """
+    segments: List[dict] = []
+    peak = 0.0
+
+    for start_s, samples in windows:
+        if check_cancelled is not None:
+            check_cancelled()
+        if len(samples):
+            peak = max(peak, float(np.max(np.abs(samples))))
+        result = transcribe(samples, peak)
+        window_segments = to_segments(result, start_s)
+
+        if start_s > 0:
+            cut = start_s + overlap_s / 2
+            while segments and segments[-1]["start"] >= cut:
+                segments.pop()
+            window_segments = [s for s in window_segments if s["start"] >= cut]
+
+        segments.extend(window_segments)
+        if on_window is not None:
+            on_window(start_s + len(samples) / sample_rate)
+
+    text = "".join(s["text"] for s in segments).strip()
+    return text, segments
@@ -0,0 +1,140 @@
+from typing import Callable, List, Tuple
+
+import numpy as np
+from app.audio.stream import SAMPLE_RATE
+
+Region = Tuple[int, int]  # [start, end) in samples
+
+# Frame RMS above this level (dBFS of the audio as decoded, before any
+# normalization) always counts as speech
+DEFAULT_THRESHOLD_DB = -40.0
+# Quieter frames count as speech when they are this far above the clip's noise
+# floor (the level of its quietest NOISE_FLOOR_PERCENTILE % of frames), so quiet
+# but clean recordings are kept while audio that is all noise is not
+DEFAULT_MARGIN_DB = 12.0
+NOISE_FLOOR_PERCENTILE = 10
+# Frames below this level are never speech (e.g. dither over digital silence)
+MIN_SPEECH_DB = -70.0
+FRAME_MS = 30
+# Speech regions are widened by this much on each side so word onsets/tails survive
+PAD_MS = 200
+# Silences shorter than this between two speech regions are kept
+MIN_GAP_MS = 500
+
+
+def speech_regions(
+    samples: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    threshold_db: float = DEFAULT_THRESHOLD_DB,
+    margin_db: float = DEFAULT_MARGIN_DB,
+    frame_ms: int = FRAME_MS,
+    pad_ms: int = PAD_MS,
+    min_gap_ms: int = MIN_GAP_MS,
+) -> List[Region]:
+    """
+    Energy-based voice activity detection over the whole sample array at once.
+
+    Returns the sample ranges that contain speech, padded and with short gaps
+    merged; an empty list means the audio is silent.
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n_full = len(samples) // frame
+
+    # Per-frame mean power in one pass over a (frames, frame) view, no copy
+    full = samples[: n_full * frame].reshape(n_full, frame)
+    power = np.einsum("ij,ij->i", full, full) / frame
+    if len(samples) > n_full * frame:
+        tail = samples[n_full * frame :]
+        power = np.append(power, np.dot(tail, tail) / frame)
+
+    n_frames = len(power)
+    if n_frames == 0:
+        return []
+    level = 10 * np.log10(power + 1e-12)
+    floor = np.percentile(level, NOISE_FLOOR_PERCENTILE)
+    active = (level > threshold_db) | (
+        (level > floor + margin_db) & (level > MIN_SPEECH_DB)
+    )
+
+    # Dilate by the padding: a frame is speech if any frame within `pad` is
+    pad = pad_ms // frame_ms
+    counts = np.concatenate(([0], np.cumsum(active)))
+    idx = np.arange(n_frames)
+    hi = np.minimum(idx + pad + 1, n_frames)
+    lo = np.maximum(idx - pad, 0)
+    speech = (counts[hi] - counts[lo]) > 0
+
+    edges = np.diff(speech.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+
+    # Merge regions separated by short silences
+    keep = (starts[1:] - ends[:-1]) * frame_ms >= min_gap_ms
+    starts = np.concatenate((starts[:1], starts[1:][keep]))
+    ends = np.concatenate((ends[:-1][keep], ends[-1:]))
+
+    return [
+        (int(s) * frame, min(int(e) * frame, len(samples)))
+        for s, e in zip(starts, ends)
+    ]
+
+
+class Timeline:
+    """
+    Maps times in the speech-only audio (regions concatenated) back to the
+    original audio.
+    """
+
+    def __init__(self, regions: List[Region], sample_rate: int = SAMPLE_RATE):
+        self.regions = regions
+        self.sample_rate = sample_rate
+        lengths = np.array([e - s for s, e in regions], dtype=np.int64)
+        # Start of each region in the compact and in the original timeline (s)
+        self._compact = np.concatenate(([0], np.cumsum(lengths)[:-1])) / sample_rate
+        self._original = np.array([s for s, _ in regions]) / sample_rate
+
+    def compact(self, samples: np.ndarray) -> np.ndarray:
+        """Speech-only audio; returned as is when it is all speech."""
+        if len(self.regions) == 1 and self.regions[0] == (0, len(samples)):
+            return samples
+        return np.concatenate([samples[s:e] for s, e in self.regions])
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        # An end time on a region boundary belongs to the earlier region
+        side = "left" if end else "right"
+        i = max(int(np.searchsorted(self._compact, t, side=side)) - 1, 0)
+        return float(self._original[i] + (t - self._compact[i]))
+
+    def remap(self, result: dict) -> dict:
+        """Copy of a Whisper result with segment times on the original timeline."""
+        segments = [
+            {
+                **seg,
+                "start": self.to_original(seg.get("start", 0.0)),
+                "end": self.to_original(seg.get("end", 0.0), end=True),
+            }
+            for seg in result.get("segments", [])
+        ]
+        return {**result, "segments": segments}
+
+
+def transcribe_speech(
+    transcribe: Callable[[np.ndarray], dict],
+    samples: np.ndarray,
+    threshold_db: float = DEFAULT_THRESHOLD_DB,
+    margin_db: float = DEFAULT_MARGIN_DB,
+    sample_rate: int = SAMPLE_RATE,
+) -> dict:
+    """
+    Run `transcribe` on the speech regions of `samples` only, with segment
+    timestamps mapped back onto `samples`' timeline. Silent audio never reaches
+    the model.
+    """
+    regions = speech_regions(samples, sample_rate, threshold_db, margin_db)
+    if not regions:
+        return {"text": "", "segments": []}
+
+    timeline = Timeline(regions, sample_rate)
+    return timeline.remap(transcribe(timeline.compact(samples)))
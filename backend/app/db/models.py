@@ -1,7 +1,18 @@
 from datetime import UTC, datetime
 
 from app.db.database import Base
-from sqlalchemy import JSON, Column, DateTime, Integer, LargeBinary, String, Text
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+)
 
 
 class Video(Base):
@@ -25,3 +36,48 @@ class Transcription(Base):
     timestamps = Column(JSON)
     embedding = Column(LargeBinary, nullable=True)
     created_at = Column(DateTime, default=datetime.now(UTC))
+
+
+class MediaHash(Base):
+    """Content hash of an upload -> the record its processing produced."""
+
+    __tablename__ = "media_hashes"
+    __table_args__ = (UniqueConstraint("sha256", "media_type", "config_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False)
+    media_type = Column(String, nullable=False)  # "video" | "transcription"
+    # Digest of the pipeline settings the record was produced with
+    config_key = Column(String, nullable=False)
+    record_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now(UTC))
+
+
+class QueueJob(Base):
+    """Durable copy of a queue job (see app.queue.store)."""
+
+    __tablename__ = "queue_jobs"
+    __table_args__ = (
+        # Claims scan ready jobs in order; retention deletes old finished ones
+        Index("ix_queue_jobs_claim", "status", "type", "priority", "available_at"),
+        Index("ix_queue_jobs_retention", "status", "updated_at"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False)
+    progress = Column(Integer, nullable=False, default=0)
+    message = Column(String)
+    attempt = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    last_error = Column(Text)
+    result = Column(JSON)
+    dedup_key = Column(String)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    # Epoch seconds. NULL until enqueued; claimable once it has passed
+    available_at = Column(Float)
+    # Epoch seconds. A running job whose lease has passed is claimable again
+    lease_until = Column(Float)
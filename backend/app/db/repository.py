@@ -1,7 +1,13 @@
+from typing import Dict, Iterable, Optional, Union
+
 import numpy as np
 from app.db import models
+from app.search.index import vector_index
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+_RECORD_MODELS = {"video": models.Video, "transcription": models.Transcription}
+
 
 def save_video(
     db,
@@ -21,6 +27,7 @@ def save_video(
     db.add(video)
     db.commit()
     db.refresh(video)
+    vector_index.add("video", video.id, embedding)
     return video
 
 
@@ -33,9 +40,82 @@ def save_transcription(
     db.add(transcription)
     db.commit()
     db.refresh(transcription)
+    vector_index.add("transcription", transcription.id, embedding)
     return transcription
 
 
+def find_processed(
+    db: Session, sha256: str, media_type: str, config_key: str
+) -> Optional[Union[models.Video, models.Transcription]]:
+    """The stored result for identical content and pipeline settings, if any."""
+    link = (
+        db.query(models.MediaHash)
+        .filter_by(sha256=sha256, media_type=media_type, config_key=config_key)
+        .one_or_none()
+    )
+    if link is None:
+        return None
+    return db.get(_RECORD_MODELS[media_type], link.record_id)
+
+
+def find_processed_many(
+    db: Session, sha256s: Iterable[str], media_type: str, config_key: str
+) -> Dict[str, Union[models.Video, models.Transcription]]:
+    """find_processed() for many hashes in two queries, keyed by sha256."""
+    links = (
+        db.query(models.MediaHash)
+        .filter(
+            models.MediaHash.sha256.in_(set(sha256s)),
+            models.MediaHash.media_type == media_type,
+            models.MediaHash.config_key == config_key,
+        )
+        .all()
+    )
+    if not links:
+        return {}
+    model = _RECORD_MODELS[media_type]
+    records = {
+        record.id: record
+        for record in db.query(model).filter(
+            model.id.in_({link.record_id for link in links})
+        )
+    }
+    # Links whose record no longer exists count as not processed
+    return {
+        link.sha256: records[link.record_id]
+        for link in links
+        if link.record_id in records
+    }
+
+
+def save_media_hash(
+    db: Session, sha256: str, media_type: str, config_key: str, record_id: int
+) -> None:
+    link = (
+        db.query(models.MediaHash)
+        .filter_by(sha256=sha256, media_type=media_type, config_key=config_key)
+        .one_or_none()
+    )
+    if link is None:
+        db.add(
+            models.MediaHash(
+                sha256=sha256,
+                media_type=media_type,
+                config_key=config_key,
+                record_id=record_id,
+            )
+        )
+    else:
+        # Only reprocessed when the linked record no longer exists
+        link.record_id = record_id
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker recorded the same content first; either record is valid
+        db.rollback()
+
+
 def get_videos(db: Session):
     records = db.query(models.Video).all()
     result = []
@@ -0,0 +1,131 @@
+import contextlib
+import logging
+import threading
+import time
+from typing import Callable, Generic, Iterator, List, Optional, TypeVar
+
+log = logging.getLogger("models")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _Request(Generic[T, R]):
+    __slots__ = ("item", "done", "result", "error")
+
+    def __init__(self, item: T) -> None:
+        self.item = item
+        self.done = threading.Event()
+        self.result: Optional[R] = None
+        self.error: Optional[BaseException] = None
+
+
+class ThreadBatcher(Generic[T, R]):
+    """
+    Model-call batching shared by every job thread in the process.
+
+    `submit` blocks the calling job until its item has been processed. A background
+    thread collects pending items and hands them to `process` as one list once
+    `max_batch` items are waiting or the first one has waited `max_latency_ms`.
+    `process` must return one result per item, in order; if it raises, every job in
+    the batch gets the exception.
+
+    Jobs that may submit register with `caller()`. While any are registered, a
+    batch is also flushed as soon as every registered job is waiting on it: when
+    no other submitter can arrive, waiting for company only adds latency.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[T]], List[R]],
+        max_batch: int,
+        max_latency_ms: float,
+        name: str = "batcher",
+    ) -> None:
+        self._process = process
+        self.max_batch = max(1, max_batch)
+        self.max_latency_s = max_latency_ms / 1000.0
+        self.name = name
+        self._pending: List[_Request[T, R]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Jobs registered through caller()
+        self._callers = 0
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: T) -> R:
+        request: _Request[T, R] = _Request(item)
+        with self._cond:
+            if self._thread is None:
+                # Started lazily so importing the module stays side-effect free
+                self._thread = threading.Thread(
+                    target=self._loop, name=self.name, daemon=True
+                )
+                self._thread.start()
+            self._pending.append(request)
+            self._cond.notify()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    @contextlib.contextmanager
+    def caller(self) -> Iterator[None]:
+        """Register the calling job as a possible submitter while it runs."""
+        with self._cond:
+            self._callers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._callers -= 1
+                # The jobs still registered may all be waiting now
+                self._cond.notify()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2)
+            if self.batches
+            else 0.0,
+        }
+
+    def _next_batch(self) -> List[_Request[T, R]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = time.monotonic() + self.max_latency_s
+            while len(self._pending) < self.max_batch:
+                if 0 < self._callers <= len(self._pending):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            self.batches += 1
+            self.items += len(batch)
+
+            try:
+                results = self._process([r.item for r in batch])
+            except Exception as e:
+                log.exception("batch_failed name=%s size=%s", self.name, len(batch))
+                for r in batch:
+                    r.error = e
+                    r.done.set()
+                continue
+
+            for r, result in zip(batch, results):
+                r.result = result
+                r.done.set()
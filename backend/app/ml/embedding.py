@@ -0,0 +1,33 @@
+import os
+from typing import Sequence
+
+import numpy as np
+from app.ml.batching import ThreadBatcher
+from app.ml.registry import get_embedding_model
+
+# Texts from concurrently finishing jobs are encoded together, up to this many...
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# ...waiting at most this long for company once the first text arrives
+EMBEDDING_BATCH_MAX_LATENCY_MS = float(
+    os.getenv("EMBEDDING_BATCH_MAX_LATENCY_MS", "20")
+)
+
+
+def encode_texts(texts: Sequence[str]) -> np.ndarray:
+    """Encode texts with one model call; returns a float32 (n, dim) matrix."""
+    encoded = np.asarray(get_embedding_model().encode(list(texts)), dtype=np.float32)
+    return encoded.reshape(len(texts), -1)
+
+
+# Embedding stage shared by video and audio jobs
+embedding_batcher: ThreadBatcher[str, np.ndarray] = ThreadBatcher(
+    encode_texts,
+    max_batch=EMBEDDING_BATCH_SIZE,
+    max_latency_ms=EMBEDDING_BATCH_MAX_LATENCY_MS,
+    name="embedding-batcher",
+)
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Embed one text through the shared batching stage (float32 vector)."""
+    return embedding_batcher.submit(text)
@@ -0,0 +1,129 @@
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+log = logging.getLogger("models")
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+WHISPER_MODEL_NAME = "tiny"
+
+Loader = Callable[[], Any]
+
+
+@dataclass
+class ModelInfo:
+    name: str
+    loaded: bool = False
+    load_time_s: Optional[float] = None
+    # Process RSS growth while loading; approximate, but loads are serialized.
+    # None where RSS cannot be read (e.g. Windows)
+    rss_delta_mb: Optional[float] = None
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return None
+    # Peak RSS where /proc is unavailable (bytes on macOS, kB elsewhere)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ModelRegistry:
+    """
+    Process-wide registry that loads each model once, lazily, on first use.
+    """
+
+    def __init__(self) -> None:
+        self._loaders: Dict[str, Loader] = {}
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, ModelInfo] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Loader) -> None:
+        self._loaders[name] = loader
+        self._info.setdefault(name, ModelInfo(name=name))
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            if name in self._models:
+                return self._models[name]
+
+            loader = self._loaders[name]
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+
+            model = loader()
+
+            info = self._info[name]
+            info.loaded = True
+            info.load_time_s = round(time.perf_counter() - start, 3)
+            rss_after = _rss_bytes()
+            if rss_before is not None and rss_after is not None:
+                info.rss_delta_mb = round((rss_after - rss_before) / 2**20, 1)
+            self._models[name] = model
+
+            log.info(
+                "model_loaded name=%s load_time_s=%.3f rss_delta_mb=%s",
+                name,
+                info.load_time_s,
+                info.rss_delta_mb,
+            )
+            return model
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> None:
+        """Load the given models (default: all registered) ahead of first use."""
+        for name in names if names is not None else list(self._loaders):
+            try:
+                self.get(name)
+            except Exception:
+                # A missing model should not take the service down; first use
+                # will raise again with the real error
+                log.exception("model_warmup_failed name=%s", name)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: asdict(info) for name, info in self._info.items()}
+
+
+def _load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def _load_whisper_model():
+    import whisper
+
+    return whisper.load_model(WHISPER_MODEL_NAME)
+
+
+registry = ModelRegistry()
+registry.register("embedding", _load_embedding_model)
+registry.register("whisper", _load_whisper_model)
+
+
+def get_embedding_model():
+    """Shared sentence-transformers model used for video, audio and search."""
+    return registry.get("embedding")
+
+
+def get_whisper_model():
+    return registry.get("whisper")
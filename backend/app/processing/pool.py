@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.queue.cancel import CancelCheck, CancelToken
+from app.queue.models import Job
+
+log = logging.getLogger("processing")
+
+ProgressCallback = Callable[[int, str], None]
+Initializer = Callable[[str], None]
+Runner = Callable[[str, Dict[str, Any], ProgressCallback, CancelCheck], dict]
+
+PROGRESS_DRAIN_TIMEOUT_S = 1.0
+
+# Set inside each worker process by _worker_init
+_runner: Optional[Runner] = None
+_progress_queue = None
+# Shared dict proxy: ids of jobs the parent cancelled
+_cancelled = None
+
+
+def _worker_init(
+    job_type: str,
+    initializer: Initializer,
+    runner: Runner,
+    progress_queue,
+    cancelled,
+) -> None:
+    global _runner, _progress_queue, _cancelled
+
+    _runner = runner
+    _progress_queue = progress_queue
+    _cancelled = cancelled
+
+    initializer(job_type)
+    log.info("pool_worker_ready type=%s", job_type)
+
+
+def _worker_run(
+    job_id: str, job_type: str, payload: Dict[str, Any], deadline: Optional[float]
+) -> dict:
+    def progress(value: int, message: str) -> None:
+        _progress_queue.put((job_id, value, message))
+
+    # The deadline is checked locally; cancellation is polled from the parent
+    token = CancelToken(deadline, is_cancelled=lambda: job_id in _cancelled)
+    try:
+        return _runner(job_type, payload, progress, token.check)
+    finally:
+        # End-of-job marker: everything before it has been queued for the parent
+        _progress_queue.put((job_id, None, None))
+
+
+class ProcessWorkerPool:
+    """
+    One process pool per job type.
+
+    Worker processes run `initializer(job_type)` once at startup (e.g. to load
+    models) and afterwards only receive job payloads. Progress reported by
+    `runner` in a worker is applied to the parent `Job`, and cancelling the
+    parent job's token is seen by the worker's `check_cancelled`.
+    """
+
+    def __init__(
+        self,
+        worker_counts: Dict[str, int],
+        initializer: Initializer,
+        runner: Runner,
+    ) -> None:
+        self.worker_counts = {t: n for t, n in worker_counts.items() if n > 0}
+        self._initializer = initializer
+        self._runner = runner
+        # spawn: torch/OpenCV thread pools are not fork-safe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._progress_queue = self._ctx.Queue()
+        self._executors: Dict[str, ProcessPoolExecutor] = {}
+        self._jobs: Dict[str, Tuple[Job, asyncio.Event]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[threading.Thread] = None
+        self._manager = None
+        self._cancelled = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._manager = self._ctx.Manager()
+        self._cancelled = self._manager.dict()
+
+        for job_type, count in self.worker_counts.items():
+            log.info("pool_started type=%s workers=%s", job_type, count)
+
+            self._executors[job_type] = ProcessPoolExecutor(
+                max_workers=count,
+                mp_context=self._ctx,
+                initializer=_worker_init,
+                initargs=(
+                    job_type,
+                    self._initializer,
+                    self._runner,
+                    self._progress_queue,
+                    self._cancelled,
+                ),
+            )
+
+        self._listener = threading.Thread(
+            target=self._listen_progress, name="pool-progress", daemon=True
+        )
+        self._listener.start()
+
+    def handles(self, job_type: str) -> bool:
+        return job_type in self._executors
+
+    async def run(self, job: Job) -> dict:
+        executor = self._executors[job.type]
+        drained = asyncio.Event()
+
+        self._jobs[job.id] = (job, drained)
+        job.cancel.on_cancel(lambda: self._cancelled.__setitem__(job.id, True))
+        future = executor.submit(
+            _worker_run, job.id, job.type, job.payload, job.cancel.deadline
+        )
+        try:
+            return await asyncio.wrap_future(future, loop=self._loop)
+        finally:
+            if future.done() or future.cancel():
+                # Finished, or never started; otherwise the run was abandoned
+                # while the worker still runs it, and the flag must stay until its
+                # end marker arrives so it stops at its next check
+                self._cancelled.pop(job.id, None)
+            # Apply progress still in flight before the caller moves the job on;
+            # bounded in case the worker died without sending its end marker
+            try:
+                await asyncio.wait_for(drained.wait(), timeout=PROGRESS_DRAIN_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                pass
+            self._jobs.pop(job.id, None)
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors.clear()
+
+        if self._listener is not None:
+            self._progress_queue.put(None)
+            self._listener.join(timeout=5)
+            self._listener = None
+
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _listen_progress(self) -> None:
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._apply_progress, *item)
+
+    def _apply_progress(
+        self, job_id: str, value: Optional[int], message: Optional[str]
+    ) -> None:
+        if value is None:
+            # The worker is done with the job, even one the parent abandoned
+            self._cancelled.pop(job_id, None)
+
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return
+
+        job, drained = entry
+        if value is None:
+            drained.set()
+            return
+
+        job.progress = value
+        job.message = message
+        job.touch()
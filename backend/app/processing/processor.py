@@ -1,30 +1,172 @@
 import asyncio
-import io
+import hashlib
+import json
 import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
-import whisper
+from app.audio.batch import BATCH_CLIP_S, transcribe_batch
+from app.audio.stream import (
+    SAMPLE_RATE,
+    iter_windows,
+    open_pcm_stream,
+    probe_duration,
+    read_pcm,
+)
+from app.audio.transcribe import peak_normalize, to_segments, transcribe_windows
+from app.audio.vad import transcribe_speech
 from app.db import repository
 from app.db.database import SessionLocal
+from app.ml.batching import ThreadBatcher
+from app.ml.embedding import embed_text, embedding_batcher
+from app.ml.registry import (
+    EMBEDDING_MODEL_NAME,
+    WHISPER_MODEL_NAME,
+    get_whisper_model,
+    registry,
+)
+from app.processing.pool import ProcessWorkerPool, ProgressCallback
+from app.queue.cancel import CancelCheck, not_cancelled
 from app.queue.errors import NonRetryableJobError
 from app.queue.models import Job
 from app.video.detection import ObjectDetector
-from app.video.pipeline import process_video_frames
+from app.video.pipeline import process_video_frames, process_video_segmented
 from app.video.summary import generate_video_embedding, generate_video_summary
-from pydub import AudioSegment
-from sentence_transformers import SentenceTransformer
-
-# Use the same embedding model as video
-EMBED_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Whisper tiny (CPU-friendly)
-WHISPER_MODEL = whisper.load_model("tiny")
 
 # MobileNet SSD paths (README tells how to download these)
 PROTOTXT = "app/video/models/MobileNetSSD_deploy.prototxt"
 MODEL = "app/video/models/MobileNetSSD_deploy.caffemodel"
 
-_detector = None
+# Keyframes per DNN forward pass
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "8"))
+
+# Keyframe sampling: every Nth frame, or every N ms when the interval is set
+KEYFRAME_FRAME_INTERVAL = int(os.getenv("KEYFRAME_FRAME_INTERVAL", "10"))
+KEYFRAME_SAMPLE_INTERVAL_MS = (
+    float(os.environ["KEYFRAME_SAMPLE_INTERVAL_MS"])
+    if os.getenv("KEYFRAME_SAMPLE_INTERVAL_MS")
+    else None
+)
+
+# Frames are downscaled to this width for scene detection (0 = full resolution)
+KEYFRAME_ANALYSIS_WIDTH = int(os.getenv("KEYFRAME_ANALYSIS_WIDTH", "320")) or None
+
+# Long videos are split into this many segments processed concurrently (1 = off);
+# each segment covers at least VIDEO_SEGMENT_MIN_FRAMES frames
+VIDEO_SEGMENT_WORKERS = int(os.getenv("VIDEO_SEGMENT_WORKERS", "1"))
+VIDEO_SEGMENT_MIN_FRAMES = int(os.getenv("VIDEO_SEGMENT_MIN_FRAMES", "9000"))
+
+# Audio at least this long is decoded and transcribed in overlapping windows
+# instead of all at once, keeping memory flat regardless of duration
+AUDIO_STREAM_MIN_DURATION_S = float(os.getenv("AUDIO_STREAM_MIN_DURATION_S", "300"))
+AUDIO_CHUNK_S = float(os.getenv("AUDIO_CHUNK_S", "30"))
+AUDIO_CHUNK_OVERLAP_S = float(os.getenv("AUDIO_CHUNK_OVERLAP_S", "2"))
+
+# Short clips (<= 30 s) from up to this many concurrent audio jobs are decoded by
+# Whisper as one batch (1 = off); applies to jobs run in the API process
+AUDIO_BATCH_SIZE = int(os.getenv("AUDIO_BATCH_SIZE", "1"))
+AUDIO_BATCH_MAX_LATENCY_MS = float(os.getenv("AUDIO_BATCH_MAX_LATENCY_MS", "200"))
+
+# Only speech regions found by an energy-based pre-pass are sent to Whisper:
+# frames above the threshold (dBFS of the audio as decoded), or at least the
+# margin above the clip's own noise floor, count as speech
+AUDIO_VAD = os.getenv("AUDIO_VAD", "1") == "1"
+AUDIO_VAD_THRESHOLD_DB = float(os.getenv("AUDIO_VAD_THRESHOLD_DB", "-40"))
+AUDIO_VAD_MARGIN_DB = float(os.getenv("AUDIO_VAD_MARGIN_DB", "12"))
+
+# Set by the app when video/audio jobs run in worker processes instead of threads
+_worker_pool: Optional[ProcessWorkerPool] = None
+
+# Several queue workers may run in-process when audio batching is on; the shared
+# detector must only be used by one video job at a time. Taken by the job's
+# thread rather than on the event loop: a job the queue abandons after a cancel
+# keeps it until its thread has really returned
+_video_lock = threading.Lock()
+# How often a video job waiting for the lock checks whether it was cancelled
+_VIDEO_LOCK_POLL_S = 0.2
+
+
+def pipeline_config_key(job_type: str) -> str:
+    """
+    Digest of every setting that changes a job's stored result. Uploads are only
+    deduplicated against results produced with the same settings.
+    """
+    if job_type == "video":
+        config = {
+            "model": os.path.basename(MODEL),
+            "frame_interval": KEYFRAME_FRAME_INTERVAL,
+            "sample_interval_ms": KEYFRAME_SAMPLE_INTERVAL_MS,
+            "analysis_width": KEYFRAME_ANALYSIS_WIDTH,
+            "embedding": EMBEDDING_MODEL_NAME,
+        }
+    elif job_type == "audio":
+        config = {
+            "whisper": WHISPER_MODEL_NAME,
+            "embedding": EMBEDDING_MODEL_NAME,
+            "stream_min_s": AUDIO_STREAM_MIN_DURATION_S,
+            "chunk_s": AUDIO_CHUNK_S,
+            "overlap_s": AUDIO_CHUNK_OVERLAP_S,
+            # Batched decoding stores one segment per clip
+            "batched": AUDIO_BATCH_SIZE > 1,
+            "vad_threshold_db": AUDIO_VAD_THRESHOLD_DB if AUDIO_VAD else None,
+            "vad_margin_db": AUDIO_VAD_MARGIN_DB if AUDIO_VAD else None,
+        }
+    else:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    encoded = json.dumps(config, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def stored_result(job_type: str, record) -> dict:
+    """Job result for an upload whose identical content was already processed."""
+    if job_type == "video":
+        return {
+            "filename": record.filename,
+            "video_id": record.id,
+            "keyframes_count": len(record.keyframes or []),
+            "objects_detected_count": len(record.detected_objects or []),
+            "summary": record.summary,
+            "embedding_length": len(record.embedding or b""),
+            "message": "Video already processed",
+        }
+    return {
+        "filename": record.filename,
+        "transcription_id": record.id,
+        "text": record.text,
+        "segments": record.timestamps,
+        "message": "Audio already processed",
+        "embedding_length": len(record.embedding or b"") // 4,
+    }
+
+
+def _no_progress(progress: int, message: str) -> None:
+    pass
+
+
+def _progress_range(
+    progress: ProgressCallback, start: int, end: int, message: str
+) -> Callable[[float], None]:
+    """
+    Report a stage's 0..1 completion as job progress between `start` and `end`.
+    Only whole-percent steps are passed on, so a per-frame caller sends at most
+    `end - start` updates (each one crosses a process boundary in process mode).
+    May be called from several threads.
+    """
+    lock = threading.Lock()
+    last = start
+
+    def report(fraction: float) -> None:
+        nonlocal last
+        value = start + int((end - start) * min(max(fraction, 0.0), 1.0))
+        with lock:
+            if value <= last:
+                return
+            last = value
+            progress(value, f"{message} ({fraction:.0%})")
+
+    return report
 
 
 def _set(job: Job, progress: int, message: str) -> None:
@@ -55,31 +197,77 @@ def _ensure_models_exist() -> None:
 
 
 def _get_detector():
-    global _detector
-
     _ensure_models_exist()
 
-    if _detector is None:
-        _detector = ObjectDetector(PROTOTXT, MODEL)
-    return _detector
+    return registry.get("detector")
+
+
+def _new_detector() -> ObjectDetector:
+    return ObjectDetector(PROTOTXT, MODEL, batch_size=DETECTION_BATCH_SIZE)
+
 
+def _load_segment_detectors() -> List[ObjectDetector]:
+    # Segment threads each need their own network (cv2.dnn nets are not
+    # thread-safe); the first segment uses the shared detector
+    return [_new_detector() for _ in range(VIDEO_SEGMENT_WORKERS - 1)]
 
-def read_file_as_bytes(file_path: str) -> bytes:
-    with open(file_path, "rb") as f:
-        return f.read()
 
+registry.register("detector", _new_detector)
+registry.register("segment_detectors", _load_segment_detectors)
 
-def _process_video_sync(file_path: str, filename: str) -> dict:
-    detector = _get_detector()
 
+def _run_video_pipeline(
+    file_path: str,
+    check_cancelled: CancelCheck = not_cancelled,
+    progress: Optional[Callable[[float], None]] = None,
+) -> dict:
+    if VIDEO_SEGMENT_WORKERS > 1 and KEYFRAME_SAMPLE_INTERVAL_MS is None:
+        # Loaded once per process; only one video job runs at a time
+        detectors = [_get_detector(), *registry.get("segment_detectors")]
+        return process_video_segmented(
+            file_path,
+            detectors[:VIDEO_SEGMENT_WORKERS],
+            frame_interval=KEYFRAME_FRAME_INTERVAL,
+            analysis_width=KEYFRAME_ANALYSIS_WIDTH,
+            min_segment_frames=VIDEO_SEGMENT_MIN_FRAMES,
+            check_cancelled=check_cancelled,
+            progress=progress,
+        )
+
+    return process_video_frames(
+        file_path,
+        _get_detector(),
+        frame_interval=KEYFRAME_FRAME_INTERVAL,
+        sample_interval_ms=KEYFRAME_SAMPLE_INTERVAL_MS,
+        analysis_width=KEYFRAME_ANALYSIS_WIDTH,
+        check_cancelled=check_cancelled,
+        progress=progress,
+    )
+
+
+def _process_video_sync(
+    file_path: str,
+    filename: str,
+    progress: ProgressCallback = _no_progress,
+    sha256: Optional[str] = None,
+    check_cancelled: CancelCheck = not_cancelled,
+) -> dict:
     with SessionLocal() as db:
-        pipeline_result = process_video_frames(file_path, detector)
+        pipeline_result = _run_video_pipeline(
+            file_path,
+            check_cancelled,
+            _progress_range(progress, 15, 79, "Extracting keyframes"),
+        )
         keyframes = pipeline_result["keyframes"]
         detections = pipeline_result["objects"]
 
+        progress(80, "Generating summary")
         summary_text = generate_video_summary(detections)
         embedding_bytes = generate_video_embedding(summary_text)
 
+        # Last chance to stop: past this point the job always completes, so a
+        # cancelled job never leaves a partial record behind
+        check_cancelled()
         video_record = repository.save_video(
             db,
             filename=filename,
@@ -88,9 +276,14 @@ def _process_video_sync(file_path: str, filename: str) -> dict:
             summary=summary_text,
             embedding=embedding_bytes,
         )
+        if sha256:
+            repository.save_media_hash(
+                db, sha256, "video", pipeline_config_key("video"), video_record.id
+            )
 
         return {
             "filename": video_record.filename,
+            "video_id": video_record.id,
             "keyframes_count": len(keyframes),
             "objects_detected_count": len(detections),
             "summary": summary_text,
@@ -99,39 +292,112 @@ def _process_video_sync(file_path: str, filename: str) -> dict:
         }
 
 
-def _process_audio_sync(file_path: str, filename: str) -> dict:
-    audio_bytes = read_file_as_bytes(file_path)
+def _transcribe_clips(clips: List[Any]) -> List[dict]:
+    return transcribe_batch(get_whisper_model(), clips)
+
+
+whisper_batcher: ThreadBatcher[Any, dict] = ThreadBatcher(
+    _transcribe_clips,
+    max_batch=AUDIO_BATCH_SIZE,
+    max_latency_ms=AUDIO_BATCH_MAX_LATENCY_MS,
+    name="whisper-batcher",
+)
+
 
-    # Preprocess: format conversion + normalization + resample to 16k mono
-    audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-    audio = audio.set_channels(1).set_frame_rate(16000)
-    if audio.max_dBFS != float("-inf"):
-        audio = audio.apply_gain(-audio.max_dBFS)
+def _transcribe_clip(samples: Any) -> dict:
+    if AUDIO_BATCH_SIZE > 1 and len(samples) <= BATCH_CLIP_S * SAMPLE_RATE:
+        # Blocks until the batch this clip joined has been decoded
+        return whisper_batcher.submit(samples)
+    return get_whisper_model().transcribe(samples)
 
-    samples = audio.get_array_of_samples()
-    tmp_path = f"/tmp/{filename}.wav"
-    audio.export(tmp_path, format="wav")
 
-    # Transcribe with whisper-tiny
-    result = WHISPER_MODEL.transcribe(tmp_path)
+def _transcribe(
+    transcribe: Callable[[Any], dict],
+    samples: Any,
+    peak: Optional[float] = None,
+    in_place: bool = False,
+) -> dict:
+    """
+    Transcribe decoded `samples`, normalized against `peak` (default: their
+    own). Normalizes in place only when the caller owns the buffer.
+    """
+
+    def normalized(audio: Any) -> dict:
+        return transcribe(
+            peak_normalize(audio, out=audio if in_place else None, peak=peak)
+        )
+
+    if AUDIO_VAD:
+        # Detect speech before normalizing: the threshold is absolute, and
+        # scaling a silent file to full scale would lift its noise floor above it.
+        # Timestamps come back on the timeline of `samples`, silence included
+        return transcribe_speech(
+            normalized, samples, AUDIO_VAD_THRESHOLD_DB, AUDIO_VAD_MARGIN_DB
+        )
+    return normalized(samples)
+
+
+def _transcribe_in_memory(
+    file_path: str,
+    duration: Optional[float],
+    progress: ProgressCallback,
+    check_cancelled: CancelCheck = not_cancelled,
+) -> Tuple[str, List[dict], float]:
+    # Decode + resample to 16k mono float32 once; Whisper consumes the array as is
+    with open_pcm_stream(file_path) as stream:
+        samples = read_pcm(stream, duration)
+    check_cancelled()
+
+    # Transcribe with whisper-tiny; the whole file is normalized with one gain
+    progress(40, "Transcribing audio")
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    result = _transcribe(_transcribe_clip, samples, peak, in_place=True)
     transcription_text = (result.get("text") or "").strip()
 
-    # Segments with timestamps + confidence
-    segments = []
-    for seg in result.get("segments", []):
-        segments.append(
-            {
-                "start": seg.get("start", 0.0),
-                "end": seg.get("end", 0.0),
-                "text": seg.get("text", ""),
-                # avg_logprob is commonly present; keep it as “confidence-like”
-                "confidence": seg.get("avg_logprob", 1.0),
-            }
+    return transcription_text, to_segments(result), len(samples) / SAMPLE_RATE
+
+
+def _transcribe_streaming(
+    file_path: str,
+    duration: float,
+    progress: ProgressCallback,
+    check_cancelled: CancelCheck = not_cancelled,
+) -> Tuple[str, List[dict]]:
+    def on_window(end_s: float) -> None:
+        done = min(end_s / duration, 1.0) if duration > 0 else 1.0
+        progress(40 + int(39 * done), f"Transcribed {end_s:.0f}s of {duration:.0f}s")
+
+    progress(40, "Transcribing audio")
+    with open_pcm_stream(file_path) as stream:
+        model = get_whisper_model()
+        return transcribe_windows(
+            lambda window, peak: _transcribe(model.transcribe, window, peak),
+            iter_windows(stream, AUDIO_CHUNK_S, AUDIO_CHUNK_OVERLAP_S),
+            AUDIO_CHUNK_OVERLAP_S,
+            on_window,
+            check_cancelled=check_cancelled,
+        )
+
+
+def _process_audio_sync(
+    file_path: str,
+    filename: str,
+    progress: ProgressCallback = _no_progress,
+    sha256: Optional[str] = None,
+    check_cancelled: CancelCheck = not_cancelled,
+) -> dict:
+    duration = probe_duration(file_path)
+    if duration is not None and duration >= AUDIO_STREAM_MIN_DURATION_S:
+        transcription_text, segments = _transcribe_streaming(
+            file_path, duration, progress, check_cancelled
+        )
+    else:
+        transcription_text, segments, duration = _transcribe_in_memory(
+            file_path, duration, progress, check_cancelled
         )
 
     # Fallback if no segments
     if not segments:
-        duration = len(samples) / 16000.0
         segments = [
             {
                 "start": 0.0,
@@ -142,9 +408,12 @@ def _process_audio_sync(file_path: str, filename: str) -> dict:
         ]
 
     # Embedding
-    embedding_vector = EMBED_MODEL.encode(transcription_text)
-    embedding_bytes = np.asarray(embedding_vector, dtype=np.float32).tobytes()
+    progress(80, "Generating embedding")
+    embedding_vector = embed_text(transcription_text)
+    embedding_bytes = embedding_vector.tobytes()
 
+    # Last chance to stop; the record is written in full or not at all
+    check_cancelled()
     with SessionLocal() as db:
         record = repository.save_transcription(
             db,
@@ -153,10 +422,15 @@ def _process_audio_sync(file_path: str, filename: str) -> dict:
             timestamps=segments,
             embedding=embedding_bytes,
         )
+        transcription_id = record.id
+        if sha256:
+            repository.save_media_hash(
+                db, sha256, "transcription", pipeline_config_key("audio"), record.id
+            )
 
     return {
         "filename": filename,
-        "transcription_id": record.id,
+        "transcription_id": transcription_id,
         "text": transcription_text,
         "segments": segments,
         "message": "Audio processed successfully",
@@ -164,6 +438,72 @@ def _process_audio_sync(file_path: str, filename: str) -> dict:
     }
 
 
+def init_worker(job_type: str) -> None:
+    """
+    Worker-process initializer: load every model the job type needs, once.
+    """
+    if job_type == "video":
+        if all(os.path.exists(p) for p in (PROTOTXT, MODEL)):
+            registry.warm_up(["detector", "segment_detectors"])
+        registry.warm_up(["embedding"])
+    elif job_type == "audio":
+        registry.warm_up(["whisper", "embedding"])
+
+
+def run_job_sync(
+    job_type: str,
+    payload: Dict[str, Any],
+    progress: ProgressCallback = _no_progress,
+    check_cancelled: CancelCheck = not_cancelled,
+) -> dict:
+    file_path, filename = payload["file_path"], payload["filename"]
+    sha256 = payload.get("sha256")
+    if job_type == "video":
+        process = _process_video_sync
+    elif job_type == "audio":
+        process = _process_audio_sync
+    else:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    # Lets the embedding stage skip its wait when no other job could join
+    with embedding_batcher.caller():
+        return process(file_path, filename, progress, sha256, check_cancelled)
+
+
+def _run_video_locked(
+    job_type: str,
+    payload: Dict[str, Any],
+    progress: ProgressCallback,
+    check_cancelled: CancelCheck,
+) -> dict:
+    while not _video_lock.acquire(timeout=_VIDEO_LOCK_POLL_S):
+        check_cancelled()
+    try:
+        return run_job_sync(job_type, payload, progress, check_cancelled)
+    finally:
+        _video_lock.release()
+
+
+def set_worker_pool(pool: Optional[ProcessWorkerPool]) -> None:
+    global _worker_pool
+    _worker_pool = pool
+
+
+async def _run_sync(job: Job) -> dict:
+    # Worker processes when a pool is configured for this type, else a thread
+    if _worker_pool is not None and _worker_pool.handles(job.type):
+        return await _worker_pool.run(job)
+
+    run = _run_video_locked if job.type == "video" else run_job_sync
+    return await asyncio.to_thread(
+        run,
+        job.type,
+        job.payload,
+        lambda p, m: _set(job, p, m),
+        job.cancel.check,
+    )
+
+
 async def process_job(job: Job) -> None:
     if job.type == "video":
         file_path = job.payload["file_path"]
@@ -172,22 +512,18 @@ async def process_job(job: Job) -> None:
         _ensure_models_exist()
 
         _set(job, 5, "Preparing video processing")
-        file_path = job.payload["file_path"]
-        filename = job.payload["filename"]
 
         _set(job, 15, "Extracting keyframes")
 
-        job.result = await asyncio.to_thread(_process_video_sync, file_path, filename)
+        job.result = await _run_sync(job)
         _set(job, 95, "Finalizing")
         return
 
     if job.type == "audio":
         _set(job, 5, "Preparing audio processing")
-        file_path = job.payload["file_path"]
-        filename = job.payload["filename"]
 
         _set(job, 20, "Preprocessing audio")
-        job.result = await asyncio.to_thread(_process_audio_sync, file_path, filename)
+        job.result = await _run_sync(job)
         _set(job, 95, "Finalizing")
         return
 
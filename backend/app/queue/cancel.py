@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from app.queue.errors import JobCancelled, JobTimedOut
+
+# Remote cancel flags (e.g. shared with a worker process) are polled at most
+# this often, so checking once per frame stays cheap
+REMOTE_POLL_INTERVAL_S = 0.2
+
+CancelCheck = Callable[[], None]
+
+
+def not_cancelled() -> None:
+    pass
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for one job attempt.
+
+    Long-running code calls `check()` between frames/chunks; it raises
+    JobCancelled after `cancel()` and JobTimedOut once `deadline` (epoch
+    seconds, so it means the same in a worker process) has passed.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.deadline = deadline
+        self._cancelled = threading.Event()
+        self._is_cancelled = is_cancelled
+        self._next_poll = 0.0
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def timed_out(self) -> bool:
+        return self.deadline is not None and time.time() > self.deadline
+
+    def cancel(self) -> None:
+        if self._cancelled.is_set():
+            return
+        self._cancelled.set()
+        for callback in self._callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """Run `callback` when the token is cancelled (now, if it already is)."""
+        self._callbacks.append(callback)
+        if self._cancelled.is_set():
+            callback()
+
+    def error(self) -> JobCancelled:
+        if self.timed_out and not self.cancelled:
+            return JobTimedOut("Timed out")
+        return JobCancelled("Cancelled")
+
+    def check(self) -> None:
+        if self._is_cancelled is not None and not self._cancelled.is_set():
+            now = time.monotonic()
+            if now >= self._next_poll:
+                self._next_poll = now + REMOTE_POLL_INTERVAL_S
+                if self._is_cancelled():
+                    self._cancelled.set()
+
+        if self._cancelled.is_set() or self.timed_out:
+            raise self.error()
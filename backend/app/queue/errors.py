@@ -2,3 +2,11 @@ class NonRetryableJobError(Exception):
     """Raise this for errors that should NOT be retried (bad input, unsupported file, etc.)."""
 
     pass
+
+
+class JobCancelled(NonRetryableJobError):
+    """Raised inside a job once it has been cancelled (see app.queue.cancel)."""
+
+
+class JobTimedOut(JobCancelled):
+    """Raised inside a job that ran past its wall-clock limit."""
@@ -1,29 +1,166 @@
 import asyncio
+import collections
+import contextlib
+import functools
+import heapq
 import logging
+import os
 import random
+import time
 import traceback
-from typing import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, get_args
 
-from app.queue.errors import NonRetryableJobError
-from app.queue.models import Job
+from app.queue.cancel import CancelToken
+from app.queue.errors import JobCancelled, JobTimedOut, NonRetryableJobError
+from app.queue.models import Job, JobType
+from app.queue.store import FINISHED, LEASED, JobStore, copy_job_state, job_to_row
 
 log = logging.getLogger("queue")
 
+# A running job whose worker has not renewed its lease for this long is handed
+# to another worker (leases are renewed every third of it)
+QUEUE_LEASE_S = float(os.getenv("QUEUE_LEASE_S", "30"))
+# Idle workers check the store this often for jobs enqueued by other processes
+# or whose lease expired
+QUEUE_POLL_INTERVAL_S = float(os.getenv("QUEUE_POLL_INTERVAL_S", "1.0"))
+# How long a write waits for others to share its transaction
+QUEUE_FLUSH_INTERVAL_MS = float(os.getenv("QUEUE_FLUSH_INTERVAL_MS", "2"))
+# Finished jobs stay in memory this long, and in the database this long
+QUEUE_MEMORY_RETENTION_S = float(os.getenv("QUEUE_MEMORY_RETENTION_S", "300"))
+QUEUE_RETENTION_S = float(os.getenv("QUEUE_RETENTION_S", str(7 * 24 * 3600)))
+# Watchers get at most one update per job this often; changes in between are
+# coalesced into the latest state
+QUEUE_WATCH_INTERVAL_S = float(os.getenv("QUEUE_WATCH_INTERVAL_S", "0.5"))
+
+# Retry backoff: RETRY_BASE_DELAY_S * 2^(attempt-1), capped, plus random jitter
+RETRY_BASE_DELAY_S = float(os.getenv("RETRY_BASE_DELAY_S", "1"))
+RETRY_MAX_DELAY_S = float(os.getenv("RETRY_MAX_DELAY_S", "30"))
+RETRY_JITTER_S = float(os.getenv("RETRY_JITTER_S", "0.5"))
+
+# One lane per job type
+LANES: tuple[str, ...] = get_args(JobType)
+
+
+def _parse_lanes(spec: str) -> dict[str, float]:
+    # "audio=3,video=1" -> {"audio": 3.0, "video": 1.0}
+    lanes = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        lanes[name.strip()] = float(value)
+    return lanes
+
+
+# Share of worker turns each lane gets while several have work waiting
+QUEUE_LANE_WEIGHTS = _parse_lanes(os.getenv("QUEUE_LANE_WEIGHTS", "audio=3,video=1"))
+# Max concurrent jobs per lane in this process (unset = no limit); overrides the
+# limits the app passes in
+QUEUE_LANE_LIMITS = _parse_lanes(os.getenv("QUEUE_LANE_LIMITS", ""))
+# Wall-clock limit per attempt, per job type ("video=3600,audio=1800"; 0 or
+# unset = none). Jobs see it through their cancel token.
+QUEUE_JOB_TIMEOUTS = _parse_lanes(
+    os.getenv("QUEUE_JOB_TIMEOUTS", "video=3600,audio=1800")
+)
+# A cancelled or timed-out job still running this much later (stuck in code that
+# does not check its token) is abandoned so the worker can move on
+QUEUE_CANCEL_GRACE_S = float(os.getenv("QUEUE_CANCEL_GRACE_S", "10"))
+
+# Recent queue wait times kept per lane for stats
+_WAIT_SAMPLES = 500
+
 Processor = Callable[[Job], Awaitable[None]]
 
 
+async def _wait_event(event: asyncio.Event, timeout: Optional[float]) -> bool:
+    """Wait for `event`; False if `timeout` (None = forever) passed first."""
+    try:
+        async with asyncio.timeout(timeout):
+            await event.wait()
+    except TimeoutError:
+        return False
+    return True
+
+
 class QueueManager:
     """
     Unified queue for video/audio processing.
+
+    Jobs are persisted in the database (see JobStore): workers lease them with a
+    visibility timeout, so a restarted process picks up whatever was queued or
+    running. Writes are group-committed in one transaction per batch. `jobs`
+    holds live jobs plus recently finished ones; older results are read back
+    from the store.
+
+    Each job type has its own lane. Idle workers pick the lane that is furthest
+    behind its weighted share (stride scheduling) among lanes below their
+    concurrency limit, then the highest-priority, oldest job in it.
+
+    Several processes may share one store. Once enqueued, a job may be claimed
+    by any of them, so the in-memory copy is only authoritative while this
+    process is running it, or once it has finished here; until then the store
+    is consulted (see `_stale`).
     """
 
-    def __init__(self) -> None:
-        self._q: asyncio.Queue[str] = asyncio.Queue()
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        lane_limits: Optional[dict[str, int]] = None,
+    ) -> None:
+        self.store = store or JobStore()
+        self.lane_limits = {**(lane_limits or {}), **QUEUE_LANE_LIMITS}
         self.jobs: dict[str, Job] = {}
         self._done: dict[str, asyncio.Event] = {}
         self._workers: list[asyncio.Task] = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self._retry_timer: Optional[asyncio.Task] = None
+        # dedup key -> id of the job currently processing that content
+        self._inflight: dict[str, str] = {}
+
+        # Jobs this process is running, and the events that make their worker
+        # give up on them (cancel/timeout grace period over)
+        self._active: set[str] = set()
+        self._aborts: dict[str, asyncio.Event] = {}
+        # Per watched job: one event per watcher, set when the job changes
+        self._watchers: dict[str, set[asyncio.Event]] = {}
+        self._wakeup = asyncio.Event()
+        # (due, job id) of retries backing off; the timer wakes workers when
+        # the earliest one is due
+        self._retries: list[tuple[float, str]] = []
+        self._retries_changed = asyncio.Event()
+
+        # Per lane: workers holding a slot, virtual time of its last turn
+        # (stride scheduling), recent waits
+        self._running: dict[str, int] = dict.fromkeys(LANES, 0)
+        self._pass: dict[str, float] = dict.fromkeys(LANES, 0.0)
+        self._clock = 0.0
+        self._waits: dict[str, collections.deque[float]] = {
+            lane: collections.deque(maxlen=_WAIT_SAMPLES) for lane in LANES
+        }
+
+        # Group commit: ids with unsaved changes, ids never inserted, and the
+        # callers waiting for the next flush
+        self._dirty: set[str] = set()
+        self._unsaved: set[str] = set()
+        self._commit_waiters: list[asyncio.Future] = []
+        self._flushing = False
+        # One thread for all store calls keeps SQLite writes from contending
+        self._db_executor = ThreadPoolExecutor(1, thread_name_prefix="queue-db")
 
     def create_job(self, job: Job) -> Job:
+        """
+        Register a job. If a job with the same `dedup_key` is still queued or
+        running, that job is returned instead and nothing new is created. Call
+        `refresh_inflight` first so a job another process already finished is
+        not coalesced into.
+        """
+        if job.dedup_key is not None:
+            existing_id = self._inflight.get(job.dedup_key)
+            if existing_id is not None:
+                log.info("job_coalesced job_id=%s into=%s", job.id, existing_id)
+                return self.jobs[existing_id]
+            self._inflight[job.dedup_key] = job.id
+
         log.info(
             "job_created job_id=%s type=%s payload_keys=%s",
             job.id,
@@ -33,115 +170,791 @@ class QueueManager:
 
         self.jobs[job.id] = job
         self._done[job.id] = asyncio.Event()
+        if job.status in FINISHED:
+            # Created with a known result (e.g. deduplicated upload)
+            self._done[job.id].set()
+        # Persisted with the next flush; not claimable until enqueued
+        self._unsaved.add(job.id)
+        self._dirty.add(job.id)
         return job
 
-    async def enqueue(self, job_id: str) -> None:
-        log.info("job_enqueued job_id=%s type=%s", job_id, self.jobs[job_id].type)
+    async def enqueue(self, *job_ids: str) -> None:
+        """
+        Make created jobs claimable; returns once that is durable. Any number of
+        jobs are written in one transaction.
+        """
+        now = time.time()
+        for job_id in job_ids:
+            job = self.jobs[job_id]
+            log.info("job_enqueued job_id=%s type=%s", job_id, job.type)
+
+            job.status = "queued"
+            job.available_at = now
+            self._changed(job_id)
+            self._dirty.add(job_id)
+        await self._commit()
+        self._wakeup.set()
+
+    async def refresh_inflight(self, dedup_keys: Iterable[str]) -> None:
+        """
+        Bring the jobs that `dedup_keys` would be coalesced into up to date with
+        the store, in one read. Those another process has finished are released.
+        """
+        ids = filter(None, (self._inflight.get(key) for key in dedup_keys))
+        await self._refresh([self.jobs[i] for i in ids])
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """
+        A job this process owns (see `_stale`), or else its state in the store
+        (another process may be running it, or it was evicted from memory).
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and not self._stale(job):
+            return job
+        return self.store.get(job_id) or job
+
+    def get_jobs(self, job_ids: Iterable[str]) -> list[Job]:
+        """The jobs that exist among `job_ids`, in that order."""
+        job_ids = list(dict.fromkeys(job_ids))
+        found = {
+            i: self.jobs[i]
+            for i in job_ids
+            if i in self.jobs and not self._stale(self.jobs[i])
+        }
+        missing = [i for i in job_ids if i not in found]
+        if missing:
+            found.update((job.id, job) for job in self.store.get_many(missing))
+        return [found[i] for i in job_ids if i in found]
+
+    def find_jobs(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        job_type: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[Job]:
+        """Newest jobs with one of `statuses` and of `job_type` (None = any)."""
+        statuses = set(statuses) if statuses else None
+        jobs = {job.id: job for job in self.store.find(statuses, job_type, limit)}
+        # In-memory state of jobs this process owns is newer (progress is not
+        # persisted on every update), and jobs created a moment ago may not be
+        # flushed yet
+        for job in list(self.jobs.values()):
+            if self._stale(job):
+                continue
+            if (statuses is None or job.status in statuses) and (
+                job_type is None or job.type == job_type
+            ):
+                jobs[job.id] = job
+            elif job.id in jobs:
+                del jobs[job.id]
+        newest = sorted(jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return newest[:limit]
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. Waiting jobs are cancelled at once. Running jobs are
+        signalled through their cancel token and stop at their next check. If
+        they have not stopped after QUEUE_CANCEL_GRACE_S, they are abandoned.
+        Returns the job (unchanged if it had already finished), or None if it
+        does not exist.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            await self._refresh([job])
+        else:
+            job = await self._db(self.store.get, job_id)
+        if job is None or job.status in FINISHED:
+            return job
+
+        if job.id in self._active:
+            log.info("job_cancelling job_id=%s type=%s", job.id, job.type)
+            job.cancel.cancel()
+            job.message = "Cancelling"
+            job.touch()
+            abort = self._aborts.get(job.id)
+            if abort is not None:
+                asyncio.get_running_loop().call_later(QUEUE_CANCEL_GRACE_S, abort.set)
+            return job
+
+        if job.status == "running":
+            # Leased by a worker in another process
+            return job
+
+        log.info("job_cancelled job_id=%s type=%s", job.id, job.type)
+        if job.id not in self.jobs:
+            self.jobs[job.id] = job
+            self._done[job.id] = asyncio.Event()
+        job.status = "cancelled"
+        job.message = "Cancelled"
+        job.available_at = None
+        job.touch()
+        try:
+            await self._save(job)
+        finally:
+            self._release(job)
+        return job
 
-        await self._q.put(job_id)
+    def stats(self) -> dict:
+        """Per lane: queue depth, running jobs and queue wait times."""
+        depths = self.store.lane_depths()
+        lanes = {}
+        for lane in LANES:
+            waits = sorted(self._waits[lane])
+            depth = depths.get(lane, {"queued": 0, "oldest_wait_s": 0.0, "retrying": 0})
+            lanes[lane] = {
+                "queued": depth["queued"],
+                "oldest_wait_s": round(depth["oldest_wait_s"], 3),
+                "retrying": depth["retrying"],
+                "running": self._running[lane],
+                "limit": int(self.lane_limits.get(lane, 0)) or None,
+                "weight": self._weight(lane),
+                "wait_s": {
+                    "samples": len(waits),
+                    "p50": round(waits[len(waits) // 2], 3) if waits else None,
+                    "p95": round(waits[int(len(waits) * 0.95)], 3) if waits else None,
+                    "max": round(waits[-1], 3) if waits else None,
+                },
+            }
+        return {"lanes": lanes}
 
     async def wait(self, job_id: str) -> Job:
-        await self._done[job_id].wait()
-        return self.jobs[job_id]
+        event = self._done.get(job_id)
+        if event is not None:
+            job = self.jobs[job_id]
+            while not await _wait_event(event, QUEUE_POLL_INTERVAL_S):
+                # Another process may have claimed and finished it
+                await self._refresh([job])
+            return self.jobs.get(job_id) or await self._db(self.store.get, job_id)
+
+        # Evicted, or run by another process: poll the store
+        while True:
+            job = await self._db(self.store.get, job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job.status in FINISHED:
+                return job
+            await asyncio.sleep(QUEUE_POLL_INTERVAL_S)
+
+    async def watch(
+        self, job_id: str, idle_s: Optional[float] = None
+    ) -> AsyncIterator[Optional[Job]]:
+        """
+        Yield the job now and again whenever it changes, at most once per
+        QUEUE_WATCH_INTERVAL_S, ending with its finished state (which is not
+        held back). Yields None after `idle_s` without a change, so callers can
+        send keep-alives.
+
+        Jobs not in memory (evicted, or run by another process) are polled from
+        the store instead. Raises KeyError for an unknown job.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            async for polled in self._poll(job_id, idle_s):
+                yield polled
+            return
+        await self._refresh([job])
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(changed)
+        # Progress is set from worker threads
+        job.on_change = functools.partial(
+            loop.call_soon_threadsafe, self._changed, job_id
+        )
+        try:
+            while True:
+                changed.clear()
+                yield job
+                if job.status in FINISHED:
+                    return
+
+                with contextlib.suppress(TimeoutError):
+                    async with asyncio.timeout(QUEUE_WATCH_INTERVAL_S):
+                        await self._done[job_id].wait()
+                while not await self._wait_change(job, changed, idle_s):
+                    yield None
+        finally:
+            watchers = self._watchers.get(job_id, set())
+            watchers.discard(changed)
+            if not watchers:
+                self._watchers.pop(job_id, None)
+                job.on_change = None
+
+    async def _poll(
+        self, job_id: str, idle_s: Optional[float]
+    ) -> AsyncIterator[Optional[Job]]:
+        last_update = None
+        quiet_s = 0.0
+        while True:
+            job = await self._db(self.store.get, job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job.updated_at != last_update:
+                last_update = job.updated_at
+                quiet_s = 0.0
+                yield job
+            elif idle_s is not None and quiet_s >= idle_s:
+                quiet_s = 0.0
+                yield None
+            if job.status in FINISHED:
+                return
+            await asyncio.sleep(QUEUE_POLL_INTERVAL_S)
+            quiet_s += QUEUE_POLL_INTERVAL_S
+
+    async def _wait_change(
+        self, job: Job, changed: asyncio.Event, idle_s: Optional[float]
+    ) -> bool:
+        """
+        Wait for `changed`; False if `idle_s` (None = forever) passed first.
+        Changes made by another process are picked up from the store every
+        QUEUE_POLL_INTERVAL_S.
+        """
+        waited = 0.0
+        while True:
+            timeout = QUEUE_POLL_INTERVAL_S
+            if idle_s is not None:
+                timeout = min(timeout, idle_s - waited)
+            if await _wait_event(changed, timeout):
+                return True
+            waited += timeout
+            await self._refresh([job])
+            if changed.is_set():
+                return True
+            if idle_s is not None and waited >= idle_s:
+                return False
+
+    def _changed(self, job_id: str) -> None:
+        for event in self._watchers.get(job_id, ()):
+            event.set()
 
     async def start(self, worker_count: int, processor: Processor) -> None:
+        await self._recover()
+
         for idx in range(worker_count):
             log.info("worker_started idx=%s", idx)
 
             self._workers.append(asyncio.create_task(self._worker_loop(processor)))
+        self._maintenance = asyncio.create_task(self._maintenance_loop())
+        self._retry_timer = asyncio.create_task(self._retry_timer_loop())
 
     async def shutdown(self) -> None:
-        for t in self._workers:
+        tasks = self._workers + [
+            t for t in (self._maintenance, self._retry_timer) if t is not None
+        ]
+        for t in tasks:
             t.cancel()
-        await asyncio.gather(*self._workers, return_exceptions=True)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers, self._maintenance, self._retry_timer = [], None, None
 
-    async def _worker_loop(self, processor: Processor) -> None:
+        # Interrupted jobs go straight back to the queue so the next start does
+        # not wait for their leases to expire
+        now = time.time()
+        for job in [self.jobs[i] for i in self._active]:
+            job.status = "queued"
+            job.message = "Queued (interrupted by shutdown)"
+            job.available_at = now
+            job.lease_until = None
+            job.touch()
+            self._dirty.add(job.id)
+        self._active.clear()
+
+        await self._commit()
+        self._db_executor.shutdown(wait=True)
+
+    # ---- persistence ----
+
+    async def _db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._db_executor, fn, *args
+        )
+
+    async def _save(self, job: Job) -> None:
+        self._changed(job.id)
+        self._dirty.add(job.id)
+        await self._commit()
+
+    async def _commit(self) -> None:
+        """
+        Wait until every change made so far is durable. Concurrent callers share
+        one transaction: the first becomes the flusher and writes everything
+        that accumulated while the previous flush was running.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._commit_waiters.append(waiter)
+
+        if not self._flushing:
+            self._flushing = True
+            try:
+                while self._commit_waiters:
+                    # Let writers that are about to arrive join this batch
+                    await asyncio.sleep(QUEUE_FLUSH_INTERVAL_MS / 1000)
+                    waiters, self._commit_waiters = self._commit_waiters, []
+                    await self._flush(waiters)
+            finally:
+                self._flushing = False
+
+        await waiter
+
+    async def _flush(self, waiters: list[asyncio.Future]) -> None:
+        ids, self._dirty = self._dirty, set()
+        rows = [job_to_row(self.jobs[i]) for i in ids if i in self.jobs]
+        inserts = [r for r in rows if r["id"] in self._unsaved]
+        updates = [r for r in rows if r["id"] not in self._unsaved]
+
+        start = time.perf_counter()
+        write = asyncio.ensure_future(self._db(self.store.write, inserts, updates))
+        cancelled = False
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # Cancelling the flusher (e.g. its worker at shutdown) would drop a
+            # write still queued on the DB thread; let it land, then stop
+            cancelled = True
+            await asyncio.wait({write})
+        except Exception:
+            pass
+
+        e = write.exception()
+        if e is not None:
+            # Keep the changes for the next attempt; the callers see the error
+            self._dirty |= ids
+            log.error("queue_flush_failed jobs=%s error=%s", len(rows), str(e))
+            for w in waiters:
+                if not w.done():
+                    w.set_exception(e)
+        else:
+            self._unsaved -= {r["id"] for r in inserts}
+            for w in waiters:
+                if not w.done():
+                    w.set_result(None)
+        if cancelled:
+            raise asyncio.CancelledError
+        if e is not None:
+            return
+
+        log.debug(
+            "queue_flushed inserts=%s updates=%s waiters=%s elapsed_ms=%.1f",
+            len(inserts),
+            len(updates),
+            len(waiters),
+            (time.perf_counter() - start) * 1000,
+        )
+
+    def _stale(self, job: Job) -> bool:
+        """
+        Whether another process may have moved `job` on since this one last
+        saw it: it is enqueued and unfinished, this process is not running it,
+        and it has no unsaved changes here.
+        """
+        return (
+            job.status not in FINISHED
+            and job.available_at is not None
+            and job.id not in self._active
+            and job.id not in self._dirty
+            and job.id not in self._unsaved
+        )
+
+    async def _refresh(self, jobs: Iterable[Job]) -> None:
+        """Update stale in-memory jobs from the store, releasing finished ones."""
+        stale = [job for job in jobs if self._stale(job)]
+        if not stale:
+            return
+        stored = await self._db(self.store.get_many, [job.id for job in stale])
+        latest = {job.id: job for job in stored}
+        for job in stale:
+            newer = latest.get(job.id)
+            # Re-checked: this process may have claimed it during the read
+            if newer is None or not self._stale(job):
+                continue
+            if newer.updated_at <= job.updated_at:
+                continue
+            copy_job_state(newer, job)
+            self._changed(job.id)
+            if job.status in FINISHED:
+                self._release(job)
+
+    async def _recover(self) -> None:
+        """Load jobs a previous process left queued or running."""
+        jobs = await self._db(self.store.unfinished)
+        for job in jobs:
+            if job.id in self.jobs:
+                continue
+            self.jobs[job.id] = job
+            self._done[job.id] = asyncio.Event()
+            if job.dedup_key is not None:
+                self._inflight.setdefault(job.dedup_key, job.id)
+            if job.status == "retrying" and job.available_at is not None:
+                self._schedule_retry(job)
+
+        if jobs:
+            log.info(
+                "queue_recovered jobs=%s running=%s",
+                len(jobs),
+                sum(job.status in LEASED for job in jobs),
+            )
+
+    def _lane_order(self) -> list[str]:
+        """Lanes with a free slot, the one whose next turn is due first first."""
+        return sorted(
+            filter(self._has_slot, LANES),
+            key=lambda lane: (
+                self._pass[lane] + 1 / self._weight(lane),
+                -self._weight(lane),
+            ),
+        )
+
+    def _has_slot(self, lane: str) -> bool:
+        limit = self.lane_limits.get(lane, 0)
+        return limit <= 0 or self._running[lane] < limit
+
+    def _weight(self, lane: str) -> float:
+        return max(QUEUE_LANE_WEIGHTS.get(lane, 1.0), 1e-6)
+
+    async def _next_job(self) -> Job:
+        """Claim the next job; the caller holds a slot in its lane afterwards."""
+        while True:
+            claimed = None
+            for lane in self._lane_order():
+                # Another worker may have taken the last slot since the order
+                # was computed; reserve it before the (awaited) claim
+                if not self._has_slot(lane):
+                    continue
+                self._running[lane] += 1
+                try:
+                    rows = await self._db(self.store.claim, 1, QUEUE_LEASE_S, lane)
+                except BaseException:
+                    self._running[lane] -= 1
+                    raise
+                if not rows:
+                    self._running[lane] -= 1
+                    # An empty lane resumes at the current clock instead of
+                    # cashing in the turns it did not need
+                    self._pass[lane] = max(self._pass[lane], self._clock)
+                    continue
+
+                start = self._pass[lane]
+                self._clock = max(self._clock, start)
+                self._pass[lane] = start + 1 / self._weight(lane)
+                claimed = self._adopt(rows[0])
+                break
+
+            if claimed is not None:
+                if claimed.status == "cancelled":
+                    self._running[claimed.type] -= 1
+                    continue
+                if claimed.attempt >= claimed.max_attempts:
+                    # Its last attempt's worker died (lease expired): give up
+                    # rather than crash-loop on it
+                    self._running[claimed.type] -= 1
+                    await self._finish_lost(claimed)
+                    continue
+                return claimed
+
+            self._wakeup.clear()
+            # asyncio.timeout rather than wait_for: on 3.11 wait_for can swallow
+            # a cancel that races with the wakeup, and shutdown would hang
+            try:
+                async with asyncio.timeout(QUEUE_POLL_INTERVAL_S):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    def _adopt(self, claimed: Job) -> Job:
+        # Keep the in-memory object (callers may hold it); take the lease from
+        # the store
+        job = self.jobs.get(claimed.id)
+        if job is None:
+            job = self.jobs[claimed.id] = claimed
+            self._done[job.id] = asyncio.Event()
+            if job.dedup_key is not None:
+                self._inflight.setdefault(job.dedup_key, job.id)
+        elif job.status == "cancelled":
+            # Cancelled while the claim was in flight; the cancel write wins
+            return job
+        job.status = claimed.status
+        job.lease_until = claimed.lease_until
+        return job
+
+    async def _finish_lost(self, job: Job) -> None:
+        log.error(
+            "job_failed job_id=%s type=%s attempts=%s error=lease expired",
+            job.id,
+            job.type,
+            job.attempt,
+        )
+        job.status = "failed"
+        job.message = "Failed"
+        job.last_error = "Worker lost (lease expired) on the final attempt"
+        job.lease_until = None
+        job.touch()
+        try:
+            await self._save(job)
+        finally:
+            self._release(job)
+
+    def _release(self, job: Job) -> None:
+        if job.dedup_key and self._inflight.get(job.dedup_key) == job.id:
+            self._inflight.pop(job.dedup_key, None)
+        self._done[job.id].set()
+        self._changed(job.id)
+
+    def _schedule_retry(self, job: Job) -> None:
+        heapq.heappush(self._retries, (job.available_at, job.id))
+        self._retries_changed.set()
+
+    async def _retry_timer_loop(self) -> None:
+        """
+        Wake idle workers when a retry's backoff ends. The retry itself is
+        already in the store (status "retrying", `available_at` = due time), so
+        no worker is tied up waiting and nothing is lost on restart.
+        """
+        while True:
+            self._retries_changed.clear()
+            now = time.time()
+            due = False
+            while self._retries and self._retries[0][0] <= now:
+                heapq.heappop(self._retries)
+                due = True
+            if due:
+                self._wakeup.set()
+
+            timeout = self._retries[0][0] - now if self._retries else None
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._retries_changed.wait()
+            except TimeoutError:
+                pass
+
+    async def _maintenance_loop(self) -> None:
+        """
+        Renew leases (also persisting progress), pick up jobs other processes
+        have moved on, and apply retention.
+        """
+        interval = QUEUE_LEASE_S / 3
         while True:
-            job_id = await self._q.get()
+            await asyncio.sleep(interval)
+            try:
+                await self._renew_leases()
+                await self._refresh(list(self.jobs.values()))
+                await self._evict()
+            except Exception as e:
+                log.error("queue_maintenance_failed error=%s", str(e))
+
+    async def _renew_leases(self) -> None:
+        lease_until = time.time() + QUEUE_LEASE_S
+        for job_id in self._active:
             job = self.jobs[job_id]
+            job.lease_until = lease_until
+            self._dirty.add(job_id)
+        if self._dirty:
+            await self._commit()
+
+    async def _evict(self) -> None:
+        """
+        Drop finished jobs from memory after QUEUE_MEMORY_RETENTION_S (they stay
+        readable via the store) and delete them from the store after
+        QUEUE_RETENTION_S.
+        """
+        now = datetime.now(UTC)
+        memory_cutoff = now - timedelta(seconds=QUEUE_MEMORY_RETENTION_S)
+        evicted = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status in FINISHED
+            and job.updated_at < memory_cutoff
+            and job_id not in self._dirty
+            and job_id not in self._unsaved
+        ]
+        for job_id in evicted:
+            del self.jobs[job_id]
+            self._done.pop(job_id, None)
+
+        purged = await self._db(
+            self.store.purge, now - timedelta(seconds=QUEUE_RETENTION_S)
+        )
+        if evicted or purged:
+            log.info("queue_evicted memory=%s purged=%s", len(evicted), purged)
+
+    async def _worker_loop(self, processor: Processor) -> None:
+        while True:
+            job = await self._next_job()
+            try:
+                await self._run(job, processor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. the store is unavailable: stop renewing the lease so the
+                # job is picked up again once it expires
+                self._active.discard(job.id)
+                log.error("worker_error job_id=%s error=%s", job.id, str(e))
+            finally:
+                self._running[job.type] -= 1
+                # A slot opened up; workers idling on a full lane may proceed
+                self._wakeup.set()
+
+    async def _execute(self, job: Job, processor: Processor) -> None:
+        """
+        Run one attempt with a fresh cancel token carrying the type's deadline.
+        Returns or raises like `processor`, except that a job that ignores its
+        token past the grace period is abandoned with JobCancelled/JobTimedOut.
+        Its thread or worker process stops at its next check.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = QUEUE_JOB_TIMEOUTS.get(job.type, 0)
+        job.cancel = CancelToken(time.time() + timeout if timeout > 0 else None)
+
+        abort = self._aborts[job.id] = asyncio.Event()
+        timer = (
+            loop.call_later(timeout + QUEUE_CANCEL_GRACE_S, abort.set)
+            if timeout > 0
+            else None
+        )
+        task = asyncio.ensure_future(processor(job))
+        aborted = asyncio.ensure_future(abort.wait())
+        try:
+            await asyncio.wait({task, aborted}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            aborted.cancel()
+            if timer is not None:
+                timer.cancel()
+            self._aborts.pop(job.id, None)
+            if not task.done():
+                task.cancel()
+
+        if task.done() and not task.cancelled():
+            return task.result()
+
+        log.error("job_abandoned job_id=%s type=%s", job.id, job.type)
+        raise job.cancel.error()
+
+    async def _run(self, job: Job, processor: Processor) -> None:
+        wait_s = time.time() - (job.available_at or time.time())
+        self._waits[job.type].append(wait_s)
+        log.info(
+            "job_pulled job_id=%s type=%s priority=%s wait_s=%.3f",
+            job.id,
+            job.type,
+            job.priority,
+            wait_s,
+        )
+
+        job.attempt += 1
+        job.status = "running"
+        job.progress = max(job.progress, 1)
+        job.message = "Starting"
+        job.last_error = None
+        job.touch()
+        self._active.add(job.id)
+        await self._save(job)
 
-            log.info("job_pulled job_id=%s type=%s", job.id, job.type)
+        log.info("job_started job_id=%s attempt=%s", job.id, job.attempt)
 
-            job.attempt += 1
-            job.status = "running"
-            job.progress = max(job.progress, 1)
-            job.message = "Starting"
-            job.last_error = None
+        try:
+            await self._execute(job, processor)
+
+            log.info(
+                "job_succeeded job_id=%s type=%s attempt=%s",
+                job.id,
+                job.type,
+                job.attempt,
+            )
+
+            job.status = "succeeded"
+            job.progress = 100
+            job.message = "Completed"
             job.touch()
 
-            log.info("job_started job_id=%s attempt=%s", job.id, job.attempt)
+        except JobCancelled as e:
+            timed_out = isinstance(e, JobTimedOut)
+            log.warning(
+                "job_%s job_id=%s type=%s attempt=%s",
+                "timed_out" if timed_out else "cancelled",
+                job.id,
+                job.type,
+                job.attempt,
+            )
 
-            try:
-                await processor(job)
+            if timed_out:
+                limit = QUEUE_JOB_TIMEOUTS.get(job.type, 0)
+                job.status = "failed"
+                job.message = "Failed (timed out)"
+                job.last_error = f"Exceeded the {limit:.0f}s limit for {job.type} jobs"
+            else:
+                job.status = "cancelled"
+                job.message = "Cancelled"
+            job.touch()
+
+        except NonRetryableJobError as e:
+            log.error(
+                "job_failed_nonretryable job_id=%s type=%s error=%s",
+                job.id,
+                job.type,
+                str(e),
+            )
+
+            # Fail immediately for non-retryable cases
+            job.status = "failed"
+            job.message = "Failed (non-retryable)"
+            job.last_error = str(e)
+            job.touch()
+
+        except asyncio.CancelledError:
+            # Shutdown; the job is requeued there
+            raise
+
+        except BaseException as e:
+            # Retryable failure
+            job.last_error = f"{e}\n{traceback.format_exc()}"
+            job.touch()
+
+            if job.attempt < job.max_attempts:
+                # exponential backoff + small jitter
+                base_delay = min(
+                    RETRY_BASE_DELAY_S * 2 ** (job.attempt - 1), RETRY_MAX_DELAY_S
+                )
+                jitter = random.uniform(0, RETRY_JITTER_S)
+                delay = base_delay + jitter
 
-                log.info(
-                    "job_succeeded job_id=%s type=%s attempt=%s",
+                log.warning(
+                    "job_retrying job_id=%s type=%s attempt=%s/%s delay_s=%.2f error=%s",
                     job.id,
                     job.type,
                     job.attempt,
+                    job.max_attempts,
+                    delay,
+                    str(e),
                 )
 
-                job.status = "succeeded"
-                job.progress = 100
-                job.message = "Completed"
+                # Parked in the store until due; this worker moves on right away
+                job.status = "retrying"
+                job.message = f"Retrying in {delay:.1f}s (attempt {job.attempt}/{job.max_attempts})"
+                job.available_at = time.time() + delay
+                job.lease_until = None
                 job.touch()
-
-            except NonRetryableJobError as e:
+                self._active.discard(job.id)
+                await self._save(job)
+                self._schedule_retry(job)
+            else:
                 log.error(
-                    "job_failed_nonretryable job_id=%s type=%s error=%s",
+                    "job_failed job_id=%s type=%s attempts=%s error=%s",
                     job.id,
                     job.type,
+                    job.attempt,
                     str(e),
                 )
 
-                # Fail immediately for non-retryable cases
                 job.status = "failed"
-                job.message = "Failed (non-retryable)"
-                job.last_error = str(e)
+                job.message = "Failed"
                 job.touch()
 
-            except BaseException as e:
-                # Retryable failure
-                job.last_error = f"{e}\n{traceback.format_exc()}"
-                job.touch()
-
-                if job.attempt < job.max_attempts:
-                    log.warning(
-                        "job_retrying job_id=%s type=%s attempt=%s/%s delay_s=%.2f error=%s",
-                        job.id,
-                        job.type,
-                        job.attempt,
-                        job.max_attempts,
-                        delay,
-                        str(e),
-                    )
-
-                    # exponential backoff + small jitter
-                    base_delay = min(2 ** (job.attempt - 1), 30)
-                    jitter = random.uniform(0, 0.5)
-                    delay = base_delay + jitter
-
-                    job.status = "retrying"
-                    job.message = f"Retrying in {delay:.1f}s (attempt {job.attempt}/{job.max_attempts})"
-                    job.touch()
-
-                    await asyncio.sleep(delay)
-                    await self._q.put(job.id)
-                else:
-                    log.error(
-                        "job_failed job_id=%s type=%s attempts=%s error=%s",
-                        job.id,
-                        job.type,
-                        job.attempt,
-                        str(e),
-                    )
-
-                    job.status = "failed"
-                    job.message = "Failed"
-                    job.touch()
+        finally:
+            log.info("job_done job_id=%s status=%s", job.id, job.status)
 
+        if job.status in FINISHED:
+            self._active.discard(job.id)
+            job.lease_until = None
+            try:
+                await self._save(job)
             finally:
-                self._done[job_id].set()
-                self._q.task_done()
-
-                log.info("job_done job_id=%s status=%s", job.id, job.status)
+                self._release(job)
@@ -1,10 +1,12 @@
 import uuid
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from typing import Any, Literal, Optional
+from typing import Any, Callable, Literal, Optional
+
+from app.queue.cancel import CancelToken
 
 JobType = Literal["video", "audio"]
-JobStatus = Literal["queued", "running", "retrying", "succeeded", "failed"]
+JobStatus = Literal["queued", "running", "retrying", "succeeded", "failed", "cancelled"]
 
 
 @dataclass
@@ -13,6 +15,9 @@ class Job:
     type: JobType = "video"
     payload: dict[str, Any] = field(default_factory=dict)
 
+    # Higher runs first within its type's lane
+    priority: int = 0
+
     status: JobStatus = "queued"
     progress: int = 0
     message: str = "Queued"
@@ -26,5 +31,25 @@ class Job:
 
     result: Optional[Any] = None
 
+    # Jobs with the same key (same content + pipeline settings) are coalesced
+    # while one of them is queued or running
+    dedup_key: Optional[str] = None
+
+    # Durable queue scheduling (epoch seconds): claimable once `available_at`
+    # has passed (None = not enqueued yet); a running job whose `lease_until`
+    # has passed is presumed lost and handed to another worker
+    available_at: Optional[float] = None
+    lease_until: Optional[float] = None
+
+    # Cancellation/deadline of the current attempt; in memory only
+    cancel: CancelToken = field(default_factory=CancelToken, repr=False, compare=False)
+    # Called after every change while someone watches the job (see
+    # QueueManager.watch); may run on any thread. In memory only
+    on_change: Optional[Callable[[], None]] = field(
+        default=None, repr=False, compare=False
+    )
+
     def touch(self) -> None:
         self.updated_at = datetime.now(UTC)
+        if self.on_change is not None:
+            self.on_change()
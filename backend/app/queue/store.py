@@ -0,0 +1,196 @@
+import json
+import time
+from dataclasses import fields
+from datetime import UTC, datetime
+from typing import Callable, Iterable, List, Optional
+
+from app.db import database
+from app.db.models import QueueJob
+from app.queue.models import Job
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+FINISHED = ("succeeded", "failed", "cancelled")
+# Claimable once `available_at` has passed (retries wait out their backoff)
+WAITING = ("queued", "retrying")
+# States a worker holds a lease for
+LEASED = ("running",)
+
+# Everything but the in-memory cancel token and change hook is persisted
+_JOB_FIELDS = [f.name for f in fields(Job) if f.name not in ("cancel", "on_change")]
+
+
+def _jsonable(value):
+    # Results may carry numpy scalars; anything else unknown is stringified
+    return json.loads(
+        json.dumps(value, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+    )
+
+
+def job_to_row(job: Job) -> dict:
+    row = {name: getattr(job, name) for name in _JOB_FIELDS}
+    row["result"] = _jsonable(job.result)
+    return row
+
+
+def copy_job_state(source: Job, target: Job) -> None:
+    """Overwrite every persisted field of `target` with that of `source`."""
+    for name in _JOB_FIELDS:
+        setattr(target, name, getattr(source, name))
+
+
+def row_to_job(row: QueueJob) -> Job:
+    job = Job(**{name: getattr(row, name) for name in _JOB_FIELDS})
+    # SQLite drops the timezone
+    for name in ("created_at", "updated_at"):
+        value = getattr(job, name)
+        if value.tzinfo is None:
+            setattr(job, name, value.replace(tzinfo=UTC))
+    return job
+
+
+class JobStore:
+    """
+    Queue jobs in the `queue_jobs` table. All methods are blocking and open
+    their own session; QueueManager calls them from a dedicated thread.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        # Looked up per call so a patched SessionLocal is honoured
+        self._session_factory = session_factory or (lambda: database.SessionLocal())
+
+    def write(self, inserts: Iterable[dict], updates: Iterable[dict]) -> None:
+        """Insert new jobs and overwrite existing ones in a single transaction."""
+        inserts, updates = list(inserts), list(updates)
+        with self._session_factory() as session:
+            if inserts:
+                session.execute(insert(QueueJob), inserts)
+            if updates:
+                session.execute(update(QueueJob), updates)
+            session.commit()
+
+    def claim(
+        self,
+        limit: int,
+        lease_s: float,
+        job_type: Optional[str] = None,
+        now: Optional[float] = None,
+    ) -> List[Job]:
+        """
+        Atomically lease up to `limit` jobs (of `job_type`, if given): enqueued
+        jobs and retries that are due, highest priority then oldest first, and
+        jobs whose worker let the lease expire.
+        """
+        now = time.time() if now is None else now
+        claimable = select(QueueJob.id).where(
+            or_(
+                and_(QueueJob.status.in_(WAITING), QueueJob.available_at <= now),
+                and_(QueueJob.status.in_(LEASED), QueueJob.lease_until < now),
+            )
+        )
+        if job_type is not None:
+            claimable = claimable.where(QueueJob.type == job_type)
+        claimable = claimable.order_by(
+            QueueJob.priority.desc(), QueueJob.available_at
+        ).limit(limit)
+        with self._session_factory() as session:
+            rows = (
+                session.execute(
+                    update(QueueJob)
+                    .where(QueueJob.id.in_(claimable.scalar_subquery()))
+                    .values(status="running", lease_until=now + lease_s)
+                    .returning(QueueJob),
+                    execution_options={"synchronize_session": False},
+                )
+                .scalars()
+                .all()
+            )
+            jobs = [row_to_job(row) for row in rows]
+            session.commit()
+        return sorted(jobs, key=lambda j: (-j.priority, j.available_at or 0.0))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._session_factory() as session:
+            row = session.get(QueueJob, job_id)
+            return row_to_job(row) if row is not None else None
+
+    def get_many(self, job_ids: Iterable[str]) -> List[Job]:
+        with self._session_factory() as session:
+            rows = session.scalars(
+                select(QueueJob).where(QueueJob.id.in_(list(job_ids)))
+            )
+            return [row_to_job(row) for row in rows]
+
+    def find(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        job_type: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Job]:
+        """Newest jobs first, optionally only those with given statuses/type."""
+        query = select(QueueJob).order_by(QueueJob.created_at.desc()).limit(limit)
+        if statuses:
+            query = query.where(QueueJob.status.in_(list(statuses)))
+        if job_type is not None:
+            query = query.where(QueueJob.type == job_type)
+        with self._session_factory() as session:
+            return [row_to_job(row) for row in session.scalars(query)]
+
+    def unfinished(self) -> List[Job]:
+        """Jobs still waiting or running, e.g. left behind by a previous process."""
+        with self._session_factory() as session:
+            rows = session.scalars(
+                select(QueueJob)
+                .where(QueueJob.status.not_in(FINISHED))
+                .order_by(QueueJob.created_at)
+            )
+            return [row_to_job(row) for row in rows]
+
+    def count_ready(self) -> int:
+        """Enqueued jobs no worker has claimed yet."""
+        with self._session_factory() as session:
+            return session.scalar(
+                select(func.count())
+                .select_from(QueueJob)
+                .where(QueueJob.status == "queued", QueueJob.available_at.is_not(None))
+            )
+
+    def lane_depths(self, now: Optional[float] = None) -> dict[str, dict]:
+        """
+        Per job type: jobs due and waiting for a worker, how long the oldest has
+        waited, and retries still backing off.
+        """
+        now = time.time() if now is None else now
+        due = QueueJob.available_at <= now
+        with self._session_factory() as session:
+            rows = session.execute(
+                select(
+                    QueueJob.type,
+                    func.count(case((due, 1))),
+                    func.min(case((due, QueueJob.available_at))),
+                    func.count(case((~due, 1))),
+                )
+                .where(QueueJob.status.in_(WAITING), QueueJob.available_at.is_not(None))
+                .group_by(QueueJob.type)
+            )
+            return {
+                job_type: {
+                    "queued": count,
+                    "oldest_wait_s": now - oldest if oldest is not None else 0.0,
+                    "retrying": backing_off,
+                }
+                for job_type, count, oldest, backing_off in rows
+            }
+
+    def purge(self, finished_before: datetime) -> int:
+        """Delete finished jobs last updated before the cutoff."""
+        # Stored naive, in UTC
+        cutoff = finished_before.astimezone(UTC).replace(tzinfo=None)
+        with self._session_factory() as session:
+            deleted = session.execute(
+                delete(QueueJob).where(
+                    QueueJob.status.in_(FINISHED), QueueJob.updated_at < cutoff
+                )
+            ).rowcount
+            session.commit()
+        return deleted
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+log = logging.getLogger("search")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collect items submitted from concurrent requests and process them together.
+
+    The first item of a batch opens a `window_ms` window; the batch is flushed when
+    the window closes or `max_batch` items are waiting, whichever comes first.
+    `process` receives the whole batch in a worker thread (so the event loop is
+    never blocked) and must return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[T]], List[R]],
+        window_ms: float = 5.0,
+        max_batch: int = 64,
+    ) -> None:
+        self._process = process
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2)
+            if self.batches
+            else 0.0,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference so the task is not garbage-collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            results = await asyncio.to_thread(
+                self._process, [item for item, _ in batch]
+            )
+        except Exception as e:
+            log.exception("batch_failed size=%s", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
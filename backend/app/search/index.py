@@ -0,0 +1,295 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+from app.db.models import Transcription, Video
+from sqlalchemy.orm import Session
+
+log = logging.getLogger("search")
+
+MediaType = Literal["video", "transcription"]
+Key = Tuple[MediaType, int]
+Hit = Tuple[MediaType, int, float]
+
+# "exact" scans every row; "ivf" probes the nearest clusters; "auto" switches to
+# ivf once the corpus reaches SEARCH_IVF_MIN_SIZE rows
+SEARCH_INDEX_MODE = os.getenv("SEARCH_INDEX_MODE", "auto")
+SEARCH_IVF_MIN_SIZE = int(os.getenv("SEARCH_IVF_MIN_SIZE", "20000"))
+SEARCH_IVF_NPROBE = int(os.getenv("SEARCH_IVF_NPROBE", "8"))
+
+_TABLES = {"transcription": Transcription, "video": Video}
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, in O(N + k log k)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        part = np.argpartition(scores, len(scores) - k)[-k:]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(scores[part])[::-1]]
+
+
+def _kmeans(
+    vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty clusters from random points
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = _normalize_rows(sums)
+
+    return centroids
+
+
+class VectorIndex:
+    """
+    In-process index over the stored video and transcription embeddings.
+
+    Rows are loaded from the database once and then kept current incrementally:
+    `add` is called by the repository after each commit, and `sync` picks up rows
+    committed by other processes (e.g. worker processes) with a cheap keyset query.
+
+    Vectors are L2-normalized when they are added, so cosine scoring is a single
+    matrix-vector product against the normalized query.
+    """
+
+    def __init__(
+        self,
+        mode: str = SEARCH_INDEX_MODE,
+        ivf_min_size: int = SEARCH_IVF_MIN_SIZE,
+        nprobe: int = SEARCH_IVF_NPROBE,
+    ) -> None:
+        self.mode = mode
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._matrix: Optional[np.ndarray] = None
+            self._size = 0
+            self._keys: List[Key] = []
+            self._rows: Dict[Key, int] = {}
+            self._last_ids: Dict[str, int] = {kind: 0 for kind in _TABLES}
+            self._loaded = False
+            self._synced_at = 0.0
+            # IVF state: unit centroids, row -> cluster, cluster -> rows
+            self._centroids: Optional[np.ndarray] = None
+            self._assignment = np.empty(0, dtype=np.int32)
+            self._lists: List[List[int]] = []
+            self._trained_size = 0
+            # Bumped on every change (and reset), so cached results can be invalidated
+            self.version = getattr(self, "version", 0) + 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def needs_sync(self, max_age_s: float = 0.0) -> bool:
+        return not self._loaded or time.monotonic() - self._synced_at >= max_age_s
+
+    def sync(self, session: Session, max_age_s: float = 0.0) -> None:
+        """
+        Load rows committed since the last sync (all rows on first call).
+
+        Skipped when the last sync is less than `max_age_s` seconds old.
+        """
+        if not self.needs_sync(max_age_s):
+            return
+
+        with self._lock:
+            for kind, table in _TABLES.items():
+                rows = (
+                    session.query(table.id, table.embedding)
+                    .filter(table.id > self._last_ids[kind])
+                    .order_by(table.id)
+                    .all()
+                )
+                for row_id, embedding in rows:
+                    if embedding and (kind, row_id) not in self._rows:
+                        self._add(kind, row_id, np.frombuffer(embedding, np.float32))
+                    self._last_ids[kind] = row_id
+            self._loaded = True
+            self._synced_at = time.monotonic()
+            self._maybe_train()
+
+    def add(self, kind: MediaType, row_id: int, embedding) -> None:
+        """Insert or replace one row; a no-op until the index has been loaded."""
+        if embedding is None or len(embedding) == 0 or not self._loaded:
+            return
+        if isinstance(embedding, (bytes, bytearray)):
+            embedding = np.frombuffer(embedding, dtype=np.float32)
+
+        with self._lock:
+            self._add(kind, row_id, np.asarray(embedding, dtype=np.float32))
+            self._maybe_train()
+
+    def get(self, kind: MediaType, row_id: int) -> Optional[np.ndarray]:
+        """Normalized embedding of one indexed row."""
+        with self._lock:
+            row = self._rows.get((kind, row_id))
+            return None if row is None else self._matrix[row].copy()
+
+    def search(
+        self, query_vec: np.ndarray, top_k: int, exclude: Optional[Key] = None
+    ) -> List[Hit]:
+        """Return up to `top_k` (type, id, cosine score) hits, best first."""
+        return self.search_batch([query_vec], [top_k], [exclude])[0]
+
+    def search_batch(
+        self,
+        query_vecs: Sequence[np.ndarray],
+        top_ks: Sequence[int],
+        excludes: Sequence[Optional[Key]],
+    ) -> List[List[Hit]]:
+        """
+        Search many queries at once; in exact mode all of them are scored with a
+        single matrix multiply.
+        """
+        with self._lock:
+            if self._size == 0:
+                return [[] for _ in top_ks]
+
+            queries = _normalize_rows(np.asarray(query_vecs, dtype=np.float32))
+            # One extra candidate so dropping the excluded row still leaves top_k
+            needed = [k + (1 if ex else 0) for k, ex in zip(top_ks, excludes)]
+
+            if self._centroids is not None and self._use_ivf():
+                results = []
+                for query, n, k, ex in zip(queries, needed, top_ks, excludes):
+                    rows = self._candidate_rows(query, n)
+                    if rows is None:
+                        sims = self._matrix[: self._size] @ query
+                    else:
+                        sims = self._matrix[rows] @ query
+                    results.append(self._collect(sims, rows, n, k, ex))
+                return results
+
+            # (queries, rows) score matrix
+            sims = queries @ self._matrix[: self._size].T
+            return [
+                self._collect(sims[i], None, n, k, ex)
+                for i, (n, k, ex) in enumerate(zip(needed, top_ks, excludes))
+            ]
+
+    def _collect(
+        self,
+        sims: np.ndarray,
+        rows: Optional[np.ndarray],
+        needed: int,
+        top_k: int,
+        exclude: Optional[Key],
+    ) -> List[Hit]:
+        hits = []
+        for idx in top_k_indices(sims, needed):
+            row = idx if rows is None else rows[idx]
+            key = self._keys[row]
+            if key == exclude:
+                continue
+            hits.append((key[0], key[1], float(sims[idx])))
+        return hits[:top_k]
+
+    def _add(self, kind: MediaType, row_id: int, vector: np.ndarray) -> None:
+        key = (kind, row_id)
+        if self._matrix is None:
+            self._matrix = np.empty((1024, vector.shape[0]), dtype=np.float32)
+        if vector.shape[0] != self._matrix.shape[1]:
+            log.warning(
+                "index_skip_dim_mismatch type=%s id=%s dim=%s",
+                kind,
+                row_id,
+                len(vector),
+            )
+            return
+
+        self.version += 1
+
+        row = self._rows.get(key)
+        if row is None:
+            if self._size == len(self._matrix):
+                grown = np.empty(
+                    (2 * len(self._matrix), self._matrix.shape[1]), dtype=np.float32
+                )
+                grown[: self._size] = self._matrix[: self._size]
+                self._matrix = grown
+            row = self._size
+            self._size += 1
+            self._keys.append(key)
+            self._rows[key] = row
+        elif self._centroids is not None:
+            self._lists[self._assignment[row]].remove(row)
+
+        vector = _normalize(vector)
+        self._matrix[row] = vector
+
+        if self._centroids is not None:
+            cluster = int(np.argmax(self._centroids @ vector))
+            if row >= len(self._assignment):
+                self._assignment = np.resize(self._assignment, len(self._matrix))
+            self._assignment[row] = cluster
+            self._lists[cluster].append(row)
+
+    def _use_ivf(self) -> bool:
+        if self.mode == "exact":
+            return False
+        if self.mode == "ivf":
+            return self._size >= 2
+        return self._size >= self.ivf_min_size
+
+    def _maybe_train(self) -> None:
+        # (Re)train the coarse quantizer whenever the corpus has doubled
+        if not self._use_ivf() or self._size < 2 * self._trained_size:
+            return
+
+        vectors = self._matrix[: self._size]
+        nlist = max(1, min(int(np.sqrt(self._size)), self._size))
+        self._centroids = _kmeans(vectors, nlist)
+
+        assignment = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+        self._assignment = np.resize(assignment, len(self._matrix))
+        self._lists = [[] for _ in range(nlist)]
+        for row, cluster in enumerate(assignment):
+            self._lists[cluster].append(row)
+        self._trained_size = self._size
+
+        log.info("index_trained rows=%s nlist=%s", self._size, nlist)
+
+    def _candidate_rows(
+        self, query_vec: np.ndarray, needed: int
+    ) -> Optional[np.ndarray]:
+        # None means "scan every row" (exact mode / fallback)
+        if self._centroids is None or not self._use_ivf():
+            return None
+
+        nprobe = min(self.nprobe, len(self._centroids))
+        probe = top_k_indices(self._centroids @ query_vec, nprobe)
+        rows = [row for cluster in probe for row in self._lists[cluster]]
+
+        # Exact fallback when the probed clusters cannot fill the result
+        if len(rows) < needed:
+            return None
+        return np.asarray(rows, dtype=np.intp)
+
+
+vector_index = VectorIndex()
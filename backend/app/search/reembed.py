@@ -0,0 +1,108 @@
+"""
+Re-embed every video summary and transcript, e.g. after changing the embedding model.
+
+    python -m app.search.reembed [--chunk-size 256]
+
+Rows are streamed from the database in primary-key order, one chunk at a time, so
+memory stays bounded by the chunk size regardless of corpus size. Each chunk is
+encoded with a single model call and written back with one bulk UPDATE.
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from app.db import database, models
+from app.ml.embedding import encode_texts
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+log = logging.getLogger("search")
+
+REEMBED_CHUNK_SIZE = int(os.getenv("REEMBED_CHUNK_SIZE", "256"))
+
+# model -> column holding the text that gets embedded
+_SOURCES = ((models.Video, "summary"), (models.Transcription, "text"))
+
+
+def _reembed_table(session: Session, model, text_column: str, chunk_size: int) -> int:
+    column = getattr(model, text_column)
+    last_id = 0
+    count = 0
+
+    while True:
+        # Keyset pagination: only this chunk's (id, text) pairs are ever in memory
+        rows = (
+            session.query(model.id, column)
+            .filter(model.id > last_id)
+            .order_by(model.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return count
+
+        embeddings = encode_texts([text or "" for _, text in rows])
+        session.execute(
+            update(model),
+            [
+                {"id": row_id, "embedding": embedding.tobytes()}
+                for (row_id, _), embedding in zip(rows, embeddings)
+            ],
+        )
+        session.commit()
+
+        count += len(rows)
+        last_id = rows[-1][0]
+        log.info("reembed_chunk table=%s rows=%s", model.__tablename__, count)
+
+
+def reembed_corpus(
+    chunk_size: int = REEMBED_CHUNK_SIZE,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Dict[str, int]:
+    """
+    Recompute all stored embeddings with the current model.
+
+    Clears this process's search index and caches afterwards; other running API
+    processes keep serving old vectors until restarted (which a model change
+    requires anyway).
+    """
+    from app.search import unified_search
+    from app.search.index import vector_index
+
+    start = time.perf_counter()
+    counts = {}
+
+    with (session_factory or database.get_session)() as session:
+        for model, text_column in _SOURCES:
+            counts[model.__tablename__] = _reembed_table(
+                session, model, text_column, chunk_size
+            )
+
+    # Old vectors and query embeddings came from the previous model
+    vector_index.reset()
+    unified_search.query_cache.clear()
+    unified_search.result_cache.clear()
+
+    log.info(
+        "reembed_done rows=%s elapsed_s=%.1f",
+        counts,
+        time.perf_counter() - start,
+    )
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=REEMBED_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(reembed_corpus(chunk_size=args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
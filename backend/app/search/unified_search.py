@@ -1,97 +1,175 @@
-from typing import Literal, Optional
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import List, Literal, Optional
 
 import numpy as np
 from app.db.database import get_session
 from app.db.models import Transcription, Video
-from sentence_transformers import SentenceTransformer
+from app.ml.registry import get_embedding_model
+from app.search.batcher import MicroBatcher
+from app.search.cache import LRUCache
+from app.search.index import Hit, vector_index
 
 RefType = Literal["video", "transcription"]
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
+# Normalized query text -> embedding
+query_cache = LRUCache(
+    maxsize=int(os.getenv("SEARCH_QUERY_CACHE_SIZE", "2048")),
+    ttl_s=float(os.getenv("SEARCH_QUERY_CACHE_TTL_S", "3600")),
+)
+
+# (query, top_k, filters, index version) -> ranked (type, id, score) hits
+result_cache = LRUCache(maxsize=int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "1024")))
+
+# Rows committed by other processes become searchable within this many seconds;
+# saves made in this process are indexed immediately
+SEARCH_SYNC_INTERVAL_S = float(os.getenv("SEARCH_SYNC_INTERVAL_S", "1.0"))
+
+
+def normalize_query(query: str) -> str:
+    # The embedding model is uncased, so case and spacing do not change the vector
+    return " ".join(query.split()).lower()
+
+
+@dataclass(frozen=True)
+class SearchRequest:
+    query: Optional[str]  # normalized query text, or None for reference search
+    top_k: int
+    ref_type: Optional[RefType] = None
+    ref_id: Optional[int] = None
+    exclude_self: bool = True
+
+    def cache_key(self) -> tuple:
+        # Saves bump the index version, which invalidates cached results
+        return (
+            self.query,
+            self.top_k,
+            self.ref_type,
+            self.ref_id,
+            self.exclude_self,
+            vector_index.version,
+        )
+
+
+def _make_request(
+    query: Optional[str],
+    top_k: int,
+    ref_type: Optional[RefType],
+    ref_id: Optional[int],
+    exclude_self: bool,
+) -> Optional[SearchRequest]:
+    q = (query or "").strip()
 
-def cosine_sim_matrix(query_vec: np.ndarray, matrix: np.ndarray) -> np.ndarray:
-    query_norm = np.linalg.norm(query_vec)
-    matrix_norms = np.linalg.norm(matrix, axis=1)
-    return (matrix @ query_vec) / ((query_norm * matrix_norms) + 1e-12)
+    if q:
+        return SearchRequest(normalize_query(q), top_k, exclude_self=exclude_self)
 
+    # Require either a non-empty query OR a reference
+    if ref_type in ("transcription", "video") and ref_id is not None:
+        return SearchRequest(None, top_k, ref_type, ref_id, exclude_self)
+
+    return None
+
+
+def _sync_index() -> None:
+    # Pick up rows committed elsewhere (e.g. by worker processes)
+    with get_session() as session:
+        vector_index.sync(session, max_age_s=SEARCH_SYNC_INTERVAL_S)
+
+
+def search_batch(requests: List[SearchRequest]) -> List[Optional[List[Hit]]]:
+    """
+    Rank many requests together: uncached query texts are embedded with a single
+    `encode([...])` call and all queries are scored in one matrix multiply.
+
+    Returns one hit list per request (None if its reference does not exist).
+    """
+    vectors = {}
+    missing = []
+    for request in requests:
+        if request.query is not None and request.query not in vectors:
+            vectors[request.query] = query_cache.get(request.query)
+            if vectors[request.query] is None:
+                missing.append(request.query)
+
+    if missing:
+        encoded = np.asarray(get_embedding_model().encode(missing), dtype=np.float32)
+        for text, embedding in zip(missing, encoded.reshape(len(missing), -1)):
+            embedding = embedding.copy()
+            embedding.setflags(write=False)
+            query_cache.put(text, embedding)
+            vectors[text] = embedding
+
+    results: List[Optional[List[Hit]]] = [None] * len(requests)
+    slots, query_vecs, top_ks, excludes = [], [], [], []
+
+    for slot, request in enumerate(requests):
+        exclude = None
+        if request.query is not None:
+            query_vec = vectors[request.query]
+        else:
+            # Reference search: use the indexed embedding of the reference record
+            query_vec = vector_index.get(request.ref_type, request.ref_id)
+            if query_vec is None:
+                continue
+            if request.exclude_self:
+                exclude = (request.ref_type, request.ref_id)
 
-def search_media(
-    query: Optional[str] = None,
-    top_k: int = 3,
-    ref_type: Optional[RefType] = None,
-    ref_id: Optional[int] = None,
-    exclude_self: bool = True,
-):
-    session = get_session()
+        slots.append(slot)
+        query_vecs.append(query_vec)
+        top_ks.append(request.top_k)
+        excludes.append(exclude)
 
-    q = (query or "").strip()
+    if query_vecs:
+        for slot, hits in zip(
+            slots, vector_index.search_batch(query_vecs, top_ks, excludes)
+        ):
+            results[slot] = hits
 
-    # Require either a non-empty query OR a reference
-    if not q and not (ref_type and ref_id is not None):
-        return []
+    return results
 
-    # Fetch rows
-    audio_rows = session.query(Transcription).all()
-    video_rows = session.query(Video).all()
-
-    # Build embedding arrays and aligned metadata
-    audio_embeds = []
-    audio_meta = []
-    for a in audio_rows:
-        if a.embedding:
-            audio_embeds.append(np.frombuffer(a.embedding, dtype=np.float32))
-            audio_meta.append(a)
-
-    video_embeds = []
-    video_meta = []
-    for v in video_rows:
-        if v.embedding:
-            video_embeds.append(np.frombuffer(v.embedding, dtype=np.float32))
-            video_meta.append(v)
-
-    if not audio_embeds and not video_embeds:
-        return []
 
-    all_embeds = np.vstack(audio_embeds + video_embeds)
+# Concurrent /search requests share one encode call and one matmul per window
+search_batcher: MicroBatcher[SearchRequest, Optional[List[Hit]]] = MicroBatcher(
+    search_batch,
+    window_ms=float(os.getenv("SEARCH_BATCH_WINDOW_MS", "5")),
+    max_batch=int(os.getenv("SEARCH_BATCH_MAX_SIZE", "64")),
+)
 
-    # Build query embedding (either text or reference embedding)
-    reference_key = None  # used to filter out self result if requested
 
-    if q:
-        query_emb = model.encode(q)
-    else:
-        # Reference search: load the reference record embedding
-        if ref_type == "transcription":
-            ref = session.query(Transcription).filter_by(id=ref_id).first()
-            if not ref or not ref.embedding:
-                return []
-            query_emb = np.frombuffer(ref.embedding, dtype=np.float32)
-            reference_key = ("transcription", ref_id)
-        elif ref_type == "video":
-            ref = session.query(Video).filter_by(id=ref_id).first()
-            if not ref or not ref.embedding:
-                return []
-            query_emb = np.frombuffer(ref.embedding, dtype=np.float32)
-            reference_key = ("video", ref_id)
-        else:
-            return []
+def search_stats() -> dict:
+    return {
+        "query_cache": query_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "batcher": search_batcher.stats(),
+        "index": {"rows": len(vector_index), "version": vector_index.version},
+    }
 
-    sims = cosine_sim_matrix(query_emb, all_embeds)
 
-    # Sort all indices by similarity descending
-    sorted_indices = sims.argsort()[::-1]
+def _load_results(hits: List[Hit]) -> list:
+    if not hits:
+        return []
 
-    results = []
-    total_audio = len(audio_embeds)
+    # Only the top-k rows are read back from the database
+    audio_ids = [row_id for kind, row_id, _ in hits if kind == "transcription"]
+    video_ids = [row_id for kind, row_id, _ in hits if kind == "video"]
 
-    for idx in sorted_indices:
-        score = float(sims[idx])
+    with get_session() as session:
+        audio_rows = {
+            a.id: a
+            for a in session.query(Transcription).filter(
+                Transcription.id.in_(audio_ids)
+            )
+        }
+        video_rows = {
+            v.id: v for v in session.query(Video).filter(Video.id.in_(video_ids))
+        }
 
-        if idx < total_audio:
-            a = audio_meta[idx]
-            item_key = ("transcription", a.id)
-            if exclude_self and reference_key and item_key == reference_key:
+    results = []
+    for kind, row_id, score in hits:
+        if kind == "transcription":
+            a = audio_rows.get(row_id)
+            if a is None:
                 continue
             results.append(
                 {
@@ -103,9 +181,8 @@ def search_media(
                 }
             )
         else:
-            v = video_meta[idx - total_audio]
-            item_key = ("video", v.id)
-            if exclude_self and reference_key and item_key == reference_key:
+            v = video_rows.get(row_id)
+            if v is None:
                 continue
             results.append(
                 {
@@ -117,7 +194,59 @@ def search_media(
                 }
             )
 
-        if len(results) >= top_k:
-            break
-
     return results
+
+
+def search_media(
+    query: Optional[str] = None,
+    top_k: int = 3,
+    ref_type: Optional[RefType] = None,
+    ref_id: Optional[int] = None,
+    exclude_self: bool = True,
+):
+    request = _make_request(query, top_k, ref_type, ref_id, exclude_self)
+    if request is None:
+        return []
+
+    _sync_index()
+
+    cache_key = request.cache_key()
+    hits = result_cache.get(cache_key)
+    if hits is None:
+        hits = search_batch([request])[0]
+        if hits is None:
+            return []
+        result_cache.put(cache_key, hits)
+
+    return _load_results(hits)
+
+
+async def search_media_async(
+    query: Optional[str] = None,
+    top_k: int = 3,
+    ref_type: Optional[RefType] = None,
+    ref_id: Optional[int] = None,
+    exclude_self: bool = True,
+):
+    """
+    Same as `search_media`, without blocking the event loop: ranking goes through
+    the shared micro-batcher and database access runs in worker threads.
+    """
+    request = _make_request(query, top_k, ref_type, ref_id, exclude_self)
+    if request is None:
+        return []
+
+    if vector_index.needs_sync(SEARCH_SYNC_INTERVAL_S):
+        await asyncio.to_thread(_sync_index)
+
+    cache_key = request.cache_key()
+    hits = result_cache.get(cache_key)
+    if hits is None:
+        hits = await search_batcher.submit(request)
+        if hits is None:
+            return []
+        result_cache.put(cache_key, hits)
+
+    if not hits:
+        return []
+    return await asyncio.to_thread(_load_results, hits)
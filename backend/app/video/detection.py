@@ -1,6 +1,7 @@
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
 import cv2
+import numpy as np
 
 # MobileNet SSD class labels
 CLASSES = [
@@ -27,50 +28,118 @@ CLASSES = [
     "tvmonitor",
 ]
 
+_LABELS = np.array(CLASSES)
+
+# Columnar detection record; box is (x1, y1, x2, y2) in source-frame pixels
+DETECTION_DTYPE = np.dtype(
+    [
+        ("class_id", np.int16),
+        ("confidence", np.float64),
+        ("timestamp", np.float64),
+        ("box", np.int32, (4,)),
+    ]
+)
+
+
+def detections_to_dicts(detections: np.ndarray) -> List[Dict]:
+    """
+    Convert a DETECTION_DTYPE array into the list-of-dicts API/storage format.
+    """
+    labels = _LABELS[detections["class_id"]].tolist()
+    confidences = detections["confidence"].tolist()
+    timestamps = detections["timestamp"].tolist()
+    boxes = detections["box"].tolist()
+
+    return [
+        {"label": label, "confidence": confidence, "timestamp": timestamp, "box": box}
+        for label, confidence, timestamp, box in zip(
+            labels, confidences, timestamps, boxes
+        )
+    ]
+
 
 class ObjectDetector:
     def __init__(
-        self, prototxt_path: str, model_path: str, confidence_threshold: float = 0.5
+        self,
+        prototxt_path: str,
+        model_path: str,
+        confidence_threshold: float = 0.5,
+        batch_size: int = 8,
     ):
         self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
         self.confidence_threshold = confidence_threshold
+        self.batch_size = max(1, batch_size)
 
     def detect(self, frame, timestamp: float) -> List[Dict]:
         """
         Run object detection on a single frame.
 
         Returns:
-            List of detected objects with label, confidence, timestamp
+            List of detected objects with label, confidence, timestamp, box
         """
-        (h, w) = frame.shape[:2]
+        return detections_to_dicts(self.detect_batch([frame], [timestamp]))
 
-        blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (300, 300)),
-            scalefactor=0.007843,
-            size=(300, 300),
-            mean=127.5,
-        )
+    def detect_batch(self, frames: Sequence, timestamps: Sequence[float]) -> np.ndarray:
+        """
+        Run object detection on many frames, one forward pass per `batch_size` frames.
 
-        self.net.setInput(blob)
-        detections = self.net.forward()
+        Returns:
+            DETECTION_DTYPE structured array in frame order
+            (see `detections_to_dicts` for the API representation)
+        """
+        if len(frames) != len(timestamps):
+            raise ValueError("frames and timestamps must have the same length")
+
+        batches = []
+        for start in range(0, len(frames), self.batch_size):
+            chunk = frames[start : start + self.batch_size]
+            chunk_timestamps = timestamps[start : start + self.batch_size]
 
-        results = []
+            blob = cv2.dnn.blobFromImages(
+                chunk,
+                scalefactor=0.007843,
+                size=(300, 300),
+                mean=127.5,
+            )
 
-        for i in range(detections.shape[2]):
-            confidence = float(detections[0, 0, i, 2])
+            self.net.setInput(blob)
+            detections = self.net.forward()
 
-            if confidence < self.confidence_threshold:
-                continue
+            batches.append(self._postprocess(detections, chunk, chunk_timestamps))
 
-            class_id = int(detections[0, 0, i, 1])
-            label = CLASSES[class_id]
+        if not batches:
+            return np.empty(0, dtype=DETECTION_DTYPE)
+        return np.concatenate(batches)
 
-            results.append(
-                {
-                    "label": label,
-                    "confidence": round(confidence, 3),
-                    "timestamp": round(timestamp, 2),
-                }
-            )
+    def _postprocess(
+        self, detections: np.ndarray, frames: Sequence, timestamps: Sequence[float]
+    ) -> np.ndarray:
+        # detections shape: (1, 1, N, 7)
+        # [image_id, class_id, confidence, x1, y1, x2, y2], box normalized to [0, 1]
+        rows = detections.reshape(-1, 7)
+        image_ids = rows[:, 0].astype(np.intp)
+        class_ids = rows[:, 1].astype(np.intp)
+
+        keep = (
+            (rows[:, 2] >= self.confidence_threshold)
+            & (image_ids >= 0)
+            & (image_ids < len(frames))
+            & (class_ids >= 0)
+            & (class_ids < len(CLASSES))
+        )
+        rows = rows[keep]
+        image_ids = image_ids[keep]
+
+        # (w, h, w, h) per frame, so boxes scale in one broadcast
+        sizes = np.array(
+            [(f.shape[1], f.shape[0]) * 2 for f in frames], dtype=np.float64
+        )
 
-        return results
+        out = np.empty(len(rows), dtype=DETECTION_DTYPE)
+        out["class_id"] = class_ids[keep]
+        out["confidence"] = np.round(rows[:, 2].astype(np.float64), 3)
+        out["timestamp"] = np.round(np.asarray(timestamps, dtype=np.float64), 2)[
+            image_ids
+        ]
+        out["box"] = np.rint(np.clip(rows[:, 3:7], 0.0, 1.0) * sizes[image_ids])
+        return out
@@ -1,65 +1,269 @@
-from typing import Dict, List
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import cv2
+import numpy as np
 
 
-def extract_keyframes(
-    video_path: str, frame_interval: int = 10, diff_threshold: float = 0.05
-) -> List[Dict]:
+# Frames wider than this are downscaled before the grayscale/histogram step.
+# Nearest-neighbour subsampling keeps the pixel distribution unbiased, so scene-change
+# scores stay within 0.01 of full-resolution scores (see README).
+DEFAULT_ANALYSIS_WIDTH = 320
+
+
+def bhattacharyya_distance(
+    hist_a: np.ndarray, hist_b: np.ndarray, out: Optional[np.ndarray] = None
+) -> float:
     """
-    Extract keyframes using scene change detection based on histogram difference.
+    Bhattacharyya distance between two histograms, as cv2.HISTCMP_BHATTACHARYYA.
 
-    Args:
-        video_path: Path to video file
-        frame_interval: Process every Nth frame
-        diff_threshold: Threshold for scene change detection
+    Histograms need not be normalized. `out` is an optional float64 scratch buffer
+    of the same shape, reused to avoid a temporary allocation per comparison.
+    """
+    out = np.multiply(hist_a, hist_b, out=out, dtype=np.float64)
+    np.sqrt(out, out=out)
+    overlap = float(out.sum())
 
-    Returns:
-        List of keyframes with timestamp and frame index
+    norm = float(hist_a.sum()) * float(hist_b.sum())
+    if norm > np.finfo(np.float64).eps:
+        overlap /= math.sqrt(norm)
+
+    return math.sqrt(max(1.0 - overlap, 0.0))
+
+
+class HistogramAnalyzer:
     """
-    cap = cv2.VideoCapture(video_path)
+    Grayscale histograms of sampled frames, computed at a bounded analysis resolution.
 
-    if not cap.isOpened():
-        raise RuntimeError(f"Failed to open video: {video_path}")
+    All intermediate images and histograms live in buffers allocated on the first
+    frame and reused for every following frame of the same size.
+    """
 
+    def __init__(self, analysis_width: Optional[int] = DEFAULT_ANALYSIS_WIDTH):
+        self.analysis_width = analysis_width
+        self._frame_shape = None
+        self._small = None
+        self._gray = None
+        self._hists = None
+        self._scratch = None
+        self._current = 0
+
+    def _allocate(self, frame: np.ndarray) -> None:
+        h, w = frame.shape[:2]
+        if self.analysis_width and w > self.analysis_width:
+            size = (self.analysis_width, max(1, round(h * self.analysis_width / w)))
+            self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        else:
+            size = (w, h)
+            self._small = None
+
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        # Two histograms, swapped every frame: current and previous
+        self._hists = np.zeros((2, 256, 1), dtype=np.float32)
+        self._scratch = np.empty((256, 1), dtype=np.float64)
+        self._frame_shape = frame.shape
+
+    def histogram(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Compute the histogram of `frame` into the next buffer and return it.
+
+        The returned array is overwritten two calls later.
+        """
+        if frame.shape != self._frame_shape:
+            self._allocate(frame)
+
+        source = frame
+        if self._small is not None:
+            cv2.resize(
+                frame,
+                (self._small.shape[1], self._small.shape[0]),
+                dst=self._small,
+                interpolation=cv2.INTER_NEAREST,
+            )
+            source = self._small
+
+        cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        self._current ^= 1
+        hist = self._hists[self._current]
+        cv2.calcHist([self._gray], [0], None, [256], [0, 256], hist=hist)
+        return hist
+
+    def distance(self, hist_a: np.ndarray, hist_b: np.ndarray) -> float:
+        return bhattacharyya_distance(hist_a, hist_b, out=self._scratch)
+
+
+def iter_sampled_frames(
+    cap: cv2.VideoCapture,
+    frame_interval: int = 10,
+    sample_interval_ms: Optional[float] = None,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    check_cancelled: Optional[Callable[[], None]] = None,
+    on_sample: Optional[Callable[[int], None]] = None,
+) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Walk an opened capture and decode only the frames that are sampled.
+
+    Every frame is advanced with `grab()` (demux + decode, no colour conversion or
+    copy); only sampled frames are `retrieve()`d into a BGR image.
+
+    Args:
+        cap: Opened cv2.VideoCapture positioned at `start_frame`
+        frame_interval: Sample every Nth frame (ignored when sample_interval_ms is set)
+        sample_interval_ms: Sample on a fixed time grid of this many milliseconds,
+            using the container timestamps, so variable-fps videos are sampled evenly
+        start_frame: Index of the frame the capture is positioned at
+        end_frame: Stop before this frame index (None reads to the end)
+        check_cancelled: Called before every frame; raises to abort the walk
+        on_sample: Called with the index of every sampled frame (progress)
+
+    Yields:
+        (frame_index, timestamp_seconds, frame) tuples in frame order
+    """
     fps = cap.get(cv2.CAP_PROP_FPS)
-    prev_hist = None
-    keyframes = []
-    frame_index = 0
+    frame_index = start_frame - 1
+    next_sample_ms = 0.0
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
+    while end_frame is None or frame_index + 1 < end_frame:
+        if check_cancelled is not None:
+            check_cancelled()
+        if not cap.grab():
             break
+        frame_index += 1
+
+        if sample_interval_ms is None:
+            if frame_index % frame_interval != 0:
+                continue
+            timestamp = frame_index / fps if fps > 0 else 0
+        else:
+            position_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            # Small epsilon: container timestamps are not exact multiples
+            if position_ms + 1e-3 < next_sample_ms:
+                continue
+            next_sample_ms = (
+                math.floor((position_ms + 1e-3) / sample_interval_ms) + 1
+            ) * sample_interval_ms
+            timestamp = position_ms / 1000.0
+
+        if on_sample is not None:
+            on_sample(frame_index)
 
-        # Process every N frames
-        if frame_index % frame_interval != 0:
-            frame_index += 1
+        ret, frame = cap.retrieve()
+        if not ret:
             continue
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        yield frame_index, timestamp, frame
+
+
+def iter_keyframes(
+    cap: cv2.VideoCapture,
+    frame_interval: int = 10,
+    diff_threshold: float = 0.05,
+    sample_interval_ms: Optional[float] = None,
+    analysis_width: Optional[int] = DEFAULT_ANALYSIS_WIDTH,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    check_cancelled: Optional[Callable[[], None]] = None,
+    on_sample: Optional[Callable[[int], None]] = None,
+) -> Iterator[Tuple[Dict, np.ndarray]]:
+    """
+    Decode an opened capture once and yield each keyframe together with its frame.
+
+    The frame is handed to the caller while it is still in memory, so downstream
+    stages (e.g. object detection) never need to seek back into the video.
+
+    The first sampled frame only seeds the histogram comparison. To process a
+    range of a longer video, position the capture one sample before the range
+    (see `app.video.pipeline.process_video_segmented`).
 
-        # Compute normalized histogram
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        hist = cv2.normalize(hist, hist).flatten()
+    Args:
+        cap: Opened cv2.VideoCapture positioned at `start_frame`
+        frame_interval: Process every Nth frame
+        diff_threshold: Threshold for scene change detection
+        sample_interval_ms: Process one frame every N milliseconds instead
+        analysis_width: Downscale wider frames to this width before scoring
+            (None analyses at full resolution)
+        start_frame: Index of the frame the capture is positioned at
+        end_frame: Stop before this frame index (None reads to the end)
+        check_cancelled: Called before every frame; raises to abort
+        on_sample: Called with the index of every sampled frame (progress)
+
+    Yields:
+        (keyframe, frame) tuples in frame order
+    """
+    analyzer = HistogramAnalyzer(analysis_width)
+    prev_hist = None
+
+    for frame_index, timestamp, frame in iter_sampled_frames(
+        cap,
+        frame_interval,
+        sample_interval_ms,
+        start_frame,
+        end_frame,
+        check_cancelled,
+        on_sample,
+    ):
+        # Downscaled grayscale histogram, written into reused buffers
+        hist = analyzer.histogram(frame)
 
         if prev_hist is not None:
             # Compare histograms
-            diff = cv2.compareHist(prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+            diff = analyzer.distance(prev_hist, hist)
 
             if diff > diff_threshold:
-                timestamp = frame_index / fps if fps > 0 else 0
-                keyframes.append(
-                    {
-                        "frame_index": frame_index,
-                        "timestamp": round(timestamp, 2),
-                        "scene_change_score": round(float(diff), 3),
-                    }
-                )
+                keyframe = {
+                    "frame_index": frame_index,
+                    "timestamp": round(timestamp, 2),
+                    "scene_change_score": round(float(diff), 3),
+                }
+                yield keyframe, frame
 
         prev_hist = hist
-        frame_index += 1
 
-    cap.release()
-    return keyframes
+
+def extract_keyframes(
+    video_path: str,
+    frame_interval: int = 10,
+    diff_threshold: float = 0.05,
+    sample_interval_ms: Optional[float] = None,
+    analysis_width: Optional[int] = DEFAULT_ANALYSIS_WIDTH,
+    check_cancelled: Optional[Callable[[], None]] = None,
+    on_sample: Optional[Callable[[int], None]] = None,
+) -> List[Dict]:
+    """
+    Extract keyframes using scene change detection based on histogram difference.
+
+    Args:
+        video_path: Path to video file
+        frame_interval: Process every Nth frame
+        diff_threshold: Threshold for scene change detection
+        sample_interval_ms: Process one frame every N milliseconds instead
+        analysis_width: Downscale wider frames to this width before scoring
+            (None analyses at full resolution)
+        check_cancelled: Called before every frame; raises to abort
+        on_sample: Called with the index of every sampled frame (progress)
+
+    Returns:
+        List of keyframes with timestamp and frame index
+    """
+    cap = cv2.VideoCapture(video_path)
+
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+
+    try:
+        return [
+            keyframe
+            for keyframe, _ in iter_keyframes(
+                cap,
+                frame_interval,
+                diff_threshold,
+                sample_interval_ms,
+                analysis_width,
+                check_cancelled=check_cancelled,
+                on_sample=on_sample,
+            )
+        ]
+    finally:
+        cap.release()
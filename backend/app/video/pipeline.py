@@ -1,13 +1,85 @@
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import cv2
-from app.video.detection import ObjectDetector
-from app.video.keyframes import extract_keyframes
+import numpy as np
+from app.video.detection import DETECTION_DTYPE, ObjectDetector, detections_to_dicts
+from app.video.keyframes import DEFAULT_ANALYSIS_WIDTH, iter_keyframes
 
 
-def process_video_frames(video_path: str, detector: ObjectDetector) -> Dict:
+def _detect_keyframes(
+    cap: cv2.VideoCapture,
+    detector: ObjectDetector,
+    frame_interval: int,
+    sample_interval_ms: Optional[float],
+    analysis_width: Optional[int],
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    check_cancelled: Optional[Callable[[], None]] = None,
+    on_sample: Optional[Callable[[int], None]] = None,
+) -> Tuple[List[dict], np.ndarray]:
+    keyframes: List[dict] = []
+    detection_batches: List[np.ndarray] = []
+
+    # Bounded buffer: at most batch_size decoded frames are held at once
+    pending_frames = []
+    pending_timestamps: List[float] = []
+
+    def _flush() -> None:
+        if not pending_frames:
+            return
+        detection_batches.append(
+            detector.detect_batch(pending_frames, pending_timestamps)
+        )
+        pending_frames.clear()
+        pending_timestamps.clear()
+
+    for keyframe, frame in iter_keyframes(
+        cap,
+        frame_interval,
+        sample_interval_ms=sample_interval_ms,
+        analysis_width=analysis_width,
+        start_frame=start_frame,
+        end_frame=end_frame,
+        check_cancelled=check_cancelled,
+        on_sample=on_sample,
+    ):
+        keyframes.append(keyframe)
+
+        pending_frames.append(frame)
+        pending_timestamps.append(keyframe["timestamp"])
+        if len(pending_frames) >= detector.batch_size:
+            _flush()
+
+    _flush()
+
+    if detection_batches:
+        detections = np.concatenate(detection_batches)
+    else:
+        detections = np.empty(0, dtype=DETECTION_DTYPE)
+
+    return keyframes, detections
+
+
+def process_video_frames(
+    video_path: str,
+    detector: ObjectDetector,
+    frame_interval: int = 10,
+    sample_interval_ms: Optional[float] = None,
+    analysis_width: Optional[int] = DEFAULT_ANALYSIS_WIDTH,
+    check_cancelled: Optional[Callable[[], None]] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Dict:
     """
-    Run key frame extraction + object detection.
+    Run key frame extraction + object detection in a single decode pass.
+
+    Detection runs on keyframes while their frames are still in memory, so the
+    video is decoded exactly once and never seeked. Keyframes are buffered up to
+    `detector.batch_size` frames and detected with one forward pass per batch.
+
+    Sampling is frame-based (`frame_interval`) unless `sample_interval_ms` is set.
+    `check_cancelled` is called before every frame and raises to abort;
+    `progress` gets the fraction of the video decoded after every sample.
 
     Returns:
         {
@@ -19,21 +91,165 @@ def process_video_frames(video_path: str, detector: ObjectDetector) -> Dict:
     if not cap.isOpened():
         raise RuntimeError(f"Cannot open video: {video_path}")
 
-    keyframes = extract_keyframes(video_path)
-    all_detections: List[dict] = []
+    on_sample = None
+    if progress is not None:
+        frame_count = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 1)
+
+        def on_sample(frame_index: int) -> None:
+            # The frame count is an estimate
+            progress(min((frame_index + 1) / frame_count, 1.0))
+
+    try:
+        keyframes, detections = _detect_keyframes(
+            cap,
+            detector,
+            frame_interval,
+            sample_interval_ms,
+            analysis_width,
+            check_cancelled=check_cancelled,
+            on_sample=on_sample,
+        )
+    finally:
+        cap.release()
+
+    # Detections stay columnar until here; dicts are only built for the result
+    return {"keyframes": keyframes, "objects": detections_to_dicts(detections)}
+
+
+def plan_segments(
+    frame_count: int, segment_count: int, frame_interval: int
+) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split [0, frame_count) into contiguous (start, end) frame ranges.
+
+    Boundaries fall on sampled frames (multiples of `frame_interval`) so each
+    segment samples exactly the frames a sequential pass would. The last segment
+    is open-ended because CAP_PROP_FRAME_COUNT is only an estimate.
+    """
+    samples = -(-frame_count // frame_interval)
+    segment_count = max(1, min(segment_count, samples))
+
+    bounds = [
+        (samples * i // segment_count) * frame_interval
+        for i in range(segment_count + 1)
+    ]
+    segments: List[Tuple[int, Optional[int]]] = list(zip(bounds[:-1], bounds[1:]))
+    segments[-1] = (segments[-1][0], None)
+    return segments
+
+
+def _process_segment(
+    video_path: str,
+    detector: ObjectDetector,
+    start: int,
+    end: Optional[int],
+    frame_interval: int,
+    analysis_width: Optional[int],
+    check_cancelled: Optional[Callable[[], None]] = None,
+    on_sample: Optional[Callable[[int], None]] = None,
+) -> Tuple[List[dict], np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+
+    try:
+        # Start one sample early: that frame only seeds the histogram comparison,
+        # so a scene change right at the boundary is scored exactly once
+        seed = max(0, start - frame_interval)
+        if seed > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, seed)
 
-    for kf in keyframes:
-        frame_index = kf["frame_index"]
-        timestamp = kf["timestamp"]
+        return _detect_keyframes(
+            cap,
+            detector,
+            frame_interval,
+            None,
+            analysis_width,
+            start_frame=seed,
+            end_frame=end,
+            check_cancelled=check_cancelled,
+            on_sample=on_sample,
+        )
+    finally:
+        cap.release()
+
+
+def process_video_segmented(
+    video_path: str,
+    detectors: Sequence[ObjectDetector],
+    frame_interval: int = 10,
+    analysis_width: Optional[int] = DEFAULT_ANALYSIS_WIDTH,
+    min_segment_frames: int = 0,
+    check_cancelled: Optional[Callable[[], None]] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Dict:
+    """
+    Run key frame extraction + object detection on time segments in parallel.
 
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-        ret, frame = cap.read()
-        if not ret:
-            continue
+    The video is split into up to one frame range per detector; the ranges are
+    decoded and detected concurrently (OpenCV releases the GIL while decoding and
+    running the DNN). Each segment thread uses its own detector from
+    `detectors`, since a cv2.dnn network must not be shared between threads;
+    callers keep them loaded across jobs. Results are merged in timestamp order
+    and match `process_video_frames` with the same settings.
 
-        detections = detector.detect(frame, timestamp)
-        all_detections.extend(detections)
+    Videos shorter than `min_segment_frames` per segment use fewer segments.
+    Only frame-based sampling is supported. Every segment thread calls
+    `check_cancelled` before each frame; the first exception is re-raised.
+    `progress` gets the fraction of the video decoded across all segments.
 
+    Returns:
+        {
+          "keyframes": [...],
+          "objects": [...]
+        }
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     cap.release()
 
-    return {"keyframes": keyframes, "objects": all_detections}
+    workers = len(detectors)
+    if min_segment_frames > 0:
+        workers = min(workers, frame_count // min_segment_frames)
+    segments = plan_segments(max(frame_count, 1), max(1, workers), frame_interval)
+
+    # Frames decoded so far, per segment; each slot is written by one thread
+    decoded = [0] * len(segments)
+
+    def _run(i: int) -> Tuple[List[dict], np.ndarray]:
+        start, end = segments[i]
+
+        on_sample = None
+        if progress is not None:
+
+            def on_sample(frame_index: int) -> None:
+                decoded[i] = max(frame_index + 1 - start, 0)
+                progress(min(sum(decoded) / max(frame_count, 1), 1.0))
+
+        result = _process_segment(
+            video_path,
+            detectors[i],
+            start,
+            end,
+            frame_interval,
+            analysis_width,
+            check_cancelled,
+            on_sample,
+        )
+        if on_sample is not None:
+            # Frames after the segment's last sample are decoded too
+            on_sample((frame_count if end is None else end) - 1)
+        return result
+
+    with ThreadPoolExecutor(
+        max_workers=len(segments), thread_name_prefix="video-segment"
+    ) as executor:
+        results = list(executor.map(_run, range(len(segments))))
+
+    # Segments are disjoint and ordered, so concatenation is timestamp order
+    keyframes = [kf for segment_keyframes, _ in results for kf in segment_keyframes]
+    detections = np.concatenate([d for _, d in results])
+
+    return {"keyframes": keyframes, "objects": detections_to_dicts(detections)}
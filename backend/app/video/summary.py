@@ -2,10 +2,7 @@ from collections import defaultdict
 from typing import Dict, List
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
-
-# Load once (same model as audio)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+from app.ml.embedding import embed_text
 
 
 def generate_video_summary(detections: List[Dict]) -> str:
@@ -33,8 +30,10 @@ def generate_video_summary(detections: List[Dict]) -> str:
 def generate_video_embedding(summary_text: str) -> bytes:
     """
     Generate text embedding for video summary.
+
+    Batched with summaries/transcripts from other jobs finishing at the same time.
     """
-    embedding_vector = embedding_model.encode(summary_text)
+    embedding_vector = embed_text(summary_text)
 
     # Convert to float32 bytes for SQLite BLOB
     embedding_bytes = embedding_vector.astype(np.float32).tobytes()
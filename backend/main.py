@@ -1,7 +1,13 @@
+import asyncio
 import logging
+import os
 
-from app.api import audio, health, jobs, search, video
+from app.api import audio, batch, health, jobs, search, video
+from app.api.uploads import UploadLimitMiddleware
 from app.db.database import Base, engine
+from app.ml.registry import registry
+from app.processing import processor
+from app.processing.pool import ProcessWorkerPool
 from app.processing.processor import process_job
 from app.queue.manager import QueueManager
 from fastapi import FastAPI
@@ -9,8 +15,18 @@ from fastapi.middleware.cors import CORSMiddleware
 
 Base.metadata.create_all(bind=engine)
 
+# "thread" runs jobs in the API process; "process" runs them in worker pools
+WORKER_MODE = os.getenv("WORKER_MODE", "thread")
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "1"))
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "1"))
+
+# Comma-separated models to load in the background at startup ("all" = every model)
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "")
+
 app = FastAPI(title="Multimedia Processing Backend")
 
+app.add_middleware(UploadLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -22,6 +38,7 @@ app.add_middleware(
 app.include_router(health.router)
 app.include_router(video.router)
 app.include_router(audio.router)
+app.include_router(batch.router)
 app.include_router(search.router)
 app.include_router(jobs.router)
 
@@ -33,10 +50,39 @@ logging.basicConfig(
 
 @app.on_event("startup")
 async def startup():
-    app.state.queue = QueueManager()
-    await app.state.queue.start(worker_count=1, processor=process_job)
+    # Concurrent in-process audio jobs are what Whisper batches are made of;
+    # video jobs share one detector, so they get one worker and audio the rest
+    worker_count = max(1, processor.AUDIO_BATCH_SIZE) + 1
+    lane_limits = {"video": 1}
+    app.state.pool = None
+
+    if WORKER_MODE == "process":
+        app.state.pool = ProcessWorkerPool(
+            {"video": VIDEO_WORKERS, "audio": AUDIO_WORKERS},
+            initializer=processor.init_worker,
+            runner=processor.run_job_sync,
+        )
+        app.state.pool.start()
+        processor.set_worker_pool(app.state.pool)
+        # One queue worker per pool process keeps every process fed
+        worker_count = max(1, VIDEO_WORKERS + AUDIO_WORKERS)
+        lane_limits = {"video": VIDEO_WORKERS, "audio": AUDIO_WORKERS}
+
+    app.state.queue = QueueManager(lane_limits=lane_limits)
+    await app.state.queue.start(worker_count=worker_count, processor=process_job)
+
+    # Warm up off the event loop so /health answers immediately
+    if WARMUP_MODELS and app.state.pool is None:
+        names = None if WARMUP_MODELS == "all" else WARMUP_MODELS.split(",")
+        app.state.warmup = asyncio.create_task(
+            asyncio.to_thread(registry.warm_up, names)
+        )
 
 
 @app.on_event("shutdown")
 async def shutdown():
     await app.state.queue.shutdown()
+
+    if app.state.pool is not None:
+        processor.set_worker_pool(None)
+        app.state.pool.shutdown()
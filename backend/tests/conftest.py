@@ -71,8 +71,13 @@ def db_session(tmp_path, monkeypatch):
     # Import after stubs are in place
     from app.db import database as database_module
     from app.db import deps as deps_module
+    from app.db import models  # noqa: F401  (registers tables on Base)
     from app.db.database import Base
 
+    # Imported before patching so `get_session` is bound to the patchable original
+    from app.search import unified_search
+    from app.search.index import vector_index
+
     # Patch globals used by app
     monkeypatch.setattr(database_module, "engine", engine, raising=True)
     monkeypatch.setattr(
@@ -89,6 +94,11 @@ def db_session(tmp_path, monkeypatch):
     # Create schema
     Base.metadata.create_all(bind=engine)
 
+    # The search index and caches are per process; start each test from an empty DB
+    vector_index.reset()
+    unified_search.query_cache.clear()
+    unified_search.result_cache.clear()
+
     db = TestingSessionLocal()
     try:
         yield db
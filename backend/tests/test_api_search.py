@@ -8,6 +8,9 @@ class DummyQueue:
         self.jobs = []
         self.enqueued = []
 
+    async def refresh_inflight(self, dedup_keys):
+        pass
+
     def create_job(self, job):
         self.jobs.append(job)
         return job
@@ -16,7 +19,7 @@ class DummyQueue:
         self.enqueued.append(job_id)
 
 
-def test_video_and_audio_endpoints_accept_upload(monkeypatch, tmp_path):
+def test_video_and_audio_endpoints_accept_upload(db_session, monkeypatch, tmp_path):
     """
     API endpoint test (video + audio): ensure we accept multipart upload, save file,
     create a job, and enqueue it.
@@ -65,12 +68,11 @@ def test_search_across_media_types(db_session, monkeypatch):
     from app.search import unified_search as us
 
     # Patch search model encode -> deterministic query vector
-    monkeypatch.setattr(
-        us.model,
-        "encode",
-        lambda q: np.array([1, 0, 0, 0], dtype=np.float32),
-        raising=False,
-    )
+    class FakeEmbedder:
+        def encode(self, q):
+            return np.array([1, 0, 0, 0], dtype=np.float32)
+
+    monkeypatch.setattr(us, "get_embedding_model", lambda: FakeEmbedder(), raising=True)
 
     # Create two embeddings: video closer than transcription
     video_emb = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32).tobytes()
@@ -1,3 +1,6 @@
+import contextlib
+import io
+
 import numpy as np
 
 
@@ -9,56 +12,46 @@ def test_audio_transcription_accuracy_formats_segments(monkeypatch, tmp_path):
     # Import after stubs are in place (from conftest)
     from app.processing import processor as processor_module
 
-    # Patch read_file_as_bytes to avoid filesystem IO
-    monkeypatch.setattr(
-        processor_module,
-        "read_file_as_bytes",
-        lambda p: b"fake-audio-bytes",
-        raising=True,
-    )
-
-    # Fake AudioSegment-like object
-    class FakeAudio:
-        max_dBFS = -3.0
-
-        def set_channels(self, n):
-            return self
-
-        def set_frame_rate(self, r):
-            return self
+    # Fake ffmpeg decode: 1 second of speech-level 16 kHz float32 PCM, peak 0.5
+    pcm = np.full(16000, 0.1, dtype=np.float32)
+    pcm[100] = 0.5
 
-        def apply_gain(self, g):
-            return self
+    @contextlib.contextmanager
+    def fake_pcm_stream(path):
+        yield io.BytesIO(pcm.tobytes())
 
-        def get_array_of_samples(self):
-            # 1 second @ 16k
-            return [0] * 16000
+    monkeypatch.setattr(processor_module, "probe_duration", lambda p: None)
+    monkeypatch.setattr(
+        processor_module, "open_pcm_stream", fake_pcm_stream, raising=True
+    )
 
-        def export(self, path, format="wav"):
-            # Write a small file to satisfy transcribe(tmp_path)
-            with open(path, "wb") as f:
-                f.write(b"RIFF....WAVEfmt ")
+    # Patch the whisper model with deterministic output
+    class FakeWhisper:
+        def transcribe(self, audio):
+            # Whisper gets the decoded, peak-normalized array, not a temp file
+            assert audio.dtype == np.float32 and len(audio) == 16000
+            assert audio.max() == 1.0
+            return {
+                "text": "hello world",
+                "segments": [
+                    {"start": 0.0, "end": 0.5, "text": "hello", "avg_logprob": -0.1},
+                    {"start": 0.5, "end": 1.0, "text": "world", "avg_logprob": -0.2},
+                ],
+            }
 
-    # Patch pydub.AudioSegment.from_file to return our fake
     monkeypatch.setattr(
-        processor_module.AudioSegment,
-        "from_file",
-        lambda *args, **kwargs: FakeAudio(),
-        raising=True,
+        processor_module, "get_whisper_model", lambda: FakeWhisper(), raising=True
     )
 
-    # Patch WHISPER_MODEL.transcribe with deterministic output
-    processor_module.WHISPER_MODEL.transcribe = lambda p: {
-        "text": "hello world",
-        "segments": [
-            {"start": 0.0, "end": 0.5, "text": "hello", "avg_logprob": -0.1},
-            {"start": 0.5, "end": 1.0, "text": "world", "avg_logprob": -0.2},
-        ],
-    }
-
     # Patch embedding model
-    processor_module.EMBED_MODEL.encode = lambda t: np.array(
-        [1, 2, 3, 4], dtype=np.float32
+    class FakeEmbedder:
+        def encode(self, texts):
+            return np.tile(np.array([1, 2, 3, 4], dtype=np.float32), (len(texts), 1))
+
+    from app.ml import embedding as embedding_module
+
+    monkeypatch.setattr(
+        embedding_module, "get_embedding_model", lambda: FakeEmbedder(), raising=True
     )
 
     # Capture what gets saved to DB (especially embedding bytes) without touching a real database
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def test_concurrent_audio_jobs_share_whisper_batches(monkeypatch):
+    from app.ml import embedding as embedding_module
+    from app.ml.batching import ThreadBatcher
+    from app.processing import processor as processor_module
+
+    # Clip "clip-N" decodes to 2 s of audio whose peak sample is at index N
+    @contextlib.contextmanager
+    def fake_pcm_stream(path):
+        pcm = np.zeros(32000, dtype=np.float32)
+        pcm[int(path.split("-")[1])] = 0.5
+        yield io.BytesIO(pcm.tobytes())
+
+    batches = []
+    lock = threading.Lock()
+
+    def fake_transcribe_batch(clips):
+        with lock:
+            batches.append(len(clips))
+        results = []
+        for clip in clips:
+            text = f"clip {int(np.argmax(clip))}"
+            segment = {"start": 0.0, "end": 2.0, "text": text, "avg_logprob": -0.2}
+            results.append({"text": text, "segments": [segment]})
+        return results
+
+    class FakeEmbedder:
+        def encode(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    saved = {}
+
+    def fake_save_transcription(db, filename, text, timestamps, embedding):
+        saved[filename] = text
+        return type("Rec", (), {"id": len(saved)})()
+
+    monkeypatch.setattr(processor_module, "probe_duration", lambda p: 2.0)
+    monkeypatch.setattr(processor_module, "open_pcm_stream", fake_pcm_stream)
+    monkeypatch.setattr(processor_module, "AUDIO_BATCH_SIZE", 4)
+    monkeypatch.setattr(
+        processor_module,
+        "whisper_batcher",
+        ThreadBatcher(fake_transcribe_batch, max_batch=4, max_latency_ms=100),
+    )
+    monkeypatch.setattr(embedding_module, "get_embedding_model", FakeEmbedder)
+    monkeypatch.setattr(processor_module, "SessionLocal", contextlib.nullcontext)
+    monkeypatch.setattr(
+        processor_module.repository, "save_transcription", fake_save_transcription
+    )
+
+    names = [f"clip-{i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outs = list(
+            pool.map(lambda n: processor_module._process_audio_sync(n, n), names)
+        )
+
+    # Each job gets its own transcript back from the shared batches
+    assert [o["text"] for o in outs] == [f"clip {i}" for i in range(8)]
+    assert saved == {n: f"clip {i}" for i, n in enumerate(names)}
+    assert sum(batches) == 8 and len(batches) < 8
+    assert max(batches) <= 4
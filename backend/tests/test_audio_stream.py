@@ -0,0 +1,238 @@
+import contextlib
+import io
+import tracemalloc
+
+import numpy as np
+import pytest
+
+SR = 100  # low sample rate keeps the synthetic streams small
+
+
+class TrickleStream(io.RawIOBase):
+    """Pipe-like stream: short reads of at most `chunk` bytes."""
+
+    def __init__(self, data: bytes, chunk: int = 1001):
+        self._data = memoryview(data)
+        self._pos = 0
+        self._chunk = chunk
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._chunk, len(self._data) - self._pos)
+        b[:n] = self._data[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+
+class SilentStream(io.RawIOBase):
+    """Endless-looking stream of `samples` zero float32 samples, generated lazily."""
+
+    def __init__(self, samples: int):
+        self._left = samples * 4
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._left)
+        b[:n] = bytes(n)
+        self._left -= n
+        return n
+
+
+def _timeline(seconds: float) -> np.ndarray:
+    # Each sample holds its own timestamp, so windows can be checked exactly
+    return (np.arange(int(seconds * SR)) / SR).astype(np.float32)
+
+
+def test_iter_windows_overlaps_and_covers_the_whole_stream():
+    from app.audio.stream import iter_windows
+
+    audio = _timeline(70)
+    windows = [
+        (start, samples.copy())
+        for start, samples in iter_windows(
+            TrickleStream(audio.tobytes()), window_s=30, overlap_s=2, sample_rate=SR
+        )
+    ]
+
+    assert [start for start, _ in windows] == [0.0, 28.0, 56.0]
+    assert [len(samples) for _, samples in windows] == [3000, 3000, 1400]
+    for start, samples in windows:
+        offset = int(start * SR)
+        np.testing.assert_array_equal(samples, audio[offset : offset + len(samples)])
+
+
+def test_iter_windows_memory_does_not_grow_with_duration():
+    from app.audio.stream import iter_windows
+
+    tracemalloc.start()
+    try:
+        # Two hours at 16 kHz would be ~460 MB decoded in one piece
+        samples = 2 * 3600 * 16000
+        count = sum(1 for _ in iter_windows(SilentStream(samples), 30, 2, 16000))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 258
+    assert peak < 8 * 2**20
+
+
+def test_read_pcm_decodes_into_a_single_buffer():
+    from app.audio.stream import read_pcm
+
+    audio = _timeline(70)
+
+    # Duration unknown (or underestimated): the buffer grows until EOF
+    grown = read_pcm(TrickleStream(audio.tobytes()), sample_rate=SR)
+    np.testing.assert_array_equal(grown, audio)
+    assert grown.flags.writeable
+
+    # Duration known: one allocation of about the decoded size
+    data = audio.tobytes()
+    tracemalloc.start()
+    try:
+        exact = read_pcm(TrickleStream(data), expected_s=70, sample_rate=SR)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    np.testing.assert_array_equal(exact, audio)
+    assert peak < len(data) + 2 * SR * 4 + 4096
+
+
+class WordPerFiveSeconds:
+    """
+    Fake Whisper: the audio holds absolute timestamps; emits one segment per 5 s
+    of absolute time, clipped to the window like a real model would cut a word.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, samples):
+        self.calls += 1
+        # Samples were peak-normalized; the last one is the largest timestamp
+        first, last = float(samples[0]), float(samples[-1])
+        scale = (len(samples) - 1) / SR / (last - first) if last > first else 1.0
+        start = round(first * scale, 3)
+        end = start + len(samples) / SR
+
+        segments = []
+        t = 5 * np.floor(start / 5)
+        while t < end:
+            seg_start, seg_end = max(t, start), min(t + 5, end)
+            segments.append(
+                {
+                    "start": seg_start - start,
+                    "end": seg_end - start,
+                    "text": f" w{int(t)}",
+                    "avg_logprob": -0.1,
+                }
+            )
+            t += 5
+        return {"text": "".join(s["text"] for s in segments), "segments": segments}
+
+
+def test_transcribe_windows_stitches_segments_onto_original_timeline():
+    from app.audio.stream import iter_windows
+    from app.audio.transcribe import peak_normalize, transcribe_windows
+
+    audio = _timeline(70)
+    model = WordPerFiveSeconds()
+    ends = []
+
+    text, segments = transcribe_windows(
+        lambda window, peak: model.transcribe(peak_normalize(window, peak=peak)),
+        iter_windows(io.BytesIO(audio.tobytes()), 30, 2, SR),
+        overlap_s=2,
+        on_window=ends.append,
+        sample_rate=SR,
+    )
+
+    # Every word exactly once, in order, at its original time
+    assert text == " ".join(f"w{t}" for t in range(0, 70, 5))
+    assert [round(s["start"]) for s in segments] == list(range(0, 70, 5))
+    assert all(s["end"] > s["start"] for s in segments)
+    assert model.calls == 3
+    # Progress is reported after every window
+    assert ends == [30.0, 58.0, 70.0]
+
+
+def test_long_audio_is_streamed_with_per_chunk_progress(monkeypatch, tmp_path):
+    from app.ml import embedding as embedding_module
+    from app.processing import processor as processor_module
+
+    audio = (np.arange(70 * 16000) / 16000).astype(np.float32)
+
+    @contextlib.contextmanager
+    def fake_pcm_stream(path):
+        yield io.BytesIO(audio.tobytes())
+
+    class FakeWhisper:
+        def transcribe(self, samples):
+            assert isinstance(samples, np.ndarray)  # no temp file in this mode
+            return {"segments": [{"start": 1.0, "end": 2.0, "text": " hi"}]}
+
+    class FakeEmbedder:
+        def encode(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    saved = {}
+
+    def fake_save_transcription(db, filename, text, timestamps, embedding):
+        saved.update(text=text, timestamps=timestamps)
+        return type("Rec", (), {"id": 1})()
+
+    monkeypatch.setattr(processor_module, "probe_duration", lambda p: 70.0)
+    monkeypatch.setattr(processor_module, "open_pcm_stream", fake_pcm_stream)
+    monkeypatch.setattr(processor_module, "AUDIO_STREAM_MIN_DURATION_S", 60.0)
+    # The synthetic ramp is quiet near zero; keep every sample for this test
+    monkeypatch.setattr(processor_module, "AUDIO_VAD", False)
+    monkeypatch.setattr(processor_module, "get_whisper_model", FakeWhisper)
+    monkeypatch.setattr(embedding_module, "get_embedding_model", FakeEmbedder)
+    monkeypatch.setattr(processor_module, "SessionLocal", contextlib.nullcontext)
+    monkeypatch.setattr(
+        processor_module.repository, "save_transcription", fake_save_transcription
+    )
+
+    updates = []
+    out = processor_module._process_audio_sync(
+        str(tmp_path / "long.mp3"), "long.mp3", lambda p, m: updates.append(p)
+    )
+
+    assert [s["start"] for s in saved["timestamps"]] == [1.0, 29.0, 57.0]
+    assert out["text"] == "hi hi hi"
+    # One progress update per 30 s window between transcription start and embedding
+    assert updates == [40, 56, 72, 79, 80]
+
+
+def test_windows_share_one_gain_and_noise_is_not_boosted():
+    from app.audio.stream import iter_windows
+    from app.audio.transcribe import peak_normalize, transcribe_windows
+
+    rng = np.random.default_rng(0)
+    # Near-silent noise, then speech-level audio peaking at 0.5, then noise again
+    audio = rng.normal(0, 1e-4, 90 * SR).astype(np.float32)
+    audio[35 * SR : 50 * SR] = 0.5 * np.sin(np.arange(15 * SR) / 10)
+    peaks = []
+
+    def transcribe(samples, peak):
+        peaks.append(float(np.max(np.abs(peak_normalize(samples, peak=peak)))))
+        return {"text": "", "segments": []}
+
+    transcribe_windows(
+        transcribe,
+        iter_windows(io.BytesIO(audio.tobytes()), 30, 2, SR),
+        overlap_s=2,
+        sample_rate=SR,
+    )
+
+    # The leading noise stays at its level; the loud window sets the gain, and
+    # the trailing noise is scaled by that same gain (x2), not to full scale
+    assert peaks[0] < 1e-3
+    assert peaks[1] == pytest.approx(1.0)
+    assert peaks[-1] < 2e-3
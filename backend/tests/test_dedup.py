@@ -0,0 +1,116 @@
+import contextlib
+import io
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _client(monkeypatch, tmp_path):
+    from app.api import audio as audio_api
+    from app.api import uploads
+    from app.api import video as video_api
+    from app.queue.manager import QueueManager
+
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+
+    app = FastAPI()
+    app.state.queue = QueueManager()  # no workers: jobs stay queued
+    app.include_router(video_api.router)
+    app.include_router(audio_api.router)
+    return TestClient(app), app.state.queue
+
+
+def test_identical_upload_in_flight_is_coalesced(db_session, monkeypatch, tmp_path):
+    client, qm = _client(monkeypatch, tmp_path)
+
+    first = client.post(
+        "/process/video", files={"file": ("a.mp4", b"same", "video/mp4")}
+    )
+    second = client.post(
+        "/process/video", files={"file": ("b.mp4", b"same", "video/mp4")}
+    )
+    other = client.post(
+        "/process/video", files={"file": ("c.mp4", b"diff", "video/mp4")}
+    )
+
+    assert first.status_code == second.status_code == 202
+    assert second.json() == {
+        "job_id": first.json()["job_id"],
+        "status": "queued",
+        "coalesced": True,
+    }
+    assert other.json()["job_id"] != first.json()["job_id"]
+    assert qm.store.count_ready() == 2
+
+
+def test_already_processed_upload_returns_stored_result(
+    db_session, monkeypatch, tmp_path
+):
+    import hashlib
+
+    from app.db import repository
+    from app.processing import processor
+
+    client, qm = _client(monkeypatch, tmp_path)
+    content = b"processed-before"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    emb = np.ones(4, dtype=np.float32).tobytes()
+    video = repository.save_video(db_session, "old.mp4", [{}], [{}, {}], "cars", emb)
+    repository.save_media_hash(
+        db_session, sha256, "video", processor.pipeline_config_key("video"), video.id
+    )
+
+    resp = client.post(
+        "/process/video", files={"file": ("new.mp4", content, "video/mp4")}
+    )
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["deduplicated"] is True
+    assert body["result"]["video_id"] == video.id
+    assert body["result"]["objects_detected_count"] == 2
+    assert qm.jobs[body["job_id"]].status == "succeeded"
+    assert qm.store.count_ready() == 0
+
+    # Different pipeline settings must not reuse the stored result
+    monkeypatch.setattr(processor, "KEYFRAME_FRAME_INTERVAL", 5)
+    resp = client.post(
+        "/process/video", files={"file": ("new.mp4", content, "video/mp4")}
+    )
+    assert resp.status_code == 202 and resp.json()["status"] == "queued"
+
+
+def test_processed_audio_records_its_content_hash(db_session, monkeypatch):
+    from app.db import database, repository
+    from app.ml import embedding as embedding_module
+    from app.processing import processor
+
+    @contextlib.contextmanager
+    def fake_pcm_stream(path):
+        yield io.BytesIO(np.full(16000, 0.1, dtype=np.float32).tobytes())
+
+    class FakeWhisper:
+        def transcribe(self, audio):
+            return {"text": "hello", "segments": []}
+
+    class FakeEmbedder:
+        def encode(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(processor, "probe_duration", lambda p: 1.0)
+    monkeypatch.setattr(processor, "open_pcm_stream", fake_pcm_stream)
+    monkeypatch.setattr(processor, "get_whisper_model", FakeWhisper)
+    monkeypatch.setattr(embedding_module, "get_embedding_model", FakeEmbedder)
+    monkeypatch.setattr(processor, "SessionLocal", database.SessionLocal)
+
+    out = processor.run_job_sync(
+        "audio", {"file_path": "a.wav", "filename": "a.wav", "sha256": "ab" * 32}
+    )
+
+    record = repository.find_processed(
+        db_session, "ab" * 32, "transcription", processor.pipeline_config_key("audio")
+    )
+    assert record is not None and record.id == out["transcription_id"]
+    assert processor.stored_result("audio", record)["text"] == "hello"
@@ -29,4 +29,81 @@ def test_object_detector_filters_by_threshold_and_maps_label(monkeypatch):
 
     results = detector.detect(frame, timestamp=1.234)
 
-    assert results == [{"label": "person", "confidence": 0.72, "timestamp": 1.23}]
+    assert results == [
+        {"label": "person", "confidence": 0.72, "timestamp": 1.23, "box": [0, 0, 0, 0]}
+    ]
+
+
+def test_detect_batch_runs_one_forward_per_batch(monkeypatch):
+    class DummyNet:
+        def __init__(self):
+            self.blob_shapes = []
+
+        def setInput(self, blob):
+            self.blob_shapes.append(blob.shape)
+            self._n = blob.shape[0]
+
+        def forward(self):
+            # One "person" detection per image in the batch, tagged with image_id
+            det = np.zeros((1, 1, self._n, 7), dtype=np.float32)
+            for i in range(self._n):
+                det[0, 0, i, 0] = i
+                det[0, 0, i, 1] = 15
+                det[0, 0, i, 2] = 0.9
+            return det
+
+    net = DummyNet()
+    monkeypatch.setattr(cv2.dnn, "readNetFromCaffe", lambda *args, **kwargs: net)
+
+    from app.video.detection import ObjectDetector, detections_to_dicts
+
+    detector = ObjectDetector("dummy.prototxt", "dummy.caffemodel", batch_size=4)
+    frames = [np.zeros((120, 160, 3), dtype=np.uint8) for _ in range(6)]
+    timestamps = [0.5 * i for i in range(6)]
+
+    results = detections_to_dicts(detector.detect_batch(frames, timestamps))
+
+    assert net.blob_shapes == [(4, 3, 300, 300), (2, 3, 300, 300)]
+    assert [r["timestamp"] for r in results] == [0.0, 0.5, 1.0, 1.5, 2.0, 2.5]
+    assert all(r["label"] == "person" for r in results)
+
+
+def test_detect_batch_returns_columnar_boxes_in_pixels(monkeypatch):
+    class DummyNet:
+        def setInput(self, blob):
+            pass
+
+        def forward(self):
+            det = np.zeros((1, 1, 3, 7), dtype=np.float32)
+            # Kept: dog in image 1, box covering the right half
+            det[0, 0, 0] = [1, 12, 0.8, 0.5, 0.0, 1.0, 1.0]
+            # Dropped: below threshold
+            det[0, 0, 1] = [0, 15, 0.1, 0.0, 0.0, 0.5, 0.5]
+            # Kept: person in image 0, box clipped to frame
+            det[0, 0, 2] = [0, 15, 0.6666, -0.1, 0.25, 0.5, 1.2]
+            return det
+
+    monkeypatch.setattr(cv2.dnn, "readNetFromCaffe", lambda *args, **kwargs: DummyNet())
+
+    from app.video.detection import DETECTION_DTYPE, ObjectDetector, detections_to_dicts
+
+    detector = ObjectDetector("dummy.prototxt", "dummy.caffemodel")
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8)] * 2
+
+    detections = detector.detect_batch(frames, [1.0, 2.004])
+
+    assert detections.dtype == DETECTION_DTYPE
+    assert detections_to_dicts(detections) == [
+        {
+            "label": "dog",
+            "confidence": 0.8,
+            "timestamp": 2.0,
+            "box": [320, 0, 640, 480],
+        },
+        {
+            "label": "person",
+            "confidence": 0.667,
+            "timestamp": 1.0,
+            "box": [0, 120, 320, 480],
+        },
+    ]
@@ -0,0 +1,149 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+
+class RecordingEmbedder:
+    """Embeds "text N" as [N, 1, 0, 0] and records every batch it sees."""
+
+    def __init__(self, delay_s=0.0):
+        self.batches = []
+        self.delay_s = delay_s
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay_s)
+        return np.array(
+            [[float(t.split()[-1]), 1, 0, 0] for t in texts], dtype=np.float32
+        )
+
+
+def test_concurrent_jobs_share_embedding_batches(monkeypatch):
+    from app.ml import embedding as embedding_module
+    from app.ml.batching import ThreadBatcher
+
+    embedder = RecordingEmbedder(delay_s=0.01)
+    monkeypatch.setattr(embedding_module, "get_embedding_model", lambda: embedder)
+
+    batcher = ThreadBatcher(embedding_module.encode_texts, 4, max_latency_ms=50)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        vectors = list(pool.map(lambda i: batcher.submit(f"text {i}"), range(8)))
+
+    # Every job gets its own embedding back...
+    assert [int(v[0]) for v in vectors] == list(range(8))
+    assert all(v.dtype == np.float32 for v in vectors)
+    # ...while the model saw a few full batches instead of 8 single texts
+    assert len(embedder.batches) < 8
+    assert max(len(b) for b in embedder.batches) <= 4
+    assert batcher.stats()["items"] == 8
+
+
+def test_batch_is_sent_once_every_running_job_is_waiting(monkeypatch):
+    from app.ml import embedding as embedding_module
+    from app.ml.batching import ThreadBatcher
+
+    embedder = RecordingEmbedder()
+    monkeypatch.setattr(embedding_module, "get_embedding_model", lambda: embedder)
+
+    # Far longer than the test may take: no batch below waits it out
+    batcher = ThreadBatcher(embedding_module.encode_texts, 4, max_latency_ms=60_000)
+
+    # A job running alone gets its embedding straight away
+    with batcher.caller():
+        assert int(batcher.submit("text 1")[0]) == 1
+
+    # Two jobs: sent together once both are waiting
+    ready = threading.Barrier(2)
+
+    def job(i):
+        with batcher.caller():
+            ready.wait()
+            return batcher.submit(f"text {i}")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(job, i) for i in (2, 3)]
+        vectors = [f.result(timeout=10) for f in futures]
+    assert [int(v[0]) for v in vectors] == [2, 3]
+
+    # A job that finishes without submitting stops holding the batch back
+    submitted = threading.Event()
+    leave = threading.Event()
+
+    def idle_job():
+        with batcher.caller():
+            ready.wait()
+            leave.wait()
+
+    def waiting_job():
+        with batcher.caller():
+            ready.wait()
+            submitted.set()
+            return batcher.submit("text 4")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        idle = pool.submit(idle_job)
+        waiting = pool.submit(waiting_job)
+        submitted.wait(10)
+        leave.set()
+        assert int(waiting.result(timeout=10)[0]) == 4
+        idle.result(timeout=10)
+
+    assert [len(b) for b in embedder.batches] == [1, 2, 1]
+
+
+def test_embedding_errors_reach_the_calling_job(monkeypatch):
+    from app.ml import embedding as embedding_module
+    from app.ml.batching import ThreadBatcher
+
+    class BrokenEmbedder:
+        def encode(self, texts):
+            raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(embedding_module, "get_embedding_model", BrokenEmbedder)
+
+    batcher = ThreadBatcher(embedding_module.encode_texts, 4, max_latency_ms=1)
+    with pytest.raises(RuntimeError, match="exploded"):
+        batcher.submit("text 1")
+
+
+def test_reembed_corpus_streams_chunks_and_resets_search_state(db_session, monkeypatch):
+    from app.db import repository
+    from app.db.models import Transcription, Video
+    from app.ml import embedding as embedding_module
+    from app.search import unified_search as us
+    from app.search.index import vector_index
+    from app.search.reembed import reembed_corpus
+
+    old = np.array([0, 0, 0, 1], dtype=np.float32).tobytes()
+    for i in range(5):
+        repository.save_video(db_session, f"v{i}.mp4", [], [], f"text {i}", old)
+    for i in range(3):
+        repository.save_transcription(
+            db_session, f"a{i}.wav", f"text {10 + i}", [], old
+        )
+
+    us.query_cache.put("stale query", np.zeros(4, dtype=np.float32))
+    version = vector_index.version
+
+    embedder = RecordingEmbedder()
+    monkeypatch.setattr(embedding_module, "get_embedding_model", lambda: embedder)
+
+    counts = reembed_corpus(chunk_size=2)
+
+    assert counts == {"videos": 5, "transcriptions": 3}
+    assert [len(b) for b in embedder.batches] == [2, 2, 1, 2, 1]
+
+    db_session.expire_all()
+    for row in db_session.query(Video).all() + db_session.query(Transcription).all():
+        text = row.summary if isinstance(row, Video) else row.text
+        vec = np.frombuffer(row.embedding, dtype=np.float32)
+        assert vec[0] == float(text.split()[-1])
+
+    # Searches must not keep serving vectors or query embeddings of the old model
+    assert vector_index.version > version
+    assert us.query_cache.get("stale query") is None
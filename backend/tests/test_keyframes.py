@@ -42,3 +42,165 @@ def test_extract_keyframes_detects_scene_change(tmp_path):
     for k in keyframes:
         assert k["timestamp"] >= 0
         assert isinstance(k["scene_change_score"], float)
+
+
+def _write_timed_scene_video(path, fps, seconds=3, size=(64, 64)):
+    # Red for the first second, then green; same wall-clock content at any fps
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    out = cv2.VideoWriter(str(path), fourcc, fps, size)
+    for i in range(int(fps * seconds)):
+        color = (0, 0, 255) if i < fps else (0, 255, 0)
+        out.write(np.full((size[1], size[0], 3), color, dtype=np.uint8))
+    out.release()
+
+
+def test_time_based_sampling_is_fps_independent(tmp_path):
+    from app.video.keyframes import extract_keyframes
+
+    results = []
+    for fps in (10, 25):
+        video_path = tmp_path / f"timed_{fps}.mp4"
+        _write_timed_scene_video(video_path, fps=fps)
+        keyframes = extract_keyframes(
+            str(video_path), diff_threshold=0.02, sample_interval_ms=500
+        )
+        results.append([k["timestamp"] for k in keyframes])
+
+    assert results[0] == results[1] == [1.0]
+
+
+def _read_every_frame_samples(video_path, frame_interval):
+    # Previous sampler: full decode + BGR conversion of every frame
+    cap = cv2.VideoCapture(str(video_path))
+    sampled = []
+    frame_index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_index % frame_interval == 0:
+            sampled.append((frame_index, float(frame.mean())))
+        frame_index += 1
+    cap.release()
+    return sampled
+
+
+def _grab_retrieve_samples(video_path, frame_interval):
+    from app.video.keyframes import iter_sampled_frames
+
+    cap = cv2.VideoCapture(str(video_path))
+    sampled = [
+        (frame_index, float(frame.mean()))
+        for frame_index, _, frame in iter_sampled_frames(cap, frame_interval)
+    ]
+    cap.release()
+    return sampled
+
+
+class _CountingCapture:
+    """Wraps a cv2.VideoCapture, counting frames converted to BGR images."""
+
+    def __init__(self, cap):
+        self._cap = cap
+        self.converted = 0
+
+    def read(self):
+        ret, frame = self._cap.read()
+        self.converted += ret
+        return ret, frame
+
+    def retrieve(self):
+        ret, frame = self._cap.retrieve()
+        self.converted += ret
+        return ret, frame
+
+    def __getattr__(self, name):
+        return getattr(self._cap, name)
+
+
+def test_grab_retrieve_sampler_converts_only_sampled_frames(tmp_path, monkeypatch):
+    """
+    The grab()/retrieve() sampler walks every frame but converts only the sampled
+    ones, where read()-ing every frame converts all 250.
+    """
+    video_path = tmp_path / "throughput.mp4"
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    out = cv2.VideoWriter(str(video_path), fourcc, 25, (640, 480))
+    rng = np.random.default_rng(0)
+    for _ in range(250):
+        out.write(rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8))
+    out.release()
+
+    captures = []
+    real = cv2.VideoCapture
+
+    def counting_capture(*args):
+        captures.append(_CountingCapture(real(*args)))
+        return captures[-1]
+
+    monkeypatch.setattr(cv2, "VideoCapture", counting_capture)
+    read_samples = _read_every_frame_samples(video_path, 10)
+    grab_samples = _grab_retrieve_samples(video_path, 10)
+
+    assert grab_samples == read_samples
+    assert len(grab_samples) == 25
+    assert [c.converted for c in captures] == [250, 25]
+
+
+def _noisy_gradient_frame(seed, size=(1280, 720)):
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 255, size[0])[None, :, None] * rng.uniform(0.3, 1.0, 3)
+    frame = np.broadcast_to(ramp, (size[1], size[0], 3)).astype(np.uint8)
+    return cv2.add(frame, rng.integers(0, 60, frame.shape, dtype=np.uint8))
+
+
+def _full_res_score(frame_a, frame_b):
+    # Previous scoring: full-resolution grayscale histogram + cv2.compareHist
+    hists = []
+    for frame in (frame_a, frame_b):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+        hists.append(cv2.normalize(hist, hist).flatten())
+    return cv2.compareHist(hists[0], hists[1], cv2.HISTCMP_BHATTACHARYYA)
+
+
+def test_bhattacharyya_distance_matches_opencv():
+    from app.video.keyframes import bhattacharyya_distance
+
+    rng = np.random.default_rng(0)
+    a = rng.random((256, 1)).astype(np.float32)
+    b = rng.random((256, 1)).astype(np.float32)
+    scratch = np.empty((256, 1), dtype=np.float64)
+
+    expected = cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA)
+
+    assert abs(bhattacharyya_distance(a, b, out=scratch) - expected) < 1e-6
+    assert bhattacharyya_distance(a, a) < 1e-3
+
+
+def test_downscaled_scores_within_tolerance_and_buffers_reused():
+    from app.video.keyframes import HistogramAnalyzer
+
+    frames = [_noisy_gradient_frame(seed) for seed in range(4)]
+
+    full_res = HistogramAnalyzer(analysis_width=None)
+    downscaled = HistogramAnalyzer(analysis_width=320)
+
+    hist_buffers = set()
+    for frame_a, frame_b in zip(frames, frames[1:]):
+        expected = _full_res_score(frame_a, frame_b)
+
+        full_a = full_res.histogram(frame_a)
+        full_b = full_res.histogram(frame_b)
+        assert abs(full_res.distance(full_a, full_b) - expected) < 1e-6
+
+        small_a = downscaled.histogram(frame_a)
+        small_b = downscaled.histogram(frame_b)
+        assert abs(downscaled.distance(small_a, small_b) - expected) < 0.01
+
+        hist_buffers.update(
+            h.__array_interface__["data"][0] for h in (small_a, small_b)
+        )
+
+    # Only the two ping-pong histogram buffers are ever used
+    assert len(hist_buffers) == 2
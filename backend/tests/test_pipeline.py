@@ -0,0 +1,285 @@
+import cv2
+import numpy as np
+
+COLORS = [(0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255), (255, 255, 255)]
+
+
+def _write_scene_video(path, frames=300, scene_len=40, fps=25, size=(160, 120)):
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    out = cv2.VideoWriter(str(path), fourcc, fps, size)
+
+    rng = np.random.default_rng(0)
+    for i in range(frames):
+        color = COLORS[(i // scene_len) % len(COLORS)]
+        frame = np.full((size[1], size[0], 3), color, dtype=np.uint8)
+        noise = rng.integers(0, 20, size=frame.shape, dtype=np.uint8)
+        out.write(cv2.add(frame, noise))
+    out.release()
+
+
+class RecordingDetector:
+    """Stand-in detector that records a fingerprint of every frame it sees."""
+
+    def __init__(self, batch_size=8):
+        self.batch_size = batch_size
+        self.calls = []
+        self.batch_sizes = []
+
+    def detect(self, frame, timestamp):
+        from app.video.detection import detections_to_dicts
+
+        return detections_to_dicts(self.detect_batch([frame], [timestamp]))
+
+    def detect_batch(self, frames, timestamps):
+        from app.video.detection import DETECTION_DTYPE
+
+        self.batch_sizes.append(len(frames))
+        out = np.zeros(len(frames), dtype=DETECTION_DTYPE)
+        for i, (frame, timestamp) in enumerate(zip(frames, timestamps)):
+            self.calls.append((timestamp, float(frame.mean())))
+            out[i]["class_id"] = 15
+            out[i]["confidence"] = 0.9
+            out[i]["timestamp"] = timestamp
+        return out
+
+
+def _two_pass_process_video_frames(video_path, detector):
+    # Previous implementation: extract keyframes, then seek back to each one.
+    from app.video.keyframes import extract_keyframes
+
+    cap = cv2.VideoCapture(video_path)
+    keyframes = extract_keyframes(video_path)
+    all_detections = []
+
+    for kf in keyframes:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, kf["frame_index"])
+        ret, frame = cap.read()
+        if not ret:
+            continue
+        all_detections.extend(detector.detect(frame, kf["timestamp"]))
+
+    cap.release()
+    return {"keyframes": keyframes, "objects": all_detections}
+
+
+def test_single_pass_matches_two_pass_output(tmp_path):
+    from app.video.pipeline import process_video_frames
+
+    video_path = tmp_path / "scenes.mp4"
+    _write_scene_video(video_path)
+
+    single_detector = RecordingDetector()
+    single = process_video_frames(str(video_path), single_detector)
+
+    two_pass_detector = RecordingDetector()
+    two_pass = _two_pass_process_video_frames(str(video_path), two_pass_detector)
+
+    assert len(single["keyframes"]) >= 3
+    assert single == two_pass
+    assert [t for t, _ in single_detector.calls] == [
+        t for t, _ in two_pass_detector.calls
+    ]
+    for (_, a), (_, b) in zip(single_detector.calls, two_pass_detector.calls):
+        assert abs(a - b) < 1.0
+
+
+def _count_decoding(monkeypatch):
+    """Patch cv2.VideoCapture to count opens, frames decoded and seeks."""
+    counts = {"opens": 0, "decoded": 0, "seeks": 0}
+    real = cv2.VideoCapture
+
+    class CountingCapture:
+        def __init__(self, *args):
+            counts["opens"] += 1
+            self._cap = real(*args)
+
+        def grab(self):
+            ok = self._cap.grab()
+            counts["decoded"] += ok
+            return ok
+
+        def read(self):
+            ret, frame = self._cap.read()
+            counts["decoded"] += ret
+            return ret, frame
+
+        def set(self, prop, value):
+            # A seek decodes again from the nearest I-frame
+            counts["seeks"] += prop == cv2.CAP_PROP_POS_FRAMES
+            return self._cap.set(prop, value)
+
+        def __getattr__(self, name):
+            return getattr(self._cap, name)
+
+    monkeypatch.setattr(cv2, "VideoCapture", CountingCapture)
+    return counts
+
+
+def test_single_pass_decodes_each_frame_once(tmp_path, monkeypatch):
+    """
+    The fused pipeline decodes the file once; the old path decodes it once and
+    then again from the nearest I-frame for every keyframe.
+    """
+    from app.video.pipeline import process_video_frames
+
+    frames = 600
+    video_path = tmp_path / "bench.mp4"
+    _write_scene_video(video_path, frames=frames, scene_len=20, size=(320, 240))
+
+    counts = _count_decoding(monkeypatch)
+    result = process_video_frames(str(video_path), RecordingDetector())
+    keyframes = len(result["keyframes"])
+    single = dict(counts)
+
+    counts.update(dict.fromkeys(counts, 0))
+    _two_pass_process_video_frames(str(video_path), RecordingDetector())
+    two_pass = counts
+
+    assert keyframes >= 10
+    assert single == {"opens": 1, "decoded": frames, "seeks": 0}
+    assert two_pass == {
+        "opens": 2,
+        "decoded": frames + keyframes,
+        "seeks": keyframes,
+    }
+
+
+def test_pipeline_feeds_detector_in_bounded_batches(tmp_path):
+    from app.video.pipeline import process_video_frames
+
+    video_path = tmp_path / "scenes.mp4"
+    _write_scene_video(video_path, frames=400, scene_len=20)
+
+    detector = RecordingDetector(batch_size=3)
+    result = process_video_frames(str(video_path), detector)
+
+    assert len(result["keyframes"]) > 3
+    assert max(detector.batch_sizes) <= 3
+    assert sum(detector.batch_sizes) == len(result["keyframes"])
+    assert [d["timestamp"] for d in result["objects"]] == [
+        k["timestamp"] for k in result["keyframes"]
+    ]
+
+
+def test_plan_segments_aligns_boundaries_to_samples():
+    from app.video.pipeline import plan_segments
+
+    assert plan_segments(1000, 4, 10) == [(0, 250), (250, 500), (500, 750), (750, None)]
+    assert plan_segments(95, 3, 10) == [(0, 30), (30, 60), (60, None)]
+    # Never more segments than sampled frames
+    assert plan_segments(15, 8, 10) == [(0, 10), (10, None)]
+
+
+def test_segmented_matches_sequential_output(tmp_path):
+    from app.video.pipeline import process_video_frames, process_video_segmented
+
+    video_path = tmp_path / "scenes.mp4"
+    # Scene changes land exactly on segment boundaries and between them
+    _write_scene_video(video_path, frames=600, scene_len=50)
+
+    sequential = process_video_frames(str(video_path), RecordingDetector())
+
+    for workers in (2, 3, 4):
+        detectors = [RecordingDetector(batch_size=2) for _ in range(workers)]
+
+        segmented = process_video_segmented(str(video_path), detectors)
+
+        assert segmented == sequential
+        # One segment per detector, each detected on its own
+        assert all(detector.calls for detector in detectors)
+
+
+def test_segmented_matches_sequential_on_a_larger_video(tmp_path):
+    from app.video.pipeline import process_video_frames, process_video_segmented
+
+    video_path = tmp_path / "long.mp4"
+    _write_scene_video(video_path, frames=1200, scene_len=60, size=(640, 360))
+
+    sequential = process_video_frames(str(video_path), RecordingDetector())
+    detectors = [RecordingDetector() for _ in range(4)]
+    segmented = process_video_segmented(str(video_path), detectors)
+
+    assert segmented == sequential
+    # Every segment detected its own share of the keyframes
+    assert all(detector.calls for detector in detectors)
+    assert sum(len(d.calls) for d in detectors) == len(sequential["keyframes"])
+
+
+def test_pipeline_stops_at_the_next_cancel_check(tmp_path):
+    import pytest
+    from app.queue.errors import JobCancelled
+    from app.video.pipeline import process_video_frames
+
+    video_path = tmp_path / "scenes.mp4"
+    _write_scene_video(video_path, frames=400, scene_len=20)
+    checks = []
+
+    def check_cancelled():
+        checks.append(1)
+        if len(checks) == 5:
+            raise JobCancelled("Cancelled")
+
+    detector = RecordingDetector()
+    with pytest.raises(JobCancelled):
+        process_video_frames(str(video_path), detector, check_cancelled=check_cancelled)
+
+    assert len(checks) == 5
+    # Stopped within the first few samples instead of finishing the video
+    assert len(detector.calls) < 5
+
+
+def test_pipelines_report_decode_progress(tmp_path):
+    from app.video.pipeline import process_video_frames, process_video_segmented
+
+    video_path = tmp_path / "scenes.mp4"
+    _write_scene_video(video_path, frames=400, scene_len=20)
+
+    sequential = []
+    process_video_frames(
+        str(video_path), RecordingDetector(), progress=sequential.append
+    )
+    # One report per sampled frame, rising to the end of the video
+    assert len(sequential) == 40
+    assert sequential == sorted(sequential)
+    assert sequential[-1] > 0.97
+
+    segmented = []
+    process_video_segmented(
+        str(video_path),
+        [RecordingDetector() for _ in range(4)],
+        progress=segmented.append,
+    )
+    # Plus seed samples and one end-of-segment report per segment
+    assert 40 <= len(segmented) <= 48
+    assert max(segmented) > 0.97 and max(segmented) <= 1.0
+
+
+def test_segment_detectors_are_loaded_once_per_process(tmp_path, monkeypatch):
+    from app.ml.registry import ModelRegistry
+    from app.processing import processor
+
+    video_path = tmp_path / "scenes.mp4"
+    _write_scene_video(video_path, frames=400, scene_len=20)
+
+    created = []
+
+    def new_detector():
+        created.append(RecordingDetector())
+        return created[-1]
+
+    registry = ModelRegistry()
+    registry.register("detector", new_detector)
+    registry.register("segment_detectors", processor._load_segment_detectors)
+    monkeypatch.setattr(processor, "registry", registry)
+    monkeypatch.setattr(processor, "_new_detector", new_detector)
+    monkeypatch.setattr(processor, "_ensure_models_exist", lambda: None)
+    monkeypatch.setattr(processor, "VIDEO_SEGMENT_WORKERS", 3)
+    monkeypatch.setattr(processor, "VIDEO_SEGMENT_MIN_FRAMES", 0)
+
+    first = processor._run_video_pipeline(str(video_path))
+    second = processor._run_video_pipeline(str(video_path))
+
+    assert first == second
+    # The shared detector plus two more for the other segments, for both jobs
+    assert len(created) == 3
+    assert all(detector.calls for detector in created)
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+
+from app.processing.pool import ProcessWorkerPool
+from app.queue.models import Job
+
+# Module-level so spawned workers can unpickle them; state is per process
+_init_calls = []
+
+
+def _init(job_type):
+    _init_calls.append(job_type)
+
+
+def _run(job_type, payload, progress, check_cancelled):
+    progress(60, "Halfway")
+    return {"pid": os.getpid(), "inits": list(_init_calls), "value": payload["value"]}
+
+
+def test_process_pool_initializes_once_and_reports_progress():
+    async def _main():
+        pool = ProcessWorkerPool(
+            {"video": 2, "audio": 0}, initializer=_init, runner=_run
+        )
+        pool.start()
+        try:
+            assert pool.handles("video")
+            assert not pool.handles("audio")
+
+            jobs = [Job(type="video", payload={"value": i}) for i in range(6)]
+            results = await asyncio.gather(*(pool.run(job) for job in jobs))
+
+            # Progress messages are applied on the event loop asynchronously
+            for _ in range(50):
+                if all(job.progress == 60 for job in jobs):
+                    break
+                await asyncio.sleep(0.05)
+            return jobs, results
+        finally:
+            pool.shutdown()
+
+    jobs, results = asyncio.run(_main())
+
+    assert [r["value"] for r in results] == list(range(6))
+    assert all(r["pid"] != os.getpid() for r in results)
+    # Every worker process ran the initializer exactly once, however many jobs it ran
+    assert all(r["inits"] == ["video"] for r in results)
+    assert all(job.progress == 60 and job.message == "Halfway" for job in jobs)
+
+
+def _run_until_cancelled(job_type, payload, progress, check_cancelled):
+    progress(10, "Started")
+    while True:
+        check_cancelled()
+        time.sleep(0.01)
+
+
+def test_process_pool_workers_see_cancel_and_deadline():
+    from app.queue.cancel import CancelToken
+    from app.queue.errors import JobCancelled, JobTimedOut
+
+    async def _main():
+        pool = ProcessWorkerPool(
+            {"video": 1, "audio": 1}, initializer=_init, runner=_run_until_cancelled
+        )
+        pool.start()
+        try:
+            cancelled = Job(type="video", payload={})
+            timed_out = Job(type="audio", payload={})
+            timed_out.cancel = CancelToken(deadline=time.time() + 0.5)
+
+            runs = [asyncio.ensure_future(pool.run(j)) for j in (cancelled, timed_out)]
+            while cancelled.progress != 10:
+                await asyncio.sleep(0.05)
+            cancelled.cancel.cancel()
+            return await asyncio.gather(*runs, return_exceptions=True)
+        finally:
+            pool.shutdown()
+
+    cancelled, timed_out = asyncio.run(_main())
+
+    assert type(cancelled) is JobCancelled
+    assert type(timed_out) is JobTimedOut
+
+
+def _run_ignoring_cancel(job_type, payload, progress, check_cancelled):
+    progress(10, "Started")
+    time.sleep(1.0)  # e.g. a long decode that does not check its token
+    check_cancelled()
+    with open(payload["record"], "w") as f:
+        f.write("saved")
+    return {}
+
+
+def test_abandoned_process_job_still_sees_its_cancel(tmp_path):
+    record = tmp_path / "record"
+
+    async def _main():
+        pool = ProcessWorkerPool(
+            {"video": 1}, initializer=_init, runner=_run_ignoring_cancel
+        )
+        pool.start()
+        try:
+            job = Job(type="video", payload={"record": str(record)})
+            run = asyncio.ensure_future(pool.run(job))
+            while job.progress != 10:
+                await asyncio.sleep(0.05)
+
+            # What the queue does once the cancel grace period is over
+            job.cancel.cancel()
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+
+            # The flag is only dropped once the worker reports the job finished
+            for _ in range(100):
+                if not pool._cancelled:
+                    break
+                await asyncio.sleep(0.05)
+            return dict(pool._cancelled)
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(_main()) == {}
+    assert not record.exists()
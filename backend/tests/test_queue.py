@@ -0,0 +1,697 @@
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from app.queue import manager as manager_module
+from app.queue.manager import QueueManager
+from app.queue.models import Job
+from app.queue.store import job_to_row
+
+
+@pytest.fixture()
+def fast_queue(db_session, monkeypatch):
+    monkeypatch.setattr(manager_module, "QUEUE_POLL_INTERVAL_S", 0.02)
+    monkeypatch.setattr(manager_module, "QUEUE_LEASE_S", 0.3)
+    return db_session
+
+
+async def _record(seen):
+    async def processor(job):
+        seen.append(job.payload["n"])
+        job.result = {"n": job.payload["n"]}
+
+    return processor
+
+
+def test_queued_jobs_survive_a_restart(fast_queue):
+    async def main():
+        before = QueueManager()
+        ids = []
+        for n in range(3):
+            job = before.create_job(Job(type="audio", payload={"n": n}))
+            await before.enqueue(job.id)
+            ids.append(job.id)
+        # Process exits without running anything
+
+        seen = []
+        after = QueueManager()
+        await after.start(worker_count=2, processor=await _record(seen))
+        try:
+            done = [await asyncio.wait_for(after.wait(i), 5) for i in ids]
+        finally:
+            await after.shutdown()
+        return seen, done
+
+    seen, done = asyncio.run(main())
+
+    assert sorted(seen) == [0, 1, 2]
+    assert [j.status for j in done] == ["succeeded"] * 3
+    assert [j.result for j in done] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_jobs_of_a_dead_worker_are_reclaimed_after_the_lease(fast_queue):
+    async def main():
+        crashed = QueueManager()
+        job = crashed.create_job(Job(type="video", payload={"n": 7}))
+        last = crashed.create_job(Job(type="video", payload={"n": 8}, attempt=2))
+        for j in (job, last):
+            await crashed.enqueue(j.id)
+        # Lease both (as if a worker started them), then "crash"
+        claimed = crashed.store.claim(10, manager_module.QUEUE_LEASE_S)
+        assert {j.id for j in claimed} == {job.id, last.id}
+        for j in claimed:
+            j.attempt += 1
+        crashed.store.write([], [job_to_row(j) for j in claimed])
+
+        seen = []
+        qm = QueueManager()
+        await qm.start(worker_count=1, processor=await _record(seen))
+        try:
+            # Not visible until the lease runs out
+            await asyncio.sleep(0.1)
+            assert seen == []
+            start = time.monotonic()
+            retried = await asyncio.wait_for(qm.wait(job.id), 5)
+            gave_up = await asyncio.wait_for(qm.wait(last.id), 5)
+            elapsed = time.monotonic() - start
+        finally:
+            await qm.shutdown()
+        return seen, retried, gave_up, elapsed
+
+    seen, retried, gave_up, elapsed = asyncio.run(main())
+
+    assert seen == [7]
+    assert retried.status == "succeeded" and retried.attempt == 2
+    # Its worker died on the final attempt: failed instead of crash-looping
+    assert gave_up.status == "failed" and "lease expired" in gave_up.last_error
+    assert elapsed < 2
+
+
+def test_finished_jobs_are_evicted_from_memory_then_purged(fast_queue, monkeypatch):
+    async def main():
+        qm = QueueManager()
+        await qm.start(worker_count=1, processor=await _record([]))
+        try:
+            job = qm.create_job(Job(type="audio", payload={"n": 1}))
+            await qm.enqueue(job.id)
+            await qm.wait(job.id)
+
+            monkeypatch.setattr(manager_module, "QUEUE_MEMORY_RETENTION_S", 0)
+            job.updated_at -= timedelta(seconds=1)
+            await qm._evict()
+            assert job.id not in qm.jobs
+            # Still answerable from the store
+            stored = qm.get_job(job.id)
+            assert stored.status == "succeeded" and stored.result == {"n": 1}
+            assert (await qm.wait(job.id)).status == "succeeded"
+
+            monkeypatch.setattr(manager_module, "QUEUE_RETENTION_S", 0)
+            await qm._evict()
+            assert qm.get_job(job.id) is None
+        finally:
+            await qm.shutdown()
+
+    asyncio.run(main())
+
+
+def test_shutdown_requeues_running_jobs(fast_queue):
+    async def main():
+        started = asyncio.Event()
+
+        async def hang(job):
+            started.set()
+            await asyncio.sleep(60)
+
+        qm = QueueManager()
+        await qm.start(worker_count=1, processor=hang)
+        job = qm.create_job(Job(type="video"))
+        await qm.enqueue(job.id)
+        await asyncio.wait_for(started.wait(), 5)
+        await qm.shutdown()
+        return job.id
+
+    job_id = asyncio.run(main())
+    stored = QueueManager().store.get(job_id)
+
+    assert stored.status == "queued" and stored.lease_until is None
+    assert stored.available_at <= time.time()
+
+
+def test_enqueues_are_group_committed(fast_queue):
+    n = 2000
+
+    async def main():
+        qm = QueueManager()
+        calls = []
+        write = qm.store.write
+
+        def counting_write(inserts, updates):
+            calls.append(len(inserts) + len(updates))
+            write(inserts, updates)
+
+        qm.store.write = counting_write
+
+        async def submit(i):
+            job = qm.create_job(Job(type="audio", payload={"n": i}))
+            await qm.enqueue(job.id)
+
+        await asyncio.gather(*(submit(i) for i in range(n)))
+        return calls, qm
+
+    calls, qm = asyncio.run(main())
+
+    assert qm.store.count_ready() == n
+    assert len(calls) < n / 10
+
+
+def test_jobs_run_by_another_process_are_seen_finished(fast_queue):
+    async def main():
+        api = QueueManager()  # creates the job, runs no workers
+        other = QueueManager()
+        await other.start(worker_count=1, processor=await _record([]))
+        try:
+            job = api.create_job(Job(type="audio", payload={"n": 1}, dedup_key="k"))
+            await api.enqueue(job.id)
+            await asyncio.wait_for(other.wait(job.id), 5)
+
+            # Read from the store, not the stale in-memory copy
+            assert api.get_job(job.id).status == "succeeded"
+            assert [j.status for j in api.get_jobs([job.id])] == ["succeeded"]
+            assert api.find_jobs(["queued"]) == []
+            done = await asyncio.wait_for(api.wait(job.id), 5)
+            assert done is job and job.status == "succeeded"
+            assert job.result == {"n": 1}
+
+            # Same content again: processed anew, not coalesced into the old job
+            await api.refresh_inflight(["k"])
+            again = api.create_job(Job(type="audio", payload={"n": 2}, dedup_key="k"))
+            assert again is not job
+            await api.enqueue(again.id)
+            return await asyncio.wait_for(other.wait(again.id), 5)
+        finally:
+            await other.shutdown()
+
+    again = asyncio.run(main())
+
+    assert again.status == "succeeded" and again.result == {"n": 2}
+
+
+def test_purge_keeps_unfinished_jobs(db_session):
+    from app.queue.store import JobStore, job_to_row
+
+    store = JobStore()
+    old = datetime.now(UTC) - timedelta(days=30)
+    rows = [
+        job_to_row(Job(status=status, created_at=old, updated_at=old))
+        for status in ("queued", "running", "succeeded", "failed")
+    ]
+    store.write(rows, [])
+
+    assert store.purge(datetime.now(UTC)) == 2
+    assert sorted(j.status for j in store.unfinished()) == ["queued", "running"]
+
+
+def _enqueue_all(qm, jobs):
+    async def run():
+        for job in jobs:
+            qm.create_job(job)
+            await qm.enqueue(job.id)
+
+    return run()
+
+
+def test_lanes_are_served_by_weight(fast_queue, monkeypatch):
+    monkeypatch.setattr(
+        manager_module, "QUEUE_LANE_WEIGHTS", {"audio": 3.0, "video": 1.0}
+    )
+
+    async def main():
+        order = []
+
+        async def processor(job):
+            order.append(job.type)
+
+        qm = QueueManager()
+        # A burst of videos arrives before the audio clips
+        await _enqueue_all(qm, [Job(type="video") for _ in range(6)])
+        await _enqueue_all(qm, [Job(type="audio") for _ in range(6)])
+        await qm.start(worker_count=1, processor=processor)
+        try:
+            await asyncio.gather(*(qm.wait(i) for i in list(qm.jobs)))
+        finally:
+            await qm.shutdown()
+        return order
+
+    order = asyncio.run(main())
+
+    # 3 audio turns per video turn while both lanes have work
+    assert order[:8] == ["audio"] * 3 + ["video"] + ["audio"] * 3 + ["video"]
+    assert order[8:] == ["video"] * 4
+
+
+def test_lane_limit_keeps_a_worker_for_short_jobs(fast_queue):
+    async def main():
+        running = {"video": 0, "audio": 0}
+        peak = {"video": 0, "audio": 0}
+        audio_waits = []
+
+        async def processor(job):
+            running[job.type] += 1
+            peak[job.type] = max(peak[job.type], running[job.type])
+            await asyncio.sleep(0.3 if job.type == "video" else 0.01)
+            running[job.type] -= 1
+
+        qm = QueueManager(lane_limits={"video": 1})
+        await qm.start(worker_count=2, processor=processor)
+        try:
+            await _enqueue_all(qm, [Job(type="video") for _ in range(3)])
+            await asyncio.sleep(0.05)
+            for _ in range(3):
+                job = Job(type="audio")
+                start = time.monotonic()
+                await _enqueue_all(qm, [job])
+                await qm.wait(job.id)
+                audio_waits.append(time.monotonic() - start)
+            stats = qm.stats()["lanes"]
+            await asyncio.gather(*(qm.wait(i) for i in list(qm.jobs)))
+        finally:
+            await qm.shutdown()
+        return peak, audio_waits, stats
+
+    peak, audio_waits, stats = asyncio.run(main())
+
+    assert peak["video"] == 1
+    # Audio never queues behind the video backlog
+    assert max(audio_waits) < 0.2
+    assert stats["video"]["queued"] == 2 and stats["video"]["running"] == 1
+    assert stats["video"]["limit"] == 1 and stats["audio"]["limit"] is None
+    assert stats["audio"]["wait_s"]["samples"] == 3
+
+
+def test_higher_priority_runs_first_within_a_lane(fast_queue):
+    async def main():
+        order = []
+
+        async def processor(job):
+            order.append(job.payload["name"])
+
+        qm = QueueManager()
+        await _enqueue_all(
+            qm,
+            [
+                Job(type="video", payload={"name": "bulk-1"}),
+                Job(type="video", payload={"name": "bulk-2"}),
+                Job(type="video", payload={"name": "urgent"}, priority=5),
+            ],
+        )
+        await qm.start(worker_count=1, processor=processor)
+        try:
+            await asyncio.gather(*(qm.wait(i) for i in list(qm.jobs)))
+        finally:
+            await qm.shutdown()
+        return order
+
+    assert asyncio.run(main()) == ["urgent", "bulk-1", "bulk-2"]
+
+
+def test_stats_endpoint(db_session):
+    from app.api import jobs as jobs_api
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.state.queue = QueueManager(lane_limits={"video": 1})
+    app.include_router(jobs_api.router)
+
+    asyncio.run(_enqueue_all(app.state.queue, [Job(type="audio")]))
+    body = TestClient(app).get("/jobs/stats").json()
+
+    assert set(body["lanes"]) == {"video", "audio"}
+    assert body["lanes"]["audio"]["queued"] == 1
+    assert body["lanes"]["video"] == {
+        "queued": 0,
+        "oldest_wait_s": 0.0,
+        "retrying": 0,
+        "running": 0,
+        "limit": 1,
+        "weight": 1.0,
+        "wait_s": {"samples": 0, "p50": None, "p95": None, "max": None},
+    }
+
+
+def test_failing_jobs_do_not_hold_up_workers(fast_queue, monkeypatch):
+    delay = 0.5
+    monkeypatch.setattr(manager_module, "RETRY_BASE_DELAY_S", delay)
+    monkeypatch.setattr(manager_module, "RETRY_JITTER_S", 0.0)
+
+    async def run():
+        attempts = {}
+
+        async def processor(job):
+            attempts.setdefault(job.id, []).append(time.monotonic())
+            if job.payload["fail"]:
+                raise RuntimeError("corrupt file")
+            await asyncio.sleep(0.005)
+
+        qm = QueueManager()
+        await qm.start(worker_count=2, processor=processor)
+        try:
+            bad = [Job(type="audio", payload={"fail": True}) for _ in range(4)]
+            ok = [Job(type="audio", payload={"fail": False}) for _ in range(20)]
+            # Failures first, so their backoffs overlap the good jobs
+            await _enqueue_all(qm, bad + ok)
+            failed = await asyncio.gather(*(qm.wait(j.id) for j in bad))
+        finally:
+            await qm.shutdown()
+        return failed, [attempts[j.id] for j in bad], [attempts[j.id] for j in ok]
+
+    failed, bad_attempts, ok_attempts = asyncio.run(run())
+
+    assert all(j.status == "failed" and j.attempt == 3 for j in failed)
+    assert all("corrupt file" in j.last_error for j in failed)
+    # Both workers moved straight on to the good jobs: every one of them started
+    # before the first retry was due, instead of after a worker slept it out
+    first_due = min(times[0] for times in bad_attempts) + delay
+    assert max(times[0] for times in ok_attempts) < first_due
+    for times in bad_attempts:
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        assert len(times) == 3
+        assert gaps[0] >= delay and gaps[1] >= 2 * delay
+
+
+def test_retry_backoff_survives_a_restart(fast_queue, monkeypatch):
+    monkeypatch.setattr(manager_module, "RETRY_BASE_DELAY_S", 0.3)
+    monkeypatch.setattr(manager_module, "RETRY_JITTER_S", 0.0)
+
+    async def main():
+        async def flaky(job):
+            raise RuntimeError("boom")
+
+        qm = QueueManager()
+        await qm.start(worker_count=1, processor=flaky)
+        job = qm.create_job(Job(type="video", payload={"n": 1}))
+        await qm.enqueue(job.id)
+        while job.status != "retrying":
+            await asyncio.sleep(0.01)
+        await qm.shutdown()
+        parked = qm.store.get(job.id)
+
+        seen = []
+        restarted = QueueManager()
+        await restarted.start(worker_count=1, processor=await _record(seen))
+        try:
+            done = await asyncio.wait_for(restarted.wait(job.id), 5)
+        finally:
+            await restarted.shutdown()
+        return parked, done
+
+    parked, done = asyncio.run(main())
+
+    assert parked.status == "retrying" and parked.message.startswith("Retrying in 0.3s")
+    assert done.status == "succeeded" and done.attempt == 2
+
+
+async def _cooperative(started):
+    # Stands in for a pipeline that checks its token once per frame
+    async def processor(job):
+        started.set()
+        while True:
+            job.cancel.check()
+            await asyncio.sleep(0.01)
+
+    return processor
+
+
+def test_cancel_queued_and_running_jobs(fast_queue):
+    async def main():
+        started = asyncio.Event()
+        qm = QueueManager()
+        running = qm.create_job(Job(type="video", payload={}))
+        queued = qm.create_job(Job(type="video", payload={}))
+        await qm.enqueue(running.id)
+        await qm.start(worker_count=1, processor=await _cooperative(started))
+        try:
+            await asyncio.wait_for(started.wait(), 5)
+            await qm.enqueue(queued.id)
+
+            waiting = await qm.cancel(queued.id)
+            signalled = await qm.cancel(running.id)
+            status_when_signalled = signalled.status
+            done = await asyncio.wait_for(qm.wait(running.id), 5)
+        finally:
+            await qm.shutdown()
+        return waiting, status_when_signalled, done, qm.store.get(queued.id)
+
+    waiting, status_when_signalled, done, stored = asyncio.run(main())
+
+    assert waiting.status == "cancelled"
+    assert stored.status == "cancelled" and stored.available_at is None
+    assert status_when_signalled == "running"
+    assert done.status == "cancelled" and done.attempt == 1
+
+
+def test_timed_out_job_fails_without_retrying(fast_queue, monkeypatch):
+    monkeypatch.setitem(manager_module.QUEUE_JOB_TIMEOUTS, "audio", 0.1)
+
+    async def main():
+        qm = QueueManager()
+        await qm.start(worker_count=1, processor=await _cooperative(asyncio.Event()))
+        job = qm.create_job(Job(type="audio", payload={}))
+        await qm.enqueue(job.id)
+        try:
+            return await asyncio.wait_for(qm.wait(job.id), 5)
+        finally:
+            await qm.shutdown()
+
+    done = asyncio.run(main())
+
+    assert done.status == "failed" and done.attempt == 1
+    assert done.message == "Failed (timed out)"
+    assert "limit for audio jobs" in done.last_error
+
+
+def test_stuck_job_is_abandoned_after_the_grace_period(fast_queue, monkeypatch):
+    monkeypatch.setattr(manager_module, "QUEUE_CANCEL_GRACE_S", 0.1)
+
+    async def main():
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def stuck(job):
+            # Never checks its token
+            if job.payload["stuck"]:
+                started.set()
+                await asyncio.shield(release.wait())
+
+        qm = QueueManager()
+        await qm.start(worker_count=1, processor=stuck)
+        first = qm.create_job(Job(type="video", payload={"stuck": True}))
+        second = qm.create_job(Job(type="video", payload={"stuck": False}))
+        try:
+            await qm.enqueue(first.id)
+            await asyncio.wait_for(started.wait(), 5)
+            await qm.enqueue(second.id)
+            await qm.cancel(first.id)
+            abandoned = await asyncio.wait_for(qm.wait(first.id), 5)
+            # The only worker is free again
+            after = await asyncio.wait_for(qm.wait(second.id), 5)
+        finally:
+            release.set()
+            await qm.shutdown()
+        return abandoned, after
+
+    abandoned, after = asyncio.run(main())
+
+    assert abandoned.status == "cancelled"
+    assert after.status == "succeeded"
+
+
+def test_abandoned_video_job_keeps_the_detector_until_its_thread_returns(
+    fast_queue, monkeypatch
+):
+    import threading
+
+    from app.processing import processor
+
+    monkeypatch.setattr(manager_module, "QUEUE_CANCEL_GRACE_S", 0.1)
+    lock = threading.Lock()
+    active, overlaps, started = [], [], threading.Event()
+
+    def run_job_sync(job_type, payload, progress, check_cancelled):
+        # Stands in for the shared detector, which is not thread-safe
+        if not lock.acquire(blocking=False):
+            overlaps.append(payload["n"])
+            return {}
+        try:
+            active.append(payload["n"])
+            started.set()
+            if payload["n"] == 1:
+                time.sleep(0.5)  # stuck: never checks its token
+        finally:
+            lock.release()
+        return {}
+
+    monkeypatch.setattr(processor, "run_job_sync", run_job_sync)
+
+    async def main():
+        qm = QueueManager()
+        await qm.start(worker_count=2, processor=processor._run_sync)
+        first = qm.create_job(Job(type="video", payload={"n": 1}))
+        second = qm.create_job(Job(type="video", payload={"n": 2}))
+        try:
+            await qm.enqueue(first.id)
+            await asyncio.to_thread(started.wait, 5)
+            await qm.enqueue(second.id)
+            await qm.cancel(first.id)
+            abandoned = await asyncio.wait_for(qm.wait(first.id), 5)
+            after = await asyncio.wait_for(qm.wait(second.id), 5)
+        finally:
+            await qm.shutdown()
+        return abandoned, after
+
+    abandoned, after = asyncio.run(main())
+
+    assert abandoned.status == "cancelled" and after.status == "succeeded"
+    assert active == [1, 2] and overlaps == []
+
+
+def test_cancel_endpoint(db_session):
+    from app.api import jobs as jobs_api
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    qm = app.state.queue = QueueManager()
+    app.include_router(jobs_api.router)
+    client = TestClient(app)
+
+    queued = qm.create_job(Job(type="audio", payload={}))
+    asyncio.run(qm.enqueue(queued.id))
+    finished = qm.create_job(Job(type="audio", payload={}, status="succeeded"))
+
+    resp = client.delete(f"/jobs/{queued.id}")
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "job_id": queued.id,
+        "status": "cancelled",
+        "message": "Cancelled",
+    }
+    assert client.get(f"/jobs/{queued.id}/result").status_code == 410
+    assert client.delete(f"/jobs/{finished.id}").status_code == 409
+    assert client.delete("/jobs/missing").status_code == 404
+
+
+def test_watchers_get_rate_limited_updates_and_the_final_state(fast_queue, monkeypatch):
+    monkeypatch.setattr(manager_module, "QUEUE_WATCH_INTERVAL_S", 0.1)
+
+    def steps(job):
+        # Progress is reported from a worker thread, as in the real pipelines
+        for i in range(1, 51):
+            job.progress = i
+            job.touch()
+            time.sleep(0.01)
+
+    async def slow(job):
+        await asyncio.to_thread(steps, job)
+
+    async def main():
+        qm = QueueManager()
+        job = qm.create_job(Job(type="audio", payload={}))
+        seen = []
+
+        async def watch():
+            async for update in qm.watch(job.id):
+                seen.append((update.status, update.progress))
+
+        watcher = asyncio.create_task(watch())
+        await qm.enqueue(job.id)
+        await qm.start(worker_count=1, processor=slow)
+        try:
+            await asyncio.wait_for(watcher, 5)
+        finally:
+            await qm.shutdown()
+        return seen, job
+
+    seen, job = asyncio.run(main())
+
+    # ~0.5 s of progress at one update per 0.1 s, not one per step
+    assert 3 <= len(seen) <= 12
+    assert seen[-1] == ("succeeded", 100)
+    progress = [p for _, p in seen]
+    assert progress == sorted(progress)
+    assert job.on_change is None
+
+
+def test_job_events_endpoint(db_session, monkeypatch):
+    import json
+    from contextlib import asynccontextmanager
+
+    from app.api import jobs as jobs_api
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(manager_module, "QUEUE_WATCH_INTERVAL_S", 0.05)
+    qm = QueueManager()
+
+    async def stepped(job):
+        for value in (25, 50, 75):
+            job.progress = value
+            job.touch()
+            await asyncio.sleep(0.1)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await qm.start(worker_count=1, processor=stepped)
+        yield
+        await qm.shutdown()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.queue = qm
+    app.include_router(jobs_api.router)
+
+    with TestClient(app) as client:
+        job = qm.create_job(Job(type="video", payload={}))
+        client.portal.call(qm.enqueue, job.id)
+
+        with client.stream("GET", f"/jobs/{job.id}/events") as resp:
+            assert resp.headers["content-type"].startswith("text/event-stream")
+            events = [
+                json.loads(line.removeprefix("data: "))
+                for line in resp.iter_lines()
+                if line.startswith("data: ")
+            ]
+
+        assert client.get("/jobs/missing/events").status_code == 404
+
+    assert events[-1]["status"] == "succeeded"
+    assert {25, 50, 75} <= {e["progress"] for e in events}
+    assert all(e["job_id"] == job.id for e in events)
+
+
+def test_list_jobs_endpoint(db_session):
+    from app.api import jobs as jobs_api
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    qm = app.state.queue = QueueManager()
+    app.include_router(jobs_api.router)
+    client = TestClient(app)
+
+    video = qm.create_job(Job(type="video", payload={}))
+    audio = qm.create_job(Job(type="audio", payload={}))
+    done = qm.create_job(Job(type="audio", payload={}, status="succeeded"))
+    asyncio.run(qm.enqueue(video.id, audio.id))
+    # Evicted from memory: read back from the store
+    del qm.jobs[done.id]
+
+    resp = client.get(f"/jobs?ids={video.id},{done.id}&ids=nope")
+    assert [j["job_id"] for j in resp.json()["jobs"]] == [video.id, done.id]
+    assert resp.json()["missing"] == ["nope"]
+
+    resp = client.get("/jobs?status=queued&type=audio")
+    assert [j["job_id"] for j in resp.json()["jobs"]] == [audio.id]
+
+    resp = client.get("/jobs?status=queued&status=succeeded&limit=2")
+    assert [j["job_id"] for j in resp.json()["jobs"]] == [done.id, audio.id]
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_registry_loads_each_model_once_lazily_and_reports_stats():
+    from app.ml.registry import ModelRegistry
+
+    loads = []
+
+    def _loader():
+        loads.append(threading.get_ident())
+        return object()
+
+    registry = ModelRegistry()
+    registry.register("embedding", _loader)
+
+    # Nothing is loaded until first use
+    assert loads == []
+    assert registry.stats()["embedding"]["loaded"] is False
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("embedding")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loads) == 1
+    assert all(r is results[0] for r in results)
+
+    stats = registry.stats()["embedding"]
+    assert stats["loaded"] is True
+    assert stats["load_time_s"] >= 0
+    assert stats["rss_delta_mb"] is not None
+
+
+def test_importing_app_modules_does_not_load_models():
+    # Fresh interpreter: nothing heavy may be imported or loaded at import time
+    code = (
+        "import sys\n"
+        "import app.processing.processor, app.search.unified_search, app.video.summary\n"
+        "from app.ml.registry import registry\n"
+        "assert not any(i['loaded'] for i in registry.stats().values())\n"
+        "assert 'whisper' not in sys.modules\n"
+        "assert 'sentence_transformers' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True)
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def test_lru_cache_evicts_least_recent_and_expires():
+    from app.search.cache import LRUCache
+
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recent
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+    expiring = LRUCache(maxsize=2, ttl_s=0)
+    expiring.put("a", 1)
+    assert expiring.get("a") is None
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return np.tile(np.array([1, 0, 0, 0], dtype=np.float32), (len(texts), 1))
+
+
+def test_repeated_queries_skip_the_model_and_saves_invalidate_results(
+    db_session, monkeypatch
+):
+    from app.db import repository
+    from app.search import unified_search as us
+
+    embedder = CountingEmbedder()
+    monkeypatch.setattr(us, "get_embedding_model", lambda: embedder, raising=True)
+
+    emb = np.array([1, 0, 0, 0], dtype=np.float32).tobytes()
+    repository.save_video(db_session, "v1.mp4", [], [], "first", emb)
+
+    first = us.search_media(query="Red  Car", top_k=5)
+    second = us.search_media(query="red car ", top_k=5)
+
+    assert first == second and len(first) == 1
+    assert embedder.calls == [["red car"]]
+    assert us.search_stats()["result_cache"]["hits"] == 1
+
+    # A new video must show up: the save invalidates cached result ids,
+    # while the query embedding is still served from cache
+    repository.save_video(db_session, "v2.mp4", [], [], "second", emb)
+    third = us.search_media(query="red car", top_k=5)
+
+    assert {r["filename"] for r in third} == {"v1.mp4", "v2.mp4"}
+    assert embedder.calls == [["red car"]]
+    assert us.search_stats()["query_cache"]["hits"] == 1
+
+
+def test_search_stats_endpoint(db_session):
+    from app.api import search as search_api
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.include_router(search_api.router)
+
+    resp = TestClient(app).get("/search/stats")
+
+    assert resp.status_code == 200
+    assert set(resp.json()) == {"query_cache", "result_cache", "batcher", "index"}
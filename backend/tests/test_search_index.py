@@ -0,0 +1,150 @@
+import numpy as np
+
+
+def _clustered_vectors(n, dim=384, clusters=64, seed=0):
+    # Embedding-like data: points scattered around topic centres
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    return (centres[labels] + 0.35 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_index_tracks_repository_saves_and_external_rows(db_session):
+    from app.db import models, repository
+    from app.search.index import vector_index
+
+    emb = lambda *v: np.array(v, dtype=np.float32).tobytes()  # noqa: E731
+
+    repository.save_video(db_session, "v1.mp4", [], [], "s", emb(1, 0, 0, 0))
+    # First sync loads everything committed so far
+    vector_index.sync(db_session)
+    assert len(vector_index) == 1
+
+    # Saves through the repository update the loaded index immediately
+    repository.save_transcription(db_session, "a.wav", "t", [], emb(0, 1, 0, 0))
+    assert len(vector_index) == 2
+
+    # Rows committed elsewhere (e.g. a worker process) appear on the next sync
+    db_session.add(models.Video(filename="v2.mp4", embedding=emb(0, 0, 1, 0)))
+    db_session.commit()
+    vector_index.sync(db_session)
+
+    hits = vector_index.search(np.array([0, 0, 1, 0], dtype=np.float32), top_k=3)
+    assert len(vector_index) == 3
+    assert hits[0][:2] == ("video", 2)
+
+
+def test_exclude_self_still_returns_top_k():
+    from app.search.index import VectorIndex
+
+    index = VectorIndex(mode="exact")
+    index._loaded = True
+    vectors = _clustered_vectors(50, dim=8)
+    for i, v in enumerate(vectors, start=1):
+        index.add("video", i, v)
+
+    hits = index.search(vectors[0], top_k=5, exclude=("video", 1))
+
+    assert len(hits) == 5
+    assert ("video", 1) not in [h[:2] for h in hits]
+    assert [h[2] for h in hits] == sorted((h[2] for h in hits), reverse=True)
+
+
+def test_exclude_self_returns_exactly_top_k_at_corpus_boundary():
+    from app.search.index import VectorIndex
+
+    index = VectorIndex(mode="exact")
+    index._loaded = True
+    vectors = _clustered_vectors(4, dim=8)
+    for i, v in enumerate(vectors, start=1):
+        index.add("transcription", i, v)
+
+    hits = index.search(vectors[1], top_k=3, exclude=("transcription", 2))
+
+    assert sorted(h[1] for h in hits) == [1, 3, 4]
+
+
+def test_top_k_indices_matches_full_sort():
+    from app.search.index import top_k_indices
+
+    scores = np.random.default_rng(0).random(1000)
+
+    assert list(top_k_indices(scores, 10)) == list(scores.argsort()[::-1][:10])
+    assert list(top_k_indices(scores[:5], 10)) == list(scores[:5].argsort()[::-1])
+
+
+def test_indexed_vectors_are_normalized_once():
+    from app.search.index import VectorIndex
+
+    index = VectorIndex(mode="exact")
+    index._loaded = True
+    index.add("video", 1, np.array([3, 4, 0, 0], dtype=np.float32))
+
+    assert np.allclose(index.get("video", 1), [0.6, 0.8, 0, 0])
+    # Scores are plain cosine similarity regardless of query magnitude
+    hits = index.search(np.array([10, 0, 0, 0], dtype=np.float32), top_k=1)
+    assert abs(hits[0][2] - 0.6) < 1e-6
+
+
+def test_ivf_mode_recall_against_exact():
+    from app.search.index import VectorIndex
+
+    vectors = _clustered_vectors(5000)
+    exact = VectorIndex(mode="exact")
+    ivf = VectorIndex(mode="ivf", nprobe=8)
+    for index in (exact, ivf):
+        index._loaded = True
+        for i, v in enumerate(vectors):
+            index.add("video", i, v)
+
+    queries = _clustered_vectors(50, seed=1)
+    recall = []
+    for q in queries:
+        truth = {h[1] for h in exact.search(q, top_k=10)}
+        found = {h[1] for h in ivf.search(q, top_k=10)}
+        recall.append(len(truth & found) / 10)
+
+    assert np.mean(recall) >= 0.9
+
+
+def test_search_returns_ranked_hits_at_each_corpus_size():
+    from app.search.index import VectorIndex
+
+    queries = _clustered_vectors(50, seed=1)
+
+    for size in (1_000, 5_000, 20_000):
+        vectors = _clustered_vectors(size)
+        for mode in ("exact", "ivf"):
+            index = VectorIndex(mode=mode)
+            index._loaded = True
+            for i, v in enumerate(vectors):
+                index._add("video", i, v)
+            index._maybe_train()
+
+            for q in queries:
+                scores = [h[2] for h in index.search(q, top_k=10)]
+                assert len(scores) == 10
+                assert scores == sorted(scores, reverse=True)
+
+
+def test_exact_search_at_100k_rows_matches_brute_force():
+    """
+    Exact search is one mat-vec + argpartition over the whole corpus; at 100k
+    rows it still returns exactly the best matches.
+    """
+    from app.search.index import VectorIndex
+
+    vectors = _clustered_vectors(100_000)
+    index = VectorIndex(mode="exact")
+    index._loaded = True
+    for i, v in enumerate(vectors):
+        index._add("video", i, v)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for q in _clustered_vectors(5, seed=1):
+        hits = index.search(q, top_k=50, exclude=("video", 0))
+
+        scores = normalized @ (q / np.linalg.norm(q))
+        scores[0] = -np.inf
+        expected = np.argsort(scores)[::-1][:50]
+        assert [h[1] for h in hits] == expected.tolist()
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+REQUESTS = 200
+
+
+class SlowEmbedder:
+    """
+    Embedding model with a fixed per-call overhead. Calls are serialized, as
+    concurrent forward passes compete for the same CPU/GPU.
+    """
+
+    def __init__(self, call_cost_s=0.004, item_cost_s=0.0002):
+        self.call_cost_s = call_cost_s
+        self.item_cost_s = item_cost_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        self.calls += 1
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        with self._lock:
+            time.sleep(self.call_cost_s + self.item_cost_s * len(batch))
+        # Deterministic per text, independent of how queries were batched
+        return np.stack(
+            [np.random.default_rng(sum(map(ord, t))).standard_normal(16) for t in batch]
+        ).astype(np.float32)
+
+
+def _seed_videos(db_session, count=500):
+    from app.db.models import Video
+
+    rng = np.random.default_rng(0)
+    db_session.add_all(
+        Video(
+            filename=f"v{i}.mp4",
+            keyframes=[],
+            detected_objects=[],
+            summary=f"video {i}",
+            embedding=rng.standard_normal(16).astype(np.float32).tobytes(),
+        )
+        for i in range(count)
+    )
+    db_session.commit()
+
+
+def test_load_micro_batched_search_beats_per_request_encoding(db_session, monkeypatch):
+    """
+    Load-test harness: REQUESTS concurrent distinct queries through the async
+    micro-batched path vs. the per-request synchronous path in a threadpool.
+    """
+    from app.search import unified_search as us
+    from app.search.batcher import MicroBatcher
+
+    _seed_videos(db_session)
+
+    embedder = SlowEmbedder()
+    monkeypatch.setattr(us, "get_embedding_model", lambda: embedder, raising=True)
+    monkeypatch.setattr(us, "search_batcher", MicroBatcher(us.search_batch))
+    queries = [f"query {i}" for i in range(REQUESTS)]
+
+    # Per-request: every query pays the model call overhead
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        sync_results = list(pool.map(lambda q: us.search_media(q, top_k=5), queries))
+    sync_calls = embedder.calls
+
+    us.query_cache.clear()
+    us.result_cache.clear()
+    embedder.calls = 0
+
+    async def run_all():
+        return await asyncio.gather(
+            *(us.search_media_async(q, top_k=5) for q in queries)
+        )
+
+    async_results = asyncio.run(run_all())
+    stats = us.search_batcher.stats()
+
+    assert all(len(r) == 5 for r in async_results)
+    assert [r[0]["id"] for r in async_results] == [r[0]["id"] for r in sync_results]
+    # The model call counts show the batching
+    assert sync_calls == REQUESTS
+    assert stats["items"] == REQUESTS
+    # All queries arrive in one tick, so batches fill to max_batch
+    max_batch = us.search_batcher.max_batch
+    assert stats["batches"] == embedder.calls == -(-REQUESTS // max_batch)
@@ -0,0 +1,341 @@
+import asyncio
+import io
+import os
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture()
+def upload_dir(monkeypatch, tmp_path):
+    from app.api import uploads
+
+    path = tmp_path / "uploads"
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(path))
+    return path
+
+
+def test_same_name_uploads_get_separate_files(db_session, upload_dir):
+    from app.api import video as video_api
+    from app.queue.manager import QueueManager
+
+    app = FastAPI()
+    app.state.queue = QueueManager()
+    app.include_router(video_api.router)
+    client = TestClient(app)
+
+    for content in (b"first", b"second"):
+        resp = client.post(
+            "/process/video", files={"file": ("clip.mp4", content, "video/mp4")}
+        )
+        assert resp.status_code == 202
+
+    paths = [job.payload["file_path"] for job in app.state.queue.jobs.values()]
+    assert len(set(paths)) == 2
+    assert sorted(open(p, "rb").read() for p in paths) == [b"first", b"second"]
+    assert all(os.path.basename(p).endswith("_clip.mp4") for p in paths)
+
+
+def test_uploads_over_the_limit_are_rejected_and_cleaned_up(
+    db_session, upload_dir, monkeypatch
+):
+    from app.api import audio as audio_api
+    from app.api import uploads
+    from app.queue.manager import QueueManager
+
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 256)
+
+    app = FastAPI()
+    app.add_middleware(uploads.UploadLimitMiddleware)
+    app.state.queue = QueueManager()
+    app.include_router(audio_api.router)
+    client = TestClient(app)
+
+    # Rejected by the middleware before the body is parsed
+    resp = client.post(
+        "/process/audio", files={"file": ("a.wav", b"x" * 200_000, "audio/wav")}
+    )
+    assert resp.status_code == 413
+
+    # Body within the multipart allowance: rejected while the file is copied
+    resp = client.post(
+        "/process/audio", files={"file": ("a.wav", b"x" * 1001, "audio/wav")}
+    )
+    assert resp.status_code == 413
+
+    assert list(upload_dir.iterdir()) == []  # created by the streamed attempt
+    assert app.state.queue.jobs == {}
+
+    resp = client.post(
+        "/process/audio", files={"file": ("a.wav", b"x" * 1000, "audio/wav")}
+    )
+    assert resp.status_code == 202
+
+
+def test_save_upload_streams_in_chunks_without_blocking_the_loop(
+    upload_dir, monkeypatch
+):
+    import hashlib
+
+    from app.api import uploads
+
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 1000)
+    real_write = uploads._write_chunk
+
+    def slow_write(f, digest, chunk):
+        time.sleep(0.01)  # a slow disk
+        real_write(f, digest, chunk)
+
+    monkeypatch.setattr(uploads, "_write_chunk", slow_write)
+    content = os.urandom(10_500)
+    seen = []
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.002)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        upload = UploadFile(io.BytesIO(content), filename="../../etc/clip.mp4")
+        stored = await uploads.save_upload(upload, progress=seen.append)
+        task.cancel()
+        return stored, ticks
+
+    stored, ticks = asyncio.run(run())
+
+    assert seen == [min(1000 * i, len(content)) for i in range(1, 12)]
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest()
+    assert open(stored.path, "rb").read() == content
+    # Client-supplied directories are stripped
+    assert os.path.dirname(stored.path) == str(upload_dir)
+    # The loop kept running while chunks were written (~110 ms of disk time)
+    assert ticks >= 20
+
+
+def test_save_upload_removes_the_partial_file(upload_dir, monkeypatch):
+    from app.api import uploads
+
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 256)
+    upload = UploadFile(io.BytesIO(b"x" * 1001), filename="big.mp4")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(uploads.save_upload(upload))
+
+    assert exc.value.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_limit_middleware_stops_receiving_the_body(monkeypatch):
+    from app.api import uploads
+    from fastapi import Request
+
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(uploads, "_MULTIPART_OVERHEAD", 0)
+    received = []
+
+    app = FastAPI()
+    app.add_middleware(uploads.UploadLimitMiddleware)
+
+    @app.post("/process/audio")
+    async def handler(request: Request):
+        async for chunk in request.stream():
+            received.append(len(chunk))
+        return {}
+
+    client = TestClient(app)
+
+    # Chunked, no Content-Length: cut off once the limit is crossed
+    resp = client.post("/process/audio", content=iter([b"x" * 400] * 10))
+    assert resp.status_code == 413
+    assert sum(received) <= 1000
+
+    # Rejected from Content-Length before the body is read
+    received.clear()
+    assert client.post("/process/audio", content=b"x" * 1001).status_code == 413
+    assert received == []
+
+    assert client.post("/process/audio", content=b"x" * 1000).status_code == 200
+
+
+def test_upload_limit_middleware_caps_batch_requests(monkeypatch):
+    from app.api import uploads
+    from fastapi import Request
+
+    monkeypatch.setattr(uploads, "BATCH_MAX_BYTES", 1000)
+    monkeypatch.setattr(uploads, "_MULTIPART_OVERHEAD", 0)
+    received = []
+
+    app = FastAPI()
+    app.add_middleware(uploads.UploadLimitMiddleware)
+
+    @app.post("/process/batch")
+    async def handler(request: Request):
+        async for chunk in request.stream():
+            received.append(len(chunk))
+        return {}
+
+    client = TestClient(app)
+
+    resp = client.post("/process/batch", content=iter([b"x" * 400] * 10))
+    assert resp.status_code == 413
+    assert resp.json() == {"detail": "batch exceeds 1000 bytes"}
+    assert sum(received) <= 1000
+
+    received.clear()
+    assert client.post("/process/batch", content=b"x" * 1001).status_code == 413
+    assert received == []
+
+    assert client.post("/process/batch", content=b"x" * 1000).status_code == 200
+
+
+def _batch_client(monkeypatch, tmp_path):
+    from app.api import batch as batch_api
+    from app.api import uploads
+    from app.queue.manager import QueueManager
+
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(uploads, "BATCH_PATH_ROOT", str(tmp_path / "library"))
+
+    app = FastAPI()
+    app.state.queue = QueueManager()
+    app.include_router(batch_api.router)
+    return TestClient(app), app.state.queue
+
+
+def test_batch_queues_uploads_and_server_paths_in_one_request(
+    db_session, monkeypatch, tmp_path
+):
+    client, qm = _batch_client(monkeypatch, tmp_path)
+    library = tmp_path / "library"
+    (library / "day1").mkdir(parents=True)
+    (library / "day1" / "a.wav").write_bytes(b"server-a")
+    (library / "b.wav").write_bytes(b"same")
+
+    resp = client.post(
+        "/process/batch?type=audio&priority=2",
+        files=[
+            ("files", ("up1.wav", b"upload-1", "audio/wav")),
+            ("files", ("up2.wav", b"same", "audio/wav")),
+        ],
+        data={"paths": ["day1/a.wav", str(library / "b.wav")]},
+    )
+
+    assert resp.status_code == 202
+    body = resp.json()
+    assert [j["filename"] for j in body["jobs"]] == [
+        "up1.wav",
+        "up2.wav",
+        "a.wav",
+        "b.wav",
+    ]
+    # The server file has the same content as the second upload
+    assert body["queued"] == 3
+    assert body["jobs"][3] == {
+        "filename": "b.wav",
+        "job_id": body["jobs"][1]["job_id"],
+        "status": "queued",
+        "coalesced": True,
+    }
+    assert qm.store.count_ready() == 3
+
+    jobs = [qm.jobs[j["job_id"]] for j in body["jobs"][:3]]
+    assert all(job.priority == 2 and job.type == "audio" for job in jobs)
+    # Server files are processed in place, never copied or removed
+    assert jobs[2].payload["file_path"] == str(library / "day1" / "a.wav")
+    assert (library / "b.wav").exists()
+
+
+def test_batch_rejects_disallowed_paths_before_storing_anything(
+    db_session, monkeypatch, tmp_path
+):
+    from app.api import uploads
+
+    client, qm = _batch_client(monkeypatch, tmp_path)
+    (tmp_path / "library").mkdir()
+    (tmp_path / "secret.wav").write_bytes(b"x")
+
+    resp = client.post(
+        "/process/batch?type=audio",
+        files=[("files", ("up.wav", b"upload", "audio/wav"))],
+        data={"paths": ["../secret.wav", "missing.wav"]},
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"]["invalid_paths"] == [
+        {"path": "../secret.wav", "error": "outside the allowed directory"},
+        {"path": "missing.wav", "error": "not a file"},
+    ]
+    assert not (tmp_path / "uploads").exists() and qm.jobs == {}
+
+    monkeypatch.setattr(uploads, "BATCH_MAX_ITEMS", 1)
+    resp = client.post(
+        "/process/batch?type=audio",
+        files=[("files", (f"{i}.wav", b"x", "audio/wav")) for i in range(2)],
+    )
+    assert resp.status_code == 413
+
+    monkeypatch.setattr(uploads, "BATCH_PATH_ROOT", "")
+    resp = client.post("/process/batch?type=audio", data={"paths": ["a.wav"]})
+    assert resp.status_code == 403
+
+
+def test_batch_removes_stored_uploads_when_a_later_file_is_too_large(
+    db_session, monkeypatch, tmp_path
+):
+    from app.api import uploads
+
+    client, qm = _batch_client(monkeypatch, tmp_path)
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 8)
+
+    resp = client.post(
+        "/process/batch?type=audio",
+        files=[
+            ("files", ("small.wav", b"tiny", "audio/wav")),
+            ("files", ("big.wav", b"x" * 9, "audio/wav")),
+        ],
+    )
+
+    assert resp.status_code == 413
+    assert list((tmp_path / "uploads").iterdir()) == []
+    assert qm.jobs == {}
+
+
+def test_batch_returns_stored_results_for_processed_content(
+    db_session, monkeypatch, tmp_path
+):
+    import hashlib
+
+    from app.db import repository
+    from app.processing import processor
+
+    client, qm = _batch_client(monkeypatch, tmp_path)
+    config_key = processor.pipeline_config_key("audio")
+    for content in (b"done-1", b"done-2"):
+        record = repository.save_transcription(db_session, "old.wav", "hi", [])
+        sha256 = hashlib.sha256(content).hexdigest()
+        repository.save_media_hash(
+            db_session, sha256, "transcription", config_key, record.id
+        )
+
+    resp = client.post(
+        "/process/batch?type=audio",
+        files=[
+            ("files", (f"{name}.wav", name.encode(), "audio/wav"))
+            for name in ("done-1", "new", "done-2")
+        ],
+    )
+
+    assert resp.status_code == 202
+    body = resp.json()
+    assert body["queued"] == 1
+    assert [j.get("deduplicated", False) for j in body["jobs"]] == [True, False, True]
+    assert body["jobs"][0]["result"]["text"] == "hi"
+    # Only the queued job's copy is kept
+    assert len(list((tmp_path / "uploads").iterdir())) == 1
@@ -0,0 +1,199 @@
+import time
+
+import numpy as np
+import pytest
+
+SR = 16000
+
+
+def _speech_at(seconds: float, bursts):
+    """Low background noise with loud tones during each (start, end) burst."""
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 1e-4, int(seconds * SR)).astype(np.float32)
+    for start, end in bursts:
+        t = np.arange(int(start * SR), int(end * SR))
+        audio[t] = 0.5 * np.sin(2 * np.pi * 220 * t / SR)
+    return audio
+
+
+def test_speech_regions_are_padded_and_short_gaps_merged():
+    from app.audio.vad import speech_regions
+
+    audio = _speech_at(10, [(2.0, 3.0), (3.3, 4.0), (7.0, 8.0)])
+    regions = [(s / SR, e / SR) for s, e in speech_regions(audio, SR)]
+
+    # The 0.3 s pause is bridged; the 3 s silence splits the regions
+    assert len(regions) == 2
+    (a_start, a_end), (b_start, b_end) = regions
+    assert 1.75 <= a_start <= 1.85 and 4.15 <= a_end <= 4.25
+    assert 6.75 <= b_start <= 6.85 and 8.15 <= b_end <= 8.25
+
+    assert speech_regions(_speech_at(5, []), SR) == []
+
+
+def test_transcribe_speech_skips_silence_and_keeps_original_timestamps():
+    from app.audio.vad import transcribe_speech
+
+    audio = _speech_at(60, [(10.0, 12.0), (40.0, 41.0)])
+    seen = []
+
+    def fake_transcribe(samples):
+        # One segment per loud burst, in the compacted clip's own timeline
+        seen.append(len(samples))
+        block = SR // 100
+        n = len(samples) // block
+        loud = np.abs(samples[: n * block]).reshape(n, block).max(axis=1) > 0.1
+        edges = np.flatnonzero(np.diff(loud.astype(np.int8), prepend=0, append=0))
+        segments = [
+            {"start": s * block / SR, "end": e * block / SR, "text": f" burst{i}"}
+            for i, (s, e) in enumerate(zip(edges[::2], edges[1::2]))
+        ]
+        return {"text": "".join(s["text"] for s in segments), "segments": segments}
+
+    result = transcribe_speech(fake_transcribe, audio)
+
+    # Whisper only saw the ~4 s of padded speech instead of 60 s
+    assert seen[0] < 5 * SR
+    starts = [round(s["start"], 1) for s in result["segments"]]
+    ends = [round(s["end"], 1) for s in result["segments"]]
+    assert starts == [10.0, 40.0] and ends == [12.0, 41.0]
+
+    # Silent audio never reaches the model
+    assert transcribe_speech(fake_transcribe, _speech_at(30, [])) == {
+        "text": "",
+        "segments": [],
+    }
+    assert len(seen) == 1
+
+
+def test_timeline_maps_region_boundaries():
+    from app.audio.vad import Timeline
+
+    timeline = Timeline([(16000, 32000), (80000, 96000)], SR)
+
+    assert timeline.to_original(0.0) == 1.0
+    assert timeline.to_original(0.5) == 1.5
+    # 1.0 s in the compact audio is both the end of region 1 and start of region 2
+    assert timeline.to_original(1.0, end=True) == 2.0
+    assert timeline.to_original(1.0) == 5.0
+    assert timeline.to_original(1.5, end=True) == 5.5
+
+
+def test_vad_prepass_is_cheap():
+    from app.audio.vad import speech_regions
+
+    audio = _speech_at(600, [(60.0 * i, 60.0 * i + 20) for i in range(10)])
+
+    start = time.perf_counter()
+    regions = speech_regions(audio, SR)
+    elapsed = time.perf_counter() - start
+
+    assert len(regions) == 10
+    assert elapsed < 2.0
+
+
+def test_processor_skips_noise_only_audio_in_both_modes(db_session, monkeypatch):
+    import contextlib
+    import io
+
+    from app.db import database
+    from app.ml import embedding as embedding_module
+    from app.processing import processor
+
+    rng = np.random.default_rng(1)
+    # A recording with no speech: only a noise floor (-60 dBFS RMS)
+    noise = rng.normal(0, 1e-3, 60 * SR).astype(np.float32)
+    # Quiet speech (peak -26 dBFS) after 40 s of the same noise
+    speech = noise.copy()
+    t = np.arange(2 * SR)
+    speech[40 * SR : 42 * SR] += 0.05 * np.sin(2 * np.pi * 220 * t / SR)
+    audio = {}
+    seen = []
+
+    @contextlib.contextmanager
+    def fake_pcm_stream(path):
+        yield io.BytesIO(audio[path].tobytes())
+
+    class FakeWhisper:
+        def transcribe(self, samples):
+            seen.append(float(np.max(np.abs(samples))))
+            return {"text": "hi", "segments": []}
+
+    class FakeEmbedder:
+        def encode(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(processor, "probe_duration", lambda p: len(audio[p]) / SR)
+    monkeypatch.setattr(processor, "open_pcm_stream", fake_pcm_stream)
+    monkeypatch.setattr(processor, "get_whisper_model", FakeWhisper)
+    monkeypatch.setattr(embedding_module, "get_embedding_model", FakeEmbedder)
+    monkeypatch.setattr(processor, "SessionLocal", database.SessionLocal)
+
+    for stream_min_s in (300, 1):  # in memory, then in 30 s windows
+        monkeypatch.setattr(processor, "AUDIO_STREAM_MIN_DURATION_S", stream_min_s)
+        audio["noise.wav"], audio["speech.wav"] = noise, speech
+        seen.clear()
+
+        out = processor.run_job_sync(
+            "audio", {"file_path": "noise.wav", "filename": "noise.wav"}
+        )
+        assert seen == [] and out["text"] == ""
+
+        processor.run_job_sync(
+            "audio", {"file_path": "speech.wav", "filename": "speech.wav"}
+        )
+        # Only the window with speech reaches Whisper, normalized to full scale
+        assert len(seen) == 1 and seen[0] == pytest.approx(1.0, abs=0.05)
+
+
+def test_processor_transcribes_quiet_speech_in_both_modes(db_session, monkeypatch):
+    import contextlib
+    import io
+
+    from app.audio.vad import speech_regions
+    from app.db import database
+    from app.ml import embedding as embedding_module
+    from app.processing import processor
+
+    rng = np.random.default_rng(2)
+    # A clean but quiet recording: speech RMS -43 dBFS (below the absolute
+    # threshold) over a -80 dBFS noise floor
+    audio = rng.normal(0, 1e-4, 60 * SR).astype(np.float32)
+    t = np.arange(3 * SR)
+    audio[40 * SR : 43 * SR] += 0.01 * np.sin(2 * np.pi * 220 * t / SR)
+    seen = []
+
+    regions = [(s / SR, e / SR) for s, e in speech_regions(audio, SR)]
+    assert len(regions) == 1 and 39.7 <= regions[0][0] <= 40.0
+
+    @contextlib.contextmanager
+    def fake_pcm_stream(path):
+        yield io.BytesIO(audio.tobytes())
+
+    class FakeWhisper:
+        def transcribe(self, samples):
+            seen.append(float(np.max(np.abs(samples))))
+            segment = {"start": 0.0, "end": 1.0, "text": " quiet"}
+            return {"text": " quiet", "segments": [segment]}
+
+    class FakeEmbedder:
+        def encode(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(processor, "probe_duration", lambda p: len(audio) / SR)
+    monkeypatch.setattr(processor, "open_pcm_stream", fake_pcm_stream)
+    monkeypatch.setattr(processor, "get_whisper_model", FakeWhisper)
+    monkeypatch.setattr(embedding_module, "get_embedding_model", FakeEmbedder)
+    monkeypatch.setattr(processor, "SessionLocal", database.SessionLocal)
+
+    for stream_min_s in (300, 1):  # in memory, then in 30 s windows
+        monkeypatch.setattr(processor, "AUDIO_STREAM_MIN_DURATION_S", stream_min_s)
+        seen.clear()
+
+        out = processor.run_job_sync(
+            "audio", {"file_path": "quiet.wav", "filename": "quiet.wav"}
+        )
+
+        # Found, and normalized to full scale before Whisper as without VAD
+        assert out["text"].strip() == "quiet"
+        assert len(seen) == 1 and seen[0] == pytest.approx(1.0, abs=0.05)